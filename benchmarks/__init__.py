@@ -0,0 +1,10 @@
+"""
+Benchmarks do pipeline.
+
+- synthetic.py: gerador de bases sintéticas no formato de data_processed/leads_b2b.csv
+  (+ data_raw/receita_mock.csv) em 10k / 1M / 10M linhas
+- bench.py: mede cada etapa de src/ e o fluxo completo do run.py, grava os
+  resultados em JSON (benchmarks/results/) e compara com uma execução anterior
+- fetch_bench.py: teste de carga do fetch_batch contra a API simulada
+  (src/mock_cnpj_api.py): vazão, retentativas e latência de cauda por nº de workers
+"""
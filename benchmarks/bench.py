@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench.py
+
+Benchmarks das etapas de src/ e do fluxo completo do run.py sobre bases sintéticas
+(benchmarks/synthetic.py), com resultados em JSON para comparar entre commits.
+
+- Etapas isoladas: cada função roda 'repeat' vezes sobre a mesma entrada (cópia
+  preparada fora da medição); vale a mediana. Acima de --max-stage-rows as etapas
+  isoladas usam só as primeiras linhas (10M linhas de pandas não cabem em qualquer máquina)
+- Fluxo completo: python run.py num subprocesso dentro da pasta da base; o tempo
+  por etapa vem do relatório da execução (src/metrics.py)
+- Resultados: benchmarks/results/<data>_<commit>.json
+- Regressão: com --baseline, cada etapa é comparada com a execução anterior;
+  mediana acima de (1 + threshold) × base (e pelo menos --min-delta segundos a
+  mais) é regressão, e o script sai com código 1
+
+Uso:
+    python benchmarks/bench.py --sizes 10k
+    python benchmarks/bench.py --sizes 10k,1m --repeat 5 --baseline latest --threshold 0.15
+    python benchmarks/bench.py --sizes 10m --stages run_py        # só o fluxo completo
+    python benchmarks/bench.py --compare results/a.json results/b.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# permite importar src/ ao rodar "python benchmarks/bench.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from benchmarks.synthetic import parse_rows, write_dataset
+from src.business_rules import apply_business_rules
+from src.clean_final_csv import clean_dataframe
+from src.dedup import ExternalDeduper
+from src.enrich_from_receita import enrich_from_receita
+from src.lead_classification import classify_leads
+from src.normalize_cnae import normalize_cnae_column
+from src.receita_store import RECEITA_PATH, STORE_DIR, build_store, open_store
+from src.structural_score import apply_structural_score
+from src.utils import validate_cnpj, validate_cnpj_batch
+from src.validate_structural import validate_structural
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+MAX_STAGE_ROWS = 1_000_000
+SCALAR_SAMPLE = 10_000  # validate_cnpj escalar: amostra (o custo por linha é o que interessa)
+THRESHOLD = 0.10
+MIN_DELTA = 0.01  # s; diferenças menores são ruído
+
+
+# ===============================
+# Medição
+# ===============================
+
+def measure(func, make_input, repeat, rows):
+    """Roda func(make_input()) 'repeat' vezes; só a chamada de func é cronometrada."""
+    times = []
+    out = None
+    for _ in range(repeat):
+        arg = make_input()
+        t0 = time.perf_counter()
+        out = func(arg)
+        times.append(time.perf_counter() - t0)
+    median = statistics.median(times)
+    return out, {
+        "rows": rows,
+        "runs": [round(t, 6) for t in times],
+        "median_s": round(median, 6),
+        "min_s": round(min(times), 6),
+        "rows_per_s": round(rows / median) if median > 0 else None,
+    }
+
+
+def _dedup(df):
+    with ExternalDeduper("cnpj") as dedup:
+        dedup.add(df)
+        return pd.concat(list(dedup.results()), ignore_index=True)
+
+
+def bench_stages(leads_path, repeat, max_rows, selected=None):
+    """Etapas isoladas, encadeadas (a saída de uma é a entrada da seguinte)."""
+    raw = pd.read_csv(leads_path, dtype=str, nrows=max_rows)
+    n = len(raw)
+    results = {}
+
+    def run(name, func, make_input, rows=n):
+        if selected and name not in selected:
+            # ainda precisa da saída para as etapas seguintes: roda uma vez sem medir
+            return func(make_input())
+        print(f"   ⏱️ {name} ({rows} linhas)...")
+        out, results[name] = measure(func, make_input, repeat, rows)
+        return out
+
+    sample = raw["cnpj"].head(SCALAR_SAMPLE).tolist()
+    run("validate_cnpj", lambda values: [validate_cnpj(v) for v in values], lambda: sample, len(sample))
+    run("validate_cnpj_batch", validate_cnpj_batch, lambda: raw["cnpj"])
+
+    cleaned = run("clean", lambda df: clean_dataframe(df, drop_duplicates=False), raw.copy)
+    clean = run("dedup", _dedup, lambda: cleaned, len(cleaned))
+
+    with open(RECEITA_PATH, "rb") as f:
+        receita_rows = max(sum(1 for _ in f) - 1, 0)
+    run("receita_store_build", lambda _: build_store(RECEITA_PATH, STORE_DIR), lambda: None, receita_rows)
+    store = open_store()
+    df = run("enrich", lambda d: enrich_from_receita(d, store, verbose=False), clean.copy, len(clean))
+    df = run("validate_structural", validate_structural, df.copy, len(df))
+    df = run("structural_score", apply_structural_score, df.copy, len(df))
+    df = run("classify", classify_leads, df.copy, len(df))
+    run("business_rules", apply_business_rules, df.copy, len(df))
+    run("normalize_cnae", normalize_cnae_column, clean.copy, len(clean))
+    return results
+
+
+def _latest_report(folder):
+    reports = glob.glob(os.path.join(folder, "*.json"))
+    return max(reports, key=os.path.getmtime) if reports else None
+
+
+def bench_run_py(rows, repeat, extra_args=()):
+    """python run.py (modo em lote) no diretório atual; tempo total + etapas do relatório de métricas."""
+    times, stages = [], {}
+    report_dir = os.path.join("data_processed", "run_reports")
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        with open("run_py.log", "w", encoding="utf-8") as log:
+            subprocess.run([sys.executable, os.path.join(ROOT, "run.py"), *extra_args],
+                           stdout=log, stderr=subprocess.STDOUT, check=True)
+        times.append(time.perf_counter() - t0)
+        report = _latest_report(report_dir)
+        if report:
+            with open(report, "r", encoding="utf-8") as f:
+                for st in json.load(f)["stages"]:
+                    stages.setdefault(st["stage"], []).append(st["wall_s"])
+        print(f"   ⏱️ run.py #{i + 1}: {times[-1]:.2f}s")
+
+    median = statistics.median(times)
+    result = {
+        "run_py": {"rows": rows, "runs": [round(t, 6) for t in times], "median_s": round(median, 6),
+                   "min_s": round(min(times), 6), "rows_per_s": round(rows / median) if median > 0 else None},
+    }
+    for name, walls in stages.items():
+        result[f"run_py:{name}"] = {"rows": rows, "runs": walls, "median_s": round(statistics.median(walls), 6),
+                                    "min_s": round(min(walls), 6), "rows_per_s": None}
+    return result
+
+
+# ===============================
+# Resultados e regressões
+# ===============================
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+    }
+
+
+def compare(current, baseline, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """
+    Linhas (tamanho, etapa, base, atual, razão, regressão?) para as etapas presentes
+    nos dois resultados.
+    """
+    rows = []
+    for size, stages in current["results"].items():
+        base_stages = baseline["results"].get(size, {})
+        for name, cur in stages.items():
+            base = base_stages.get(name)
+            if not base or not base["median_s"]:
+                continue
+            ratio = cur["median_s"] / base["median_s"]
+            regressed = ratio > 1 + threshold and cur["median_s"] - base["median_s"] > min_delta
+            rows.append((size, name, base["median_s"], cur["median_s"], ratio, regressed))
+    return rows
+
+
+def print_comparison(rows, baseline_label, threshold):
+    print(f"\n📏 Comparação com {baseline_label} (limite: +{threshold:.0%})")
+    for size, name, base, cur, ratio, regressed in rows:
+        flag = "❌" if regressed else ("✅" if ratio < 1 - threshold else "  ")
+        print(f"   {flag} {size:>5} {name:<28} {base:9.4f}s → {cur:9.4f}s  ({ratio:5.2f}x)")
+    regressions = [r for r in rows if r[5]]
+    if regressions:
+        print(f"❌ {len(regressions)} regressão(ões) acima de {threshold:.0%}")
+    else:
+        print("✅ Nenhuma regressão")
+    return regressions
+
+
+def load_result(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest_result(exclude=None):
+    paths = [p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+# ===============================
+# CLI
+# ===============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline sobre bases sintéticas")
+    parser.add_argument("--sizes", default="10k", help="Tamanhos separados por vírgula: 10k, 1m, 10m ou números")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por etapa (vale a mediana)")
+    parser.add_argument("--stages", default=None,
+                        help="Só estas etapas (vírgulas); 'run_py' = fluxo completo. Padrão: todas")
+    parser.add_argument("--max-stage-rows", type=int, default=MAX_STAGE_ROWS,
+                        help="Máximo de linhas nas etapas isoladas (o fluxo completo usa a base inteira)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Onde as bases geradas ficam (reaproveitadas)")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de resultado (padrão: benchmarks/results/)")
+    parser.add_argument("--baseline", default=None, help="JSON de uma execução anterior, ou 'latest'")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Regressão: mediana > (1 + threshold) × base")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA, help="Diferença mínima (s) para contar regressão")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "ATUAL"), help="Só compara dois JSONs já gravados")
+    args = parser.parse_args()
+
+    if args.compare:
+        base, cur = (load_result(p) for p in args.compare)
+        regressions = print_comparison(compare(cur, base, args.threshold, args.min_delta), args.compare[0], args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    selected = set(args.stages.split(",")) if args.stages else None
+    started = datetime.now(timezone.utc)
+    result = {
+        "commit": git_commit(),
+        "created_at": started.isoformat(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "environment": environment(),
+        "results": {},
+    }
+
+    cwd = os.getcwd()
+    for size in args.sizes.split(","):
+        rows = parse_rows(size)
+        folder = os.path.abspath(os.path.join(args.data_dir, f"{size}_seed{args.seed}"))
+        leads = os.path.join(folder, "data_processed", "leads_b2b.csv")
+        if not os.path.exists(leads):
+            print(f"🧪 Gerando base sintética de {rows} linhas em {folder}...")
+            write_dataset(folder, rows, args.seed)
+
+        print(f"\n🏁 Base {size} ({rows} linhas)")
+        # os módulos de src/ usam caminhos relativos (data_processed/, data_raw/)
+        os.chdir(folder)
+        try:
+            stage_results = {}
+            if selected is None or selected - {"run_py"}:
+                stage_results.update(bench_stages(leads, args.repeat, args.max_stage_rows, selected))
+            if selected is None or "run_py" in selected:
+                stage_results.update(bench_run_py(rows, args.repeat))
+        finally:
+            os.chdir(cwd)
+        result["results"][size] = stage_results
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started.strftime('%Y%m%dT%H%M%S')}_{result['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultado: {output}")
+
+    if args.baseline:
+        baseline_path = latest_result(exclude=output) if args.baseline == "latest" else args.baseline
+        if baseline_path is None:
+            print("⚠️ Nenhum resultado anterior para comparar")
+            return
+        rows = compare(result, load_result(baseline_path), args.threshold, args.min_delta)
+        if print_comparison(rows, baseline_path, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
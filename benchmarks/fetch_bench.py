@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+benchmarks/fetch_bench.py
+
+Teste de carga de fetch_api.fetch_batch contra a API simulada (src/mock_cnpj_api.py):
+vazão, retentativas e latência de cauda para cada número de workers, sob latência,
+falhas e limite de taxa controlados. Serve para escolher --workers / --delay.
+
+- Por padrão sobe o servidor simulado neste processo (porta livre); com --url usa
+  um já rodando (as contagens do servidor vêm de GET /__stats)
+- Latência por consulta = resposta final da sessão requests, incluindo as
+  retentativas e esperas do Retry (urllib3); retentativas = histórico do Retry
+- Resultado em JSON (benchmarks/results/fetch_<data>_<commit>.json)
+
+Uso:
+    python benchmarks/fetch_bench.py --queries 2000 --workers 4,8,16,32
+    python benchmarks/fetch_bench.py --workers 8,16 --delay 0 --latency lognormal:0.1,0.8 --error-rate 0.05
+    python benchmarks/fetch_bench.py --workers 16 --rate-limit 40 --burst 20     # API com limite de taxa
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+# permite importar src/ ao rodar "python benchmarks/fetch_bench.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from benchmarks.bench import RESULTS_DIR, environment, git_commit
+from benchmarks.synthetic import make_cnpjs
+from src.fetch_api import fetch_batch, requests_session_with_retries
+from src.mock_cnpj_api import add_server_arguments, make_server, server_options
+
+
+def _server_call(url, path, method="GET"):
+    with urlopen(Request(url + path, method=method, data=b"" if method == "POST" else None), timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def timed_session(latencies, retries, lock):
+    """Sessão padrão do fetch_api com um hook que registra latência e retentativas de cada consulta."""
+    session = requests_session_with_retries()
+
+    def record(resp, *args, **kwargs):
+        history = getattr(getattr(resp.raw, "retries", None), "history", ()) or ()
+        with lock:
+            latencies.append(resp.elapsed.total_seconds())
+            retries.append(len(history))
+
+    session.hooks["response"].append(record)
+    return session
+
+
+def run_fetch(url, cnpjs, workers, delay):
+    """Uma rodada de fetch_batch; devolve as métricas do cliente e do servidor."""
+    _server_call(url, "/__reset", "POST")
+    latencies, retries, lock = [], [], threading.Lock()
+    session = timed_session(latencies, retries, lock)
+
+    started = time.perf_counter()
+    results = fetch_batch(cnpjs, max_workers=workers, delay_between_requests=delay, base_url=url, session=session)
+    elapsed = time.perf_counter() - started
+    session.close()
+
+    errors = Counter(r["error"] if str(r["error"]).startswith(("http_", "not_found", "invalid")) else "exception"
+                     for r in results if r["error"])
+    lat_ms = np.array(latencies) * 1000
+    pct = lambda q: round(float(np.percentile(lat_ms, q)), 2) if len(lat_ms) else None
+    server = _server_call(url, "/__stats")
+    return {
+        "workers": workers,
+        "delay": delay,
+        "queries": len(cnpjs),
+        "seconds": round(elapsed, 3),
+        "throughput_qps": round(len(cnpjs) / elapsed, 1) if elapsed else None,
+        "ok": sum(1 for r in results if r.get("data")),
+        "errors": dict(errors),
+        "retries": int(sum(retries)),
+        "queries_retried": int(sum(1 for n in retries if n)),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(float(lat_ms.max()), 2) if len(lat_ms) else None,
+        "server": server,
+    }
+
+
+def print_results(rows):
+    print(f"\n{'workers':>7} {'q/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'retries':>8} {'reqs':>7}  erros")
+    for r in rows:
+        print(f"{r['workers']:>7} {r['throughput_qps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} "
+              f"{r['max_ms']:>9} {r['retries']:>8} {r['server']['requests']:>7}  {r['errors'] or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga de fetch_batch contra a API simulada")
+    parser.add_argument("--url", default=None, help="API simulada já rodando (padrão: sobe uma neste processo)")
+    parser.add_argument("--queries", type=int, default=1000, help="CNPJs consultados por rodada")
+    parser.add_argument("--workers", default="4,8,16", help="Valores de max_workers separados por vírgula")
+    parser.add_argument("--delay", type=float, default=0.05, help="delay_between_requests do fetch_batch (s)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente dos CNPJs consultados")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de resultado (padrão: benchmarks/results/)")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = make_server(os.path.join(ROOT, args.seed_file) if not os.path.isabs(args.seed_file) else args.seed_file,
+                             port=0, **server_options(args))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"🚀 API simulada em {url} (latência={args.latency}, 5xx={args.error_rate:g}, "
+              f"429={args.throttle_rate:g}, limite={args.rate_limit or '-'} req/s)")
+
+    cnpjs = list(make_cnpjs(np.random.default_rng(args.seed), args.queries))
+    started = datetime.now(timezone.utc)
+    rows = []
+    try:
+        for workers in (int(w) for w in args.workers.split(",")):
+            print(f"🔹 fetch_batch: {len(cnpjs)} CNPJs, {workers} workers, delay {args.delay:g}s")
+            rows.append(run_fetch(url, cnpjs, workers, args.delay))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    print_results(rows)
+
+    result = {
+        "commit": git_commit(),
+        "created_at": started.isoformat(),
+        "environment": environment(),
+        "server": {"url": args.url, **({} if args.url else server_options(args))},
+        "results": rows,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"fetch_{started.strftime('%Y%m%dT%H%M%S')}_{result['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultado: {output}")
+
+
+if __name__ == "__main__":
+    main()
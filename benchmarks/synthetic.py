@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+benchmarks/synthetic.py
+
+Gerador de bases sintéticas de leads no formato de data_processed/leads_b2b.csv,
+com as mesmas "sujeiras" da base real:
+- CNPJs com dígitos verificadores válidos (uma fração inválida e outra formatada
+  como 12.345.678/0001-90)
+- uf / municipio / cnae_fiscal como dicts em texto (repr Python, igual ao CSV
+  gerado a partir da API), com uma fração em texto simples
+- campos ausentes, situações diferentes de "Ativa" e CNPJs duplicados
+E a base de referência do enriquecimento (data_raw/receita_mock.csv) cobrindo
+parte dos CNPJs.
+
+A geração é vetorizada e em blocos (10M linhas não precisam caber na memória)
+e determinística para a mesma semente.
+
+Uso:
+    python benchmarks/synthetic.py --rows 1m --output /tmp/bench_1m
+    → /tmp/bench_1m/data_processed/leads_b2b.csv e /tmp/bench_1m/data_raw/receita_mock.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# permite importar src/ ao rodar "python benchmarks/synthetic.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from src.dimensions import SECTION_BY_DIVISION, UF_IBGE, UF_NOMES
+from src.utils import cnpj_check_digits
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+BLOCK_ROWS = 500_000
+
+LEADS_COLUMNS = ["cnpj", "razao_social", "nome_fantasia", "municipio", "uf", "telefone", "email",
+                 "situacao", "cnae_fiscal"]
+RECEITA_COLUMNS = ["cnpj", "situacao", "porte_empresa", "natureza_juridica", "data_inicio_atividade"]
+
+# (nome, código IBGE, UF)
+MUNICIPIOS = [
+    ("São Paulo", 3550308, "SP"), ("Campinas", 3509502, "SP"), ("Santos", 3548500, "SP"),
+    ("Ribeirão Preto", 3543402, "SP"), ("Rio de Janeiro", 3304557, "RJ"), ("Niterói", 3303302, "RJ"),
+    ("Belo Horizonte", 3106200, "MG"), ("Uberlândia", 3170206, "MG"), ("Curitiba", 4106902, "PR"),
+    ("Londrina", 4113700, "PR"), ("Porto Alegre", 4314902, "RS"), ("Caxias do Sul", 4305108, "RS"),
+    ("Sant'Ana do Livramento", 4317103, "RS"), ("Florianópolis", 4205407, "SC"), ("Blumenau", 4202404, "SC"),
+    ("Joinville", 4209102, "SC"), ("Salvador", 2927408, "BA"), ("Feira de Santana", 2910800, "BA"),
+    ("Recife", 2611606, "PE"), ("Fortaleza", 2304400, "CE"), ("Brasília", 5300108, "DF"),
+    ("Goiânia", 5208707, "GO"), ("Manaus", 1302603, "AM"), ("Belém", 1501402, "PA"),
+    ("Vitória", 3205309, "ES"), ("Natal", 2408102, "RN"), ("João Pessoa", 2507507, "PB"),
+    ("Maceió", 2704302, "AL"), ("Aracaju", 2800308, "SE"), ("Teresina", 2211001, "PI"),
+    ("São Luís", 2111300, "MA"), ("Cuiabá", 5103403, "MT"), ("Campo Grande", 5002704, "MS"),
+    ("Porto Velho", 1100205, "RO"), ("Palmas", 1721000, "TO"), ("Macapá", 1600303, "AP"),
+    ("Boa Vista", 1400100, "RR"), ("Rio Branco", 1200401, "AC"),
+]
+# peso de cada município (capitais grandes concentram mais empresas)
+MUNICIPIO_WEIGHTS = np.array([30, 6, 3, 3, 18, 3, 10, 3, 8, 2, 7, 2, 1, 3, 3, 3, 6, 2, 5, 5, 6, 4,
+                              3, 3, 2, 2, 2, 2, 1, 1, 2, 2, 2, 1, 1, 1, 1, 1], dtype=np.float64)
+
+# (subclasse, descrição)
+CNAES = [
+    ("5320202", "Serviços de entrega rápida"), ("4711302", "Comércio varejista de mercadorias em geral"),
+    ("6201501", "Desenvolvimento de programas de computador sob encomenda"),
+    ("5611201", "Restaurantes e similares"), ("4781400", "Comércio varejista de artigos do vestuário"),
+    ("8211300", "Serviços combinados de escritório e apoio administrativo"),
+    ("4930202", "Transporte rodoviário de carga"), ("4120400", "Construção de edifícios"),
+    ("1412601", "Confecção de peças do vestuário"), ("8630503", "Atividade médica ambulatorial"),
+    ("7319002", "Promoção de vendas"), ("4520001", "Serviços de manutenção e reparação mecânica"),
+    ("6911701", "Serviços advocatícios"), ("9602501", "Cabeleireiros, manicure e pedicure"),
+    ("4744099", "Comércio varejista de materiais de construção em geral"),
+]
+
+SITUACOES = np.array(["Ativa", "Baixada", "Inapta", "Suspensa", "Nula"], dtype=object)
+SITUACAO_WEIGHTS = np.array([0.82, 0.10, 0.05, 0.02, 0.01])
+PORTES = np.array(["ME", "EPP", "DEMAIS"], dtype=object)
+NATUREZAS = np.array(["Sociedade Empresária Limitada", "Empresário Individual",
+                      "Sociedade Anônima Fechada"], dtype=object)
+
+# frações padrão de "sujeira"
+DEFAULTS = {
+    "duplicate_rate": 0.05,      # linhas que repetem um CNPJ anterior
+    "invalid_cnpj_rate": 0.01,   # dígito verificador errado
+    "formatted_cnpj_rate": 0.05,  # 12.345.678/0001-90
+    "plain_text_rate": 0.03,     # uf/municipio como texto simples em vez de dict
+    "missing_rate": {            # ausência por campo
+        "razao_social": 0.03, "nome_fantasia": 0.35, "municipio": 0.02, "uf": 0.02,
+        "telefone": 0.25, "email": 0.30, "cnae_fiscal": 0.04,
+    },
+    "receita_coverage": 0.8,     # fração dos CNPJs presentes na base de referência
+}
+
+
+# ===============================
+# Valores pré-renderizados (uma string por categoria, indexadas por código)
+# ===============================
+
+def _uf_dict(sigla):
+    return str({"id": UF_IBGE[sigla], "nome": UF_NOMES[sigla], "sigla": sigla, "ibge_id": UF_IBGE[sigla]})
+
+
+def _municipio_dict(nome, ibge):
+    return str({"id": ibge % 10000, "nome": nome, "ibge_id": ibge, "siafi_id": str(ibge % 9000 + 1000)})
+
+
+def _cnae_dict(code, descricao):
+    return str({"id": code, "secao": str(SECTION_BY_DIVISION[int(code[:2])]), "divisao": code[:2],
+                "grupo": f"{code[:2]}.{code[2]}", "classe": f"{code[:2]}.{code[2:4]}-{code[4]}",
+                "subclasse": f"{code[:4]}-{code[4]}/{code[5:]}", "descricao": descricao})
+
+
+MUN_DICT = np.array([_municipio_dict(nome, ibge) for nome, ibge, _ in MUNICIPIOS], dtype=object)
+MUN_TEXT = np.array([nome for nome, _, _ in MUNICIPIOS], dtype=object)
+MUN_UF = np.array([uf for _, _, uf in MUNICIPIOS], dtype=object)
+UF_DICT = {sigla: _uf_dict(sigla) for sigla in UF_IBGE}
+CNAE_DICT = np.array([_cnae_dict(code, desc) for code, desc in CNAES], dtype=object)
+
+
+# ===============================
+# Geração
+# ===============================
+
+def make_cnpjs(rng: np.random.Generator, n) -> np.ndarray:
+    """n CNPJs (14 dígitos) com dígitos verificadores válidos; filial 0001 na maioria."""
+    root = rng.integers(0, 10, size=(n, 8))
+    branch = np.where(rng.random(n) < 0.85, 1, rng.integers(2, 30, n))
+    branch_digits = np.stack([branch // 1000 % 10, branch // 100 % 10, branch // 10 % 10, branch % 10], axis=1)
+    base = np.concatenate([root, branch_digits], axis=1)
+    digits = np.concatenate([base, cnpj_check_digits(base)], axis=1).astype(np.uint8) + ord("0")
+    return np.frombuffer(digits.tobytes(), dtype="S14").astype(str).astype(object)
+
+
+def _format_cnpj(c):
+    return f"{c[:2]}.{c[2:5]}.{c[5:8]}/{c[8:12]}-{c[12:]}"
+
+
+def _missing(rng, values: np.ndarray, rate):
+    values = values.copy()
+    values[rng.random(len(values)) < rate] = None
+    return values
+
+
+def generate_block(rng: np.random.Generator, start, n, options=None) -> pd.DataFrame:
+    """
+    Bloco de n linhas; 'start' é o número da primeira linha (nomes EMPRESA <i>).
+    Duplicatas repetem CNPJs do próprio bloco (cópias com outro contato/situação).
+    """
+    opts = {**DEFAULTS, **(options or {})}
+    idx = np.arange(start, start + n)
+
+    cnpj = make_cnpjs(rng, n)
+    # duplicatas: a linha i repete o CNPJ de uma linha anterior j < i do bloco
+    dup = np.flatnonzero(rng.random(n) < opts["duplicate_rate"])
+    dup = dup[dup > 0]
+    source = (rng.random(len(dup)) * dup).astype(np.int64)
+    cnpj[dup] = cnpj[source]
+
+    bad = rng.random(n) < opts["invalid_cnpj_rate"]
+    if bad.any():
+        cnpj[bad] = [c[:13] + str((int(c[13]) + 1) % 10) for c in cnpj[bad]]
+    fmt = np.flatnonzero(rng.random(n) < opts["formatted_cnpj_rate"])
+    cnpj[fmt] = [_format_cnpj(c) for c in cnpj[fmt]]
+
+    weights = MUNICIPIO_WEIGHTS / MUNICIPIO_WEIGHTS.sum()
+    mun = rng.choice(len(MUNICIPIOS), size=n, p=weights)
+    plain = rng.random(n) < opts["plain_text_rate"]
+    municipio = np.where(plain, MUN_TEXT[mun], MUN_DICT[mun])
+    uf_sigla = MUN_UF[mun]
+    uf = np.array([UF_DICT[s] for s in uf_sigla], dtype=object)
+    uf[plain] = uf_sigla[plain]
+
+    phone = rng.integers(30_000_000, 99_999_999, n)
+    ddd = rng.integers(11, 99, n)
+    telefone = np.array([f"({d}) {p // 10000}-{p % 10000:04d}" for d, p in zip(ddd, phone)], dtype=object)
+    email = np.array([f"contato{i}@empresa{i % 9973}.com.br" for i in idx], dtype=object)
+
+    missing = opts["missing_rate"]
+    df = pd.DataFrame({
+        "cnpj": cnpj,
+        "razao_social": _missing(rng, np.array([f"EMPRESA {i} LTDA" for i in idx], dtype=object), missing["razao_social"]),
+        "nome_fantasia": _missing(rng, np.array([f"F{i}" for i in idx], dtype=object), missing["nome_fantasia"]),
+        "municipio": _missing(rng, municipio, missing["municipio"]),
+        "uf": _missing(rng, uf, missing["uf"]),
+        "telefone": _missing(rng, telefone, missing["telefone"]),
+        "email": _missing(rng, email, missing["email"]),
+        "situacao": rng.choice(SITUACOES, size=n, p=SITUACAO_WEIGHTS),
+        "cnae_fiscal": _missing(rng, CNAE_DICT[rng.integers(0, len(CNAES), n)], missing["cnae_fiscal"]),
+    })
+    return df
+
+
+def generate_receita(rng: np.random.Generator, cnpjs: pd.Series, coverage=DEFAULTS["receita_coverage"]) -> pd.DataFrame:
+    """Linhas da base de referência (receita_mock.csv) para uma fração dos CNPJs."""
+    digits = cnpjs.astype(str).str.replace(r"\D", "", regex=True).drop_duplicates()
+    digits = digits[rng.random(len(digits)) < coverage].reset_index(drop=True)
+    n = len(digits)
+    start = np.datetime64("1990-01-01") + rng.integers(0, 12_000, n).astype("timedelta64[D]")
+    return pd.DataFrame({
+        "cnpj": digits,
+        "situacao": "ATIVA",
+        "porte_empresa": _missing(rng, rng.choice(PORTES, size=n), 0.05),
+        "natureza_juridica": _missing(rng, rng.choice(NATUREZAS, size=n), 0.10),
+        "data_inicio_atividade": _missing(rng, start.astype(str).astype(object), 0.05),
+    })
+
+
+def _csv_writer(path, columns):
+    # pyarrow.csv: dezenas de vezes mais rápido que DataFrame.to_csv para 10M linhas
+    schema = pa.schema([pa.field(c, pa.string()) for c in columns])
+    return pa_csv.CSVWriter(path, schema, write_options=pa_csv.WriteOptions(quoting_style="needed")), schema
+
+
+def write_dataset(output, rows, seed=42, options=None, block_rows=BLOCK_ROWS):
+    """
+    Grava <output>/data_processed/leads_b2b.csv e <output>/data_raw/receita_mock.csv.
+    Retorna {"leads": caminho, "receita": caminho, "rows": rows}.
+    """
+    rng = np.random.default_rng(seed)
+    leads_path = os.path.join(output, "data_processed", "leads_b2b.csv")
+    receita_path = os.path.join(output, "data_raw", "receita_mock.csv")
+    os.makedirs(os.path.dirname(leads_path), exist_ok=True)
+    os.makedirs(os.path.dirname(receita_path), exist_ok=True)
+
+    coverage = {**DEFAULTS, **(options or {})}["receita_coverage"]
+    leads_out, leads_schema = _csv_writer(leads_path, LEADS_COLUMNS)
+    receita_out, receita_schema = _csv_writer(receita_path, RECEITA_COLUMNS)
+    with leads_out, receita_out:
+        for start in range(0, rows, block_rows):
+            n = min(block_rows, rows - start)
+            df = generate_block(rng, start, n, options)
+            leads_out.write_table(pa.Table.from_pandas(df, schema=leads_schema, preserve_index=False))
+            receita = generate_receita(rng, df["cnpj"], coverage)
+            receita_out.write_table(pa.Table.from_pandas(receita, schema=receita_schema, preserve_index=False))
+    return {"leads": leads_path, "receita": receita_path, "rows": rows}
+
+
+def parse_rows(value) -> int:
+    """'10k', '1m', '10m' ou um número."""
+    value = str(value).lower().replace("_", "")
+    if value in SIZES:
+        return SIZES[value]
+    if value[-1:] in ("k", "m"):
+        return int(float(value[:-1]) * (1_000 if value[-1] == "k" else 1_000_000))
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera bases sintéticas de leads para benchmarks")
+    parser.add_argument("--rows", default="10k", help="Linhas: 10k, 1m, 10m ou um número")
+    parser.add_argument("--output", "-o", required=True, help="Pasta de saída (recebe data_processed/ e data_raw/)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duplicate-rate", type=float, default=DEFAULTS["duplicate_rate"])
+    args = parser.parse_args()
+
+    rows = parse_rows(args.rows)
+    print(f"🧪 Gerando {rows} linhas sintéticas (seed={args.seed})...")
+    paths = write_dataset(args.output, rows, args.seed, {"duplicate_rate": args.duplicate_rate})
+    print("✅ Leads:", paths["leads"])
+    print("✅ Receita (referência):", paths["receita"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,228 @@
-print("🚀 Iniciando pipeline OrganizadorCNPJs...\n")
+import argparse
 
 from src.clean_final_csv import clean_final_csv
 from src.validate_structural import validate_structural
 from src.normalize_cnae import normalize_cnae
+from src import metrics
+from src import storage
+from src.execution import get_backend
 
-import pandas as pd
 
+def run_batch(backend):
 
+    # ETAPA 1 — LIMPEZA ESTRUTURAL
+    print("🧹 Etapa 1: Limpeza estrutural")
+    with metrics.stage("clean") as st:
+        counts = clean_final_csv()
+        st.count(counts["rows_in"], counts["rows_out"])
+    print("✅ Limpeza concluída\n")
 
-# ETAPA 1 — LIMPEZA ESTRUTURAL
-print("🧹 Etapa 1: Limpeza estrutural")
-clean_final_csv()
-print("✅ Limpeza concluída\n")
+    # ENRIQUECIMENTO DE DADOS
+    from src.enrich_from_receita import enrich_from_receita
 
-# ENRIQUECIMENTO DE DADOS
-from src.enrich_from_receita import enrich_from_receita
+    print("🧬 Etapa 2.5: Enriquecimento com dados da Receita Federal (mock)")
 
-print("🧬 Etapa 2.5: Enriquecimento com dados da Receita Federal (mock)")
+    with metrics.stage("enrich") as st:
+        df = storage.read_table("leads_b2b_clean")
+        st.count(rows_in=df)
+        df = enrich_from_receita(df)
+        storage.write_table(df, "leads_b2b_enriched")
+        st.count(rows_out=df)
 
-df = pd.read_csv("data_processed/leads_b2b_clean.csv")
-df = enrich_from_receita(df)
-df.to_csv("data_processed/leads_b2b_enriched.csv", index=False)
 
+    print("✅ Enriquecimento concluído\n")
 
-print("✅ Enriquecimento concluído\n")
 
+    # ETAPA 2 — VALIDAÇÃO ESTRUTURAL
+    print("🧪 Etapa 2: Validação estrutural")
 
-# ETAPA 2 — VALIDAÇÃO ESTRUTURAL
-print("🧪 Etapa 2: Validação estrutural")
+    INPUT = "leads_b2b_enriched"
+    OUTPUT = "leads_b2b_structural_validated"
 
-INPUT = "data_processed/leads_b2b_enriched.csv"
-OUTPUT = "data_processed/leads_b2b_structural_validated.csv"
 
+    with metrics.stage("validate") as st:
+        df = storage.read_table(INPUT)
+        st.count(rows_in=df)
+        df = validate_structural(df)
+        storage.write_table(df, OUTPUT)
+        st.count(rows_out=df)
 
-df = pd.read_csv(INPUT)
-df = validate_structural(df)
-df.to_csv(OUTPUT, index=False)
+    from src.quality_metrics import generate_quality_metrics
 
-from src.quality_metrics import generate_quality_metrics
+    #STRUCTURAL SCORE - PONTUAÇÃO ESTRUTUAL
+    from src.structural_score import apply_structural_score
 
-#STRUCTURAL SCORE - PONTUAÇÃO ESTRUTUAL
-from src.structural_score import apply_structural_score
+    print("📈 Etapa 4.1: Score estrutural")
 
-print("📈 Etapa 4.1: Score estrutural")
+    with metrics.stage("score") as st:
+        st.count(rows_in=df)
+        df = apply_structural_score(df)
 
-df = apply_structural_score(df)
+        storage.write_table(df, "leads_b2b_scored")
+        st.count(rows_out=df)
 
-df.to_csv("data_processed/leads_b2b_scored.csv", index=False)
+    print("✅ Score estrutural aplicado\n")
 
-print("✅ Score estrutural aplicado\n")
+    #CLASSIFICAÇÃO DE LEAD - LEAD CLASSIFICATION
+    from src.lead_classification import classify_leads
 
-#CLASSIFICAÇÃO DE LEAD - LEAD CLASSIFICATION
-from src.lead_classification import classify_leads
+    print("🏷️ Etapa 4.2: Classificação do lead")
 
-print("🏷️ Etapa 4.2: Classificação do lead")
+    with metrics.stage("classify") as st:
+        st.count(rows_in=df)
+        df = classify_leads(df)
 
-df = classify_leads(df)
+        storage.write_table(df, "leads_b2b_classified")
+        st.count(rows_out=df)
 
-df.to_csv("data_processed/leads_b2b_classified.csv", index=False)
+    print("✅ Leads classificados\n")
 
-print("✅ Leads classificados\n")
 
+    # MÉTRICAS DE QUALIDADE
 
-# MÉTRICAS DE QUALIDADE
+    print("📊 Etapa 2.3: Métricas de qualidade")
 
-print("📊 Etapa 2.3: Métricas de qualidade")
+    with metrics.stage("split_valid") as st:
+        generate_quality_metrics(df)
 
-generate_quality_metrics(df)
+        valid_df = df[df["is_valid_structural"] == True]
+        invalid_df = df[df["is_valid_structural"] == False]
 
-valid_df = df[df["is_valid_structural"] == True]
-invalid_df = df[df["is_valid_structural"] == False]
+        # exportações CSV
+        valid_df.to_csv(storage.export_path("leads_b2b_validos"), index=False)
+        invalid_df.to_csv(storage.export_path("leads_b2b_invalidos"), index=False)
+        st.count(df, len(valid_df))
 
-valid_df.to_csv("data_processed/leads_b2b_validos.csv", index=False)
-invalid_df.to_csv("data_processed/leads_b2b_invalidos.csv", index=False)
+    print("📁 Arquivos válidos e inválidos gerados\n")
 
-print("📁 Arquivos válidos e inválidos gerados\n")
 
+    print("✅ Validação estrutural concluída\n")
 
-print("✅ Validação estrutural concluída\n")
+    from src.business_rules import apply_business_rules
 
-from src.business_rules import apply_business_rules
 
+    # REGRAS DE NEGÓCIO
+    print("🏷️ Etapa 2.4: Regras de negócio")
 
-# REGRAS DE NEGÓCIO
-print("🏷️ Etapa 2.4: Regras de negócio")
+    with metrics.stage("business") as st:
+        st.count(rows_in=df)
+        df = backend.map(apply_business_rules, df)
 
-df = apply_business_rules(df)
+        business_df = df[df["is_valid_business"] == True]
+        business_df.to_csv(storage.export_path("leads_b2b_business_valid"), index=False)
+        st.count(rows_out=business_df)
 
-df[df["is_valid_business"] == True].to_csv(
-    "data_processed/leads_b2b_business_valid.csv", index=False
-)
+    print("✅ Regras de negócio aplicadas\n")
 
-print("✅ Regras de negócio aplicadas\n")
 
+    # ETAPA 3 — NORMALIZAÇÃO DE CNAE
+    print("🧩 Etapa 3: Normalização de CNAE")
+    with metrics.stage("normalize_cnae") as st:
+        st.count(rows_out=normalize_cnae())
+    print("✅ Normalização concluída\n")
 
-# ETAPA 3 — NORMALIZAÇÃO DE CNAE
-print("🧩 Etapa 3: Normalização de CNAE")
-normalize_cnae()
-print("✅ Normalização concluída\n")
 
-print("🎉 Pipeline finalizado com sucesso!")
+def run_stream(chunksize, backend):
+    from src.stream_pipeline import run_streaming
+
+    print(f"🌊 Modo streaming: blocos de {chunksize} linhas")
+    run_streaming(chunksize=chunksize, backend=backend)
+    print("✅ Pipeline em blocos concluído\n")
+
+
+def run_incremental_mode(backend):
+    from src.delta import run_incremental
+
+    print("🔁 Modo incremental: só CNPJs novos ou alterados passam por validação, score e regras")
+    counts = run_incremental(backend)
+    print(f"✅ Incremental concluído: {counts['changed']} reprocessado(s), {counts['removed']} removido(s), "
+          f"{counts['total'] - counts['changed']} inalterado(s)\n")
+
+
+def run_dag_mode(jobs, force):
+    from src.pipeline_dag import run_dag
+
+    print(f"🕸️ Modo DAG: etapas sem mudanças são puladas (jobs={jobs})")
+    status = run_dag(max_workers=jobs, force=force)
+    ran = [name for name, st in status.items() if st == "ran"]
+    print(f"✅ DAG concluído: {len(ran)} etapa(s) executada(s), {len(status) - len(ran)} pulada(s)\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline OrganizadorCNPJs")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Processa em blocos de tamanho fixo (memória constante); grava só as saídas finais"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=100_000,
+        help="Linhas por bloco no modo --stream"
+    )
+    parser.add_argument(
+        "--dag",
+        action="store_true",
+        help="Executa as etapas como DAG, pulando as que não mudaram desde a última execução"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="No modo --dag, reexecuta todas as etapas"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="No modo --dag, máximo de etapas independentes em paralelo"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reprocessa só os CNPJs novos ou alterados desde a última execução (hash do conteúdo) e atualiza as saídas anteriores"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processos para as regras de negócio (única etapa linha a linha; score e classificação são vetorizados) nos modos em lote, --stream e --incremental; 0 = um por núcleo"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=metrics.PROFILERS,
+        default=None,
+        help="Grava um trace por etapa em data_processed/run_reports/<execução>/ (padrão: cprofile; pyinstrument se instalado)"
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default=None,
+        help="Também grava as métricas das etapas neste arquivo .prom (coletor textfile do Prometheus)"
+    )
+    args = parser.parse_args()
+
+    mode = "stream" if args.stream else "incremental" if args.incremental else "dag" if args.dag else "batch"
+    metrics.start_run(mode=mode, profile=args.profile)
+
+    print("🚀 Iniciando pipeline OrganizadorCNPJs...\n")
+
+    with get_backend(args.workers) as backend:
+        if backend.workers > 1:
+            print(f"⚙️ Etapas linha a linha em até {backend.workers} processos\n")
+        if args.stream:
+            run_stream(args.chunksize, backend)
+        elif args.incremental:
+            run_incremental_mode(backend)
+        elif args.dag:
+            run_dag_mode(args.jobs, args.force)
+        else:
+            run_batch(backend)
+
+    print("🎉 Pipeline finalizado com sucesso!")
+    metrics.finish_run(args.metrics_textfile)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,80 @@
 #!/usr/bin/env python3
 """
 dedup_and_save.py
-- Deduplica registros por CNPJ (mantém o primeiro encontrado)
+- Deduplica registros por CNPJ (padrão: mantém o primeiro encontrado)
+- Os CSVs são lidos em blocos e a deduplicação é externa (src/dedup.py):
+  históricos de fetch maiores que a memória também funcionam
 - Gera arquivos deduplicados:
     - data_processed/empresas_api_dedup.csv
     - data_processed/empresas_api_clean_dedup.csv
+
+Uso:
+    python scripts/dedup_and_save.py
+    python scripts/dedup_and_save.py --policy recent     # última consulta de cada CNPJ
+    python scripts/dedup_and_save.py --policy complete   # linha com mais campos preenchidos
 """
 
+import argparse
 import os
+import sys
+
 import pandas as pd
 
+# --- Permite importar src/ executando da raiz ou de scripts/ ---
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from src.dedup import ExternalDeduper, POLICIES, dedup_frame, print_report
+
 IN_ALL = os.path.join("data_processed", "empresas_api.csv")
 OUT_ALL = os.path.join("data_processed", "empresas_api_dedup.csv")
 IN_CLEAN = os.path.join("data_processed", "empresas_api_clean.csv")
 OUT_CLEAN = os.path.join("data_processed", "empresas_api_clean_dedup.csv")
 
-def dedup_df(df, subset="cnpj"):
-    """Remove duplicatas pelo subset (cnpj) mantendo a primeira ocorrência."""
-    if subset in df.columns:
-        return df.drop_duplicates(subset=[subset], keep="first")
-    else:
-        return df
+CHUNKSIZE = 200_000
+
+
+def dedup_df(df, subset="cnpj", policy="first"):
+    """Remove duplicatas pelo subset (cnpj) de um DataFrame em memória."""
+    return dedup_frame(df, subset, policy)[0]
+
+
+def dedup_csv(in_path, out_path, subset="cnpj", policy="first", recency_column=None, chunksize=CHUNKSIZE):
+    """Deduplica um CSV em blocos, gravando o resultado em blocos. Retorna o relatório (None sem a coluna)."""
+    header = pd.read_csv(in_path, nrows=0, dtype=str)
+    if subset not in header.columns:
+        pd.read_csv(in_path, dtype=str).to_csv(out_path, index=False)
+        return None
+
+    with ExternalDeduper(subset, policy, recency_column) as dedup:
+        for chunk in pd.read_csv(in_path, dtype=str, chunksize=chunksize):
+            dedup.add(chunk)
+        header.to_csv(out_path, index=False)
+        for df in dedup.results():
+            df.to_csv(out_path, index=False, mode="a", header=False)
+    return dedup.report
+
 
 def main():
-    # dedup no CSV completo (se existir)
-    if os.path.exists(IN_ALL):
-        df_all = pd.read_csv(IN_ALL, dtype=str)
-        print("Registros antes (all):", len(df_all))
-        df_all_d = dedup_df(df_all, "cnpj")
-        print("Registros depois (all):", len(df_all_d))
-        df_all_d.to_csv(OUT_ALL, index=False)
-        print("Salvo:", OUT_ALL)
-    else:
-        print("Arquivo não encontrado:", IN_ALL)
-
-    # dedup no CSV enxuto
-    if os.path.exists(IN_CLEAN):
-        df_clean = pd.read_csv(IN_CLEAN, dtype=str)
-        print("Registros antes (clean):", len(df_clean))
-        df_clean_d = dedup_df(df_clean, "cnpj")
-        print("Registros depois (clean):", len(df_clean_d))
-        df_clean_d.to_csv(OUT_CLEAN, index=False)
-        print("Salvo:", OUT_CLEAN)
-    else:
-        print("Arquivo não encontrado:", IN_CLEAN)
+    parser = argparse.ArgumentParser(description="Deduplica os CSVs da API por CNPJ")
+    parser.add_argument("--policy", choices=POLICIES, default="first",
+                        help="Linha mantida por CNPJ: first (primeira), recent (mais recente), complete (mais campos)")
+    parser.add_argument("--recency-column", default=None,
+                        help="Coluna de data/hora usada por --policy recent (padrão: ordem do arquivo)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Linhas lidas por bloco")
+    args = parser.parse_args()
+
+    for label, in_path, out_path in (("all", IN_ALL, OUT_ALL), ("clean", IN_CLEAN, OUT_CLEAN)):
+        if not os.path.exists(in_path):
+            print("Arquivo não encontrado:", in_path)
+            continue
+        report = dedup_csv(in_path, out_path, "cnpj", args.policy, args.recency_column, args.chunksize)
+        if report is not None:
+            print(f"Registros antes ({label}):", report["rows_in"])
+            print(f"Registros depois ({label}):", report["rows_out"])
+            print_report(report)
+        print("Salvo:", out_path)
 
 if __name__ == "__main__":
     main()
@@ -3,27 +3,50 @@
 scripts/inspect.py
 
 Inspeciona os arquivos gerados pelo pipeline:
-- data_processed/empresas_api.csv        (com raw_json)
+- data_processed/empresas_api.csv        (raw_offset → linha do JSONL bruto; arquivos antigos: raw_json)
 - data_processed/empresas_api_clean.csv  (CSV enxuto)
 - data_processed/empresas_api_raw.jsonl  (JSONL com brutos)
 
 Gera um resumo (KPIs) e alguns extratos úteis: top UFs, top municípios, top CNAEs,
 contagem de erros, proporção encontradas vs não encontradas, amostra de sócios, etc.
 
+Modos:
+- exact:  carrega os arquivos inteiros (contagens exatas; só para arquivos pequenos)
+- stream: uma única passada em blocos com memória limitada; os tops usam contadores
+          Space-Saving de capacidade fixa (contagem aproximada com erro máximo conhecido)
+- auto:   exact se os arquivos somam menos que --max-exact-mb, senão stream
+
 Uso:
     cd PythonDev/projetos/cnpj_organizer_api
     python -m venv venv          # se ainda não tiver venv
     source venv/bin/activate
     pip install -r requirements.txt
     python scripts/inspect.py --folder data_processed --top 10
+    python scripts/inspect.py --folder data_processed --mode stream --chunksize 200000
 """
 
 import os
 import argparse
-import json
+import sys
 from collections import Counter
+import numpy as np
 import pandas as pd
 
+# permite importar src/ ao rodar "python scripts/inspect_data.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from src.dimensions import NORMALIZERS, encode_dimensions, top_counts
+from src.jsonl_io import DECODE_ERRORS, loads, map_shards
+
+# coluna que indica payload encontrado (raw_offset; raw_json em arquivos antigos)
+RAW_COLUMNS = ("raw_offset", "raw_json")
+
+TRUE_VALUES = ["true", "1", "yes"]
+SOCIO_KEYS = ("socios", "sócios", "socio", "sócio")
+SOCIO_SAMPLES = 10
+
 def load_data(folder):
     csv_all = os.path.join(folder, "empresas_api.csv")
     csv_clean = os.path.join(folder, "empresas_api_clean.csv")
@@ -31,38 +54,54 @@ def load_data(folder):
 
     df_all = pd.read_csv(csv_all, dtype=str) if os.path.exists(csv_all) else pd.DataFrame()
     df_clean = pd.read_csv(csv_clean, dtype=str) if os.path.exists(csv_clean) else pd.DataFrame()
+    # uf/municipio/cnae_fiscal como categorias: contagens sobre códigos inteiros
+    df_clean = encode_dimensions(df_clean)
+
+    # parse em paralelo por faixas do arquivo; cada processo devolve só o resumo da faixa
+    jsonl_info = summarize_jsonl(jsonl) if os.path.exists(jsonl) else summarize_records([])
+    return df_all, df_clean, jsonl_info
+
+def summarize_records(records):
+    """Resumo de uma faixa do JSONL: contagens e até SOCIO_SAMPLES sócios."""
+    socios = []
+    for obj in records:
+        if len(socios) >= SOCIO_SAMPLES:
+            break
+        socios.extend(socios_of(obj))
+    return {
+        "objects": len(records),
+        "malformed": sum(1 for obj in records if "_raw" in obj),  # linhas malformadas viram {"_raw": linha}
+        "socios": socios[:SOCIO_SAMPLES],
+    }
+
+def summarize_jsonl(jsonl, workers=None):
+    """Soma os resumos das faixas (map_shards), na ordem do arquivo."""
+    parts = map_shards(jsonl, summarize_records, workers=workers, on_error="raw")
+    return {
+        "objects": sum(p["objects"] for p in parts),
+        "malformed": sum(p["malformed"] for p in parts),
+        "socios": [s for p in parts for s in p["socios"]][:SOCIO_SAMPLES],
+    }
 
-    jsonl_objs = []
-    if os.path.exists(jsonl):
-        with open(jsonl, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    jsonl_objs.append(json.loads(line))
-                except Exception:
-                    # skip malformed lines but keep count
-                    jsonl_objs.append({"_raw": line})
-    return df_all, df_clean, jsonl_objs
-
-def kpis(df_all, df_clean, jsonl_objs):
+def kpis(df_all, df_clean, jsonl_info):
     total_queries = len(df_all)
     valid_format = df_all["valid_format"].fillna("").astype(str).str.lower().isin(["true","1","yes"]).sum() if "valid_format" in df_all else 0
     errors = df_all["error"].fillna("no_error").value_counts().to_dict() if "error" in df_all else {}
     found = df_all["error"].fillna("").apply(lambda x: 0 if x in ("not_found","invalid_format","http_404","") and x in ("not_found","invalid_format","") else 1).sum() if "error" in df_all else 0
-    # better: count where raw_json is not null
-    found2 = df_all["raw_json"].notna().sum() if "raw_json" in df_all else 0
+    # better: count where the raw payload is present
+    raw_col = next((c for c in RAW_COLUMNS if c in df_all), None)
+    found2 = df_all[raw_col].notna().sum() if raw_col else 0
 
     print("=== KPIs ===")
     print("Total queries:", total_queries)
     print("Valid format (local validator):", valid_format)
-    print("Found (raw_json present):", found2)
+    print("Found (raw payload present):", found2)
     try:
         pct_found = found2 / total_queries * 100 if total_queries > 0 else 0
     except Exception:
         pct_found = 0
     print(f"Percentual encontrado: {pct_found:.2f}%")
+    print(f"JSONL bruto: {jsonl_info['objects']} objetos ({jsonl_info['malformed']} linhas malformadas)")
     print("Erros (top):")
     for k,v in list(errors.items())[:10]:
         print(f"  {k}: {v}")
@@ -72,42 +111,31 @@ def top_values(df_clean, column, top=10):
     if column not in df_clean.columns:
         print(f"Coluna '{column}' não existe no CSV enxuto.")
         return
-    vc = df_clean[column].fillna("N/A").value_counts().head(top)
+    vc = top_counts(df_clean[column], top)
     print(f"Top {top} — {column}:")
     for idx, val in enumerate(vc.items(), start=1):
         k, v = val
         print(f"  {idx}. {k} — {v}")
     print()
 
-def extract_socios_from_jsonl(jsonl_objs, max_samples=5):
-    """
-    Procura pela chave 'socios' ou 'sócios' ou 'socios' em objetos e imprime os primeiros nomes encontrados.
-    """
-    encontrados = []
-    for obj in jsonl_objs:
-        if not isinstance(obj, dict):
-            continue
-        # procura chaves possíveis
-        socios = None
-        for key in ("socios","sócios","socio","sócio"):
-            if key in obj and isinstance(obj[key], list):
-                socios = obj[key]
-                break
-        # procura em sub-objeto estabelecimento
-        if socios is None and isinstance(obj.get("estabelecimento"), dict):
-            est = obj.get("estabelecimento")
-            if est is not None:
-                for key in ("socios","sócios","socios"):
-                    if key in est and isinstance(est[key], list):
-                        socios = est[key]
-                        break
-        if socios:
-            for s in socios:
-                nome = s.get("nome") or s.get("nome_socio") or s.get("nome_representante") or s.get("nome_completo")
-                cpf = s.get("cpf_cnpj_socio") or s.get("cpf") or s.get("cpf_cnpj")
-                encontrados.append({"nome": nome, "cpf_cnpj": cpf})
-        if len(encontrados) >= max_samples:
-            break
+def socios_of(obj):
+    """Sócios de um objeto da API (na raiz ou dentro de 'estabelecimento')."""
+    if not isinstance(obj, dict):
+        return []
+    for holder in (obj, obj.get("estabelecimento")):
+        if isinstance(holder, dict):
+            for key in SOCIO_KEYS:
+                if isinstance(holder.get(key), list):
+                    return [
+                        {
+                            "nome": s.get("nome") or s.get("nome_socio") or s.get("nome_representante") or s.get("nome_completo"),
+                            "cpf_cnpj": s.get("cpf_cnpj_socio") or s.get("cpf") or s.get("cpf_cnpj"),
+                        }
+                        for s in holder[key] if isinstance(s, dict)
+                    ]
+    return []
+
+def print_socios(encontrados, max_samples):
     if not encontrados:
         print("Nenhum sócio identificado nos JSONs (ou estrutura diferente).")
         return
@@ -120,20 +148,200 @@ def summary_by_cnae(df_clean, top=10):
     if "cnae_fiscal" not in df_clean.columns:
         print("Coluna cnae_fiscal não encontrada no CSV enxuto.")
         return
-    vc = df_clean["cnae_fiscal"].fillna("N/A").value_counts().head(top)
+    vc = top_counts(df_clean["cnae_fiscal"], top)
     print(f"Top {top} — CNAE fiscal:")
     for i, (k,v) in enumerate(vc.items(), start=1):
         print(f"  {i}. {k} — {v}")
     print()
 
+# ===============================
+# Modo streaming (memória limitada)
+# ===============================
+
+class SpaceSaving:
+    """
+    Contador de "heavy hitters" com no máximo 'capacity' chaves (Space-Saving).
+    Atualizações com peso (contagens já agregadas por bloco). Quando passa da
+    capacidade, ficam as 'capacity' maiores e o maior contador descartado vira o
+    piso: uma chave nova entra com piso + peso. Para cada chave mantida,
+    count - error <= contagem real <= count.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+        self.total = 0
+
+    def update(self, counts):
+        for value, weight in counts.items():
+            weight = int(weight)
+            self.total += weight
+            if value in self.counts:
+                self.counts[value] += weight
+            else:
+                self.counts[value] = self.floor + weight
+                self.errors[value] = self.floor
+        if len(self.counts) > self.capacity:
+            self._prune()
+
+    def _prune(self):
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        for value, count in ranked[self.capacity:]:
+            self.floor = max(self.floor, count)
+            del self.counts[value]
+            del self.errors[value]
+
+    def top(self, n=10):
+        """[(valor, contagem, erro máximo)] em ordem decrescente."""
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(value, count, self.errors[value]) for value, count in ranked]
+
+
+def chunk_counts(series, normalize=None, label=None):
+    """
+    Contagens de um bloco por valor (já agregadas); 'normalize' roda uma vez por
+    valor distinto do bloco (ex: nome da UF → sigla). Nulos contam como 'label'
+    (ou são ignorados quando label=None).
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    per_code = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    counts = Counter()
+    missing = int((codes < 0).sum())
+    for raw, n in zip(uniques, per_code):
+        value = normalize(raw) if normalize else raw
+        if value in (None, ""):
+            missing += int(n)
+        else:
+            counts[value] += int(n)
+    if missing and label is not None:
+        counts[label] += missing
+    return counts
+
+
+def read_header(path):
+    return pd.read_csv(path, dtype=str, nrows=0).columns.tolist()
+
+
+def stream_all(csv_all, chunksize, capacity):
+    """KPIs, erros e situação em uma passada; a coluna do bruto vira só um booleano por linha."""
+    stats = {"total": 0, "valid_format": 0, "found": 0}
+    errors = SpaceSaving(capacity)
+    situacao = SpaceSaving(capacity)
+
+    header = read_header(csv_all)
+    raw_col = next((c for c in RAW_COLUMNS if c in header), None)
+    usecols = [c for c in ("valid_format", "error", "situacao", raw_col) if c in header]
+    converters = {raw_col: lambda v: v != ""} if raw_col else None
+    dtype = {c: str for c in usecols if c != raw_col}
+    reader = pd.read_csv(csv_all, dtype=dtype, usecols=usecols, converters=converters, chunksize=chunksize)
+    for chunk in reader:
+        stats["total"] += len(chunk)
+        if "valid_format" in chunk:
+            stats["valid_format"] += int(chunk["valid_format"].fillna("").str.lower().isin(TRUE_VALUES).sum())
+        if raw_col:
+            stats["found"] += int(chunk[raw_col].sum())
+        if "error" in chunk:
+            errors.update(chunk_counts(chunk["error"], label="no_error"))
+        if "situacao" in chunk:
+            situacao.update(chunk_counts(chunk["situacao"], label="N/A"))
+    return stats, (errors if "error" in usecols else None), (situacao if "situacao" in usecols else None)
+
+
+def stream_clean(csv_clean, chunksize, capacity):
+    """Tops de uf/municipio/cnae_fiscal (valores canônicos das dimensões) em uma passada."""
+    header = read_header(csv_clean)
+    columns = [c for c in ("uf", "municipio", "cnae_fiscal") if c in header]
+    counters = {c: SpaceSaving(capacity) for c in columns}
+    if not columns:
+        return counters
+    for chunk in pd.read_csv(csv_clean, dtype=str, usecols=columns, chunksize=chunksize):
+        for col in columns:
+            counters[col].update(chunk_counts(chunk[col], NORMALIZERS[col], label="N/A"))
+    return counters
+
+
+def stream_socios(jsonl, max_samples):
+    """Lê o JSONL linha a linha e para assim que a amostra de sócios está completa."""
+    encontrados = []
+    with open(jsonl, "rb") as f:
+        for line in f:
+            if b"socio" not in line and "sócio".encode() not in line:
+                continue  # evita o parse de linhas sem sócios
+            try:
+                obj = loads(line)
+            except DECODE_ERRORS:
+                continue
+            encontrados.extend(socios_of(obj))
+            if len(encontrados) >= max_samples:
+                break
+    return encontrados
+
+
+def print_counter(title, counter, top):
+    approx = counter.floor > 0
+    print(f"{title}" + (" (aproximado: ± erro máximo)" if approx else "") + ":")
+    for i, (k, v, err) in enumerate(counter.top(top), start=1):
+        print(f"  {i}. {k} — {v}" + (f" (±{err})" if err else ""))
+    print()
+
+
+def run_stream(folder, top, chunksize=100_000, capacity=1000):
+    csv_all = os.path.join(folder, "empresas_api.csv")
+    csv_clean = os.path.join(folder, "empresas_api_clean.csv")
+    jsonl = os.path.join(folder, "empresas_api_raw.jsonl")
+
+    if not os.path.exists(csv_all):
+        print("Arquivo empresas_api.csv não encontrado ou vazio em", folder)
+        return
+    stats, errors, situacao = stream_all(csv_all, chunksize, capacity)
+    if not stats["total"]:
+        print("Arquivo empresas_api.csv não encontrado ou vazio em", folder)
+        return
+    print(f"Leitura em streaming (blocos de {chunksize} linhas). Registros totais: {stats['total']}")
+    print()
+
+    print("=== KPIs ===")
+    print("Total queries:", stats["total"])
+    print("Valid format (local validator):", stats["valid_format"])
+    print("Found (raw payload present):", stats["found"])
+    print(f"Percentual encontrado: {stats['found'] / stats['total'] * 100:.2f}%")
+    if errors is not None:
+        print("Erros (top):")
+        for k, v, err in errors.top(10):
+            print(f"  {k}: {v}" + (f" (±{err})" if err else ""))
+    print()
+
+    if os.path.exists(csv_clean):
+        counters = stream_clean(csv_clean, chunksize, capacity)
+        titles = {"uf": f"Top {top} — uf", "municipio": f"Top {top} — municipio", "cnae_fiscal": f"Top {top} — CNAE fiscal"}
+        for col, counter in counters.items():
+            print_counter(titles[col], counter, top)
+    else:
+        print("CSV enxuto não encontrado — pulei top UFs/municípios/CNAE.")
+        print()
+
+    if situacao is not None:
+        print_counter("Distribuição de 'situacao'", situacao, top)
+
+    print_socios(stream_socios(jsonl, 10) if os.path.exists(jsonl) else [], 10)
+
+
+def total_size_mb(folder):
+    names = ("empresas_api.csv", "empresas_api_clean.csv", "empresas_api_raw.jsonl")
+    paths = [os.path.join(folder, n) for n in names]
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p)) / (1 << 20)
+
+
 def run(folder, top):
-    df_all, df_clean, jsonl_objs = load_data(folder)
+    df_all, df_clean, jsonl_info = load_data(folder)
     if df_all.empty:
         print("Arquivo empresas_api.csv não encontrado ou vazio em", folder)
         return
     print(f"Arquivos carregados. Registros totais: {len(df_all)}")
     print()
-    kpis(df_all, df_clean, jsonl_objs)
+    kpis(df_all, df_clean, jsonl_info)
 
     # top UFs / Municípios / CNAE
     if not df_clean.empty:
@@ -150,12 +358,24 @@ def run(folder, top):
         print(df_all["situacao"].fillna("N/A").value_counts().head(top))
         print()
 
-    # extrair sócios (amostra)
-    extract_socios_from_jsonl(jsonl_objs, max_samples=10)
+    # sócios (amostra, já extraída por faixa em summarize_jsonl)
+    print_socios(jsonl_info["socios"], SOCIO_SAMPLES)
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--folder", "-f", default="data_processed", help="Pasta com os arquivos gerados")
     p.add_argument("--top", type=int, default=10, help="Quantos top itens mostrar")
+    p.add_argument("--mode", choices=["auto", "exact", "stream"], default="auto",
+                   help="exact carrega tudo; stream lê em blocos com memória limitada")
+    p.add_argument("--max-exact-mb", type=float, default=256, help="Limite do modo auto para usar exact")
+    p.add_argument("--chunksize", type=int, default=100_000, help="Linhas por bloco no modo stream")
+    p.add_argument("--capacity", type=int, default=1000, help="Chaves por contador Space-Saving no modo stream")
     args = p.parse_args()
-    run(args.folder, args.top)
+
+    mode = args.mode
+    if mode == "auto":
+        mode = "exact" if total_size_mb(args.folder) < args.max_exact_mb else "stream"
+    if mode == "stream":
+        run_stream(args.folder, args.top, args.chunksize, args.capacity)
+    else:
+        run(args.folder, args.top)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+scripts/lead_service_loadtest.py
+
+Teste de carga do serviço de leads (src/lead_service.py).
+
+Dispara consultas aleatórias (filtros de UF, CNAE, contato, classificação,
+paginação e agregações) a partir de N threads com conexões keep-alive durante
+alguns segundos e mede a latência de cada requisição: p50, p95, p99 e vazão.
+
+Uso:
+    # contra um serviço já rodando
+    python scripts/lead_service_loadtest.py --url http://127.0.0.1:8080 --threads 8 --duration 10
+
+    # sobe o serviço no próprio processo (porta livre) sobre a tabela final
+    python scripts/lead_service_loadtest.py --spawn --input data_processed/leads_b2b_final.parquet
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import threading
+import time
+import http.client
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+# permite importar src/ ao rodar "python scripts/lead_service_loadtest.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+UFS = ["SP", "SC", "RJ", "MG", "PR", "RS", "BA", "PE"]
+CNAES = ["62", "47", "4711", "56", "1412", "8211", "6201501", "43"]
+CLASSES = ["PRIORITÁRIO", "BOM", "MÉDIO"]
+AGGREGATES = ["uf", "municipio", "cnae_secao", "lead_classification"]
+
+
+def random_request(rng: random.Random):
+    """Uma consulta aleatória (caminho + query string)."""
+    params = {}
+    if rng.random() < 0.7:
+        params["uf"] = ",".join(rng.sample(UFS, rng.randint(1, 2)))
+    if rng.random() < 0.6:
+        params["cnae"] = rng.choice(CNAES)
+    if rng.random() < 0.3:
+        params["only_contact"] = "1"
+    if rng.random() < 0.3:
+        params["classification"] = rng.choice(CLASSES)
+
+    if rng.random() < 0.25:
+        params["by"] = rng.choice(AGGREGATES)
+        return "/aggregate?" + urlencode(params)
+    params["page"] = rng.randint(1, 3)
+    params["page_size"] = rng.choice([20, 50, 100])
+    return "/leads?" + urlencode(params)
+
+
+def worker(host, port, deadline, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local = []
+    while time.perf_counter() < deadline:
+        path = random_request(rng)
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local.append(time.perf_counter() - started)
+    conn.close()
+    latencies.extend(local)
+
+
+def run_load(url, threads=8, duration=10.0, seed=42):
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+
+    started = time.perf_counter()
+    pool = [
+        threading.Thread(target=worker, args=(parts.hostname, parts.port or 80, deadline, seed + i, latencies, errors))
+        for i in range(threads)
+    ]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "requests": int(len(lat_ms)),
+        "errors": len(errors),
+        "threads": threads,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(lat_ms) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(float(np.percentile(lat_ms, 50)), 2) if len(lat_ms) else None,
+        "p95_ms": round(float(np.percentile(lat_ms, 95)), 2) if len(lat_ms) else None,
+        "p99_ms": round(float(np.percentile(lat_ms, 99)), 2) if len(lat_ms) else None,
+        "max_ms": round(float(lat_ms.max()), 2) if len(lat_ms) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de leads")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Endereço do serviço")
+    parser.add_argument("--spawn", action="store_true", help="Sobe o serviço neste processo")
+    parser.add_argument("--input", default=None, help="Tabela final usada com --spawn")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.spawn:
+        from src import storage
+        from src.lead_service import make_server, FINAL_TABLE, CLASSIFIED_TABLE
+
+        server = make_server(args.input or storage.path(FINAL_TABLE), port=0,
+                             classified_path=storage.path(CLASSIFIED_TABLE))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"🚀 Serviço iniciado em {url} ({server.holder.current.index.rows} linhas)")
+
+    print(f"🔹 Carga: {args.threads} threads por {args.duration:.0f}s contra {url}")
+    result = run_load(url, args.threads, args.duration, args.seed)
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    print("\n=== Resultado ===")
+    for k, v in result.items():
+        print(f"{k:>15}: {v}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"📁 Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,17 @@ normalize_columns.py
 - Salva novo CSV: data_processed/empresas_api_clean_norm.csv
 """
 
-import ast
-import json
 import os
+import sys
 import pandas as pd
 
+# permite importar src/ ao rodar "python scripts/normalize_columns.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from src.utils import map_unique, parse_dict_repr
+
 IN_PATH = os.path.join("data_processed", "empresas_api_clean.csv")
 OUT_PATH = os.path.join("data_processed", "empresas_api_clean_norm.csv")
 
@@ -29,23 +35,11 @@ def parse_maybe_dict(s):
     if not s:
         return None
 
-    # tenta literal_eval para strings com aspas simples (representação Python)
-    if s.startswith("{") and ("'" in s):
-        try:
-            d = ast.literal_eval(s)
-            if isinstance(d, dict):
-                return d.get("sigla") or d.get("nome") or d.get("descricao") or str(d)
-        except Exception:
-            pass
-
-    # tenta json.loads para strings com aspas duplas
-    if s.startswith("{") and ('"' in s):
-        try:
-            d = json.loads(s)
-            if isinstance(d, dict):
-                return d.get("sigla") or d.get("nome") or d.get("descricao") or str(d)
-        except Exception:
-            pass
+    # repr Python (aspas simples) ou JSON (aspas duplas), com parser memoizado
+    if s.startswith("{"):
+        d = parse_dict_repr(s)
+        if d is not None:
+            return d.get("sigla") or d.get("nome") or d.get("descricao") or str(d)
 
     # se não for dict, retorna a string original (possivelmente já está ok)
     return s
@@ -58,9 +52,9 @@ def main():
 
     # aplica parse_maybe_dict nas colunas, só se existirem
     if "uf" in df.columns:
-        df["uf_norm"] = df["uf"].apply(parse_maybe_dict)
+        df["uf_norm"] = map_unique(df["uf"], parse_maybe_dict)
     if "municipio" in df.columns:
-        df["municipio_norm"] = df["municipio"].apply(parse_maybe_dict)
+        df["municipio_norm"] = map_unique(df["municipio"], parse_maybe_dict)
 
     # grava resultado
     df.to_csv(OUT_PATH, index=False)
@@ -9,9 +9,17 @@ plots.py
 """
 
 import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
+# permite importar src/ ao rodar "python scripts/plots.py"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from src.dimensions import new_dimension, top_counts
+
 IN_PATH = os.path.join("data_processed", "empresas_api_clean_norm.csv")
 OUT_DIR = "data_processed"
 
@@ -34,7 +42,7 @@ def main():
 
     # Top UFs
     if "uf_norm" in df.columns:
-        top_ufs = df["uf_norm"].fillna("N/A").value_counts().head(20)
+        top_ufs = top_counts(new_dimension("uf").encode(df["uf_norm"]), 20)
         safe_plot_bar(top_ufs, "Top UFs", os.path.join(OUT_DIR, "top_ufs.png"), xlabel="UF")
 
     # Situação (pie)
@@ -48,7 +56,7 @@ def main():
 
     # Top CNAEs
     if "cnae_fiscal" in df.columns:
-        top_cnaes = df["cnae_fiscal"].fillna("N/A").value_counts().head(20)
+        top_cnaes = top_counts(new_dimension("cnae_fiscal").encode(df["cnae_fiscal"]), 20)
         safe_plot_bar(top_cnaes, "Top CNAEs", os.path.join(OUT_DIR, "top_cnaes.png"), xlabel="CNAE")
     else:
         print("Coluna cnae_fiscal não encontrada - pulando gráfico de CNAE.")
@@ -2,8 +2,9 @@
 import os
 import sys
 import argparse
-import json
+import asyncio
 import pandas as pd
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 # garante imports funcionarem quando executado como script dentro da pasta src/
@@ -11,8 +12,13 @@ ROOT = os.path.dirname(os.path.abspath(__file__))
 if ROOT not in sys.path:
     sys.path.append(ROOT)
 
-from fetch_api import fetch_batch
+from fetch_api import fetch_batch, iter_fetch_batch, fetch_batch_local, iter_fetch_local
+from fetch_async import fetch_batch_asyncio, iter_fetch_async
+from fetch_cache import CnpjCache, DAY
+from fetch_checkpoint import FetchCheckpoint, ResultWriter, iter_results
+from api_projector import ApiProjector, MAIN_SCHEMA, RAW_FILE, SOCIOS_FILE
 from utils import only_digits, validate_cnpj
+import metrics
 
 # --------------------------
 # Leitura e limpeza da entrada
@@ -42,139 +48,175 @@ def read_input_file(path):
     return cleaned
 
 # --------------------------
-# Função utilitária para extrair valores do JSON
+# Projeção dos resultados em colunas
 # --------------------------
-def safe_get(data: dict, *keys, default=None):
-    """
-    Tenta várias chaves no dicionário 'data'. Retorna o primeiro valor não-None.
-    Também busca em sub-objetos comuns (ex: 'estabelecimento', 'empresa').
-    """
-    if not data:
-        return default
-    # busca direta
-    for k in keys:
-        if isinstance(data, dict) and k in data and data[k] not in (None, ""):
-            return data[k]
-    # busca em sub-objetos comuns
-    for sub in ("estabelecimento", "estabelecimentos", "empresa", "data"):
-        subobj = data.get(sub) if isinstance(data.get(sub), dict) else None
-        if subobj:
-            for k in keys:
-                if k in subobj and subobj[k] not in (None, ""):
-                    return subobj[k]
-    return default
+CLEAN_COLUMNS = ["query","cnpj","valid_format","error","razao_social","nome_fantasia","municipio","uf","bairro","logradouro","numero","cep","telefone","email","situacao","cnae_fiscal"]
 
-# --------------------------
-# Transformação dos resultados em DataFrame
-# --------------------------
 def transform_results_to_df(results):
     """
     Transforma a lista de dicionários retornada por fetch_batch em um DataFrame pandas.
-    - Mantém 'raw_json' com o JSON completo (string) para auditoria.
-    - Tenta extrair campos comuns para colunas separadas.
+    Os campos são extraídos por api_projector (plano compilado por formato de JSON);
+    o JSON bruto não fica na tabela: use ApiProjector(output_folder) para gravá-lo à parte.
     """
-    rows = []
-    for r in results:
-        data = r.get("data") or {}
-        base = {
-            "query": r.get("query"),
-            "cnpj": r.get("cnpj"),
-            "valid_format": r.get("valid_format"),
-            "error": r.get("error"),
-            # salva o JSON original como string (evita perda de dados)
-            "raw_json": json.dumps(data, ensure_ascii=False) if data else None,
-        }
-
-        # heurística para extrair campos com chaves diferentes dependendo da API
-        base.update({
-            "razao_social": safe_get(data, "razao_social", "nome", "nome_empresa", "nome_razao"),
-            "nome_fantasia": safe_get(data, "nome_fantasia", "fantasia"),
-            "municipio": safe_get(data, "municipio", "cidade"),
-            "uf": safe_get(data, "uf", "estado"),
-            "bairro": safe_get(data, "bairro"),
-            "logradouro": safe_get(data, "logradouro", "rua"),
-            "numero": safe_get(data, "numero", "nro"),
-            "cep": safe_get(data, "cep"),
-            "telefone": safe_get(data, "telefone", "telefone1", "telefone_principal"),
-            "email": safe_get(data, "email"),
-            "situacao": safe_get(data, "situacao", "situacao_cadastral", "status"),
-            "cnae_fiscal": safe_get(data, "cnae_fiscal", "atividade_principal")
-        })
-        rows.append(base)
-    df = pd.DataFrame(rows)
-    return df
+    return ApiProjector().project(results).to_pandas()
 
-# --------------------------
-# Função que cria CSV limpo e JSONL
-# --------------------------
-def save_clean_and_jsonl(df: pd.DataFrame, output_folder: str):
+def save_clean_csv(df: pd.DataFrame, output_folder: str, append=False):
     """
-    Recebe DataFrame (com coluna raw_json) e gera:
-    - empresas_api_clean.csv: CSV enxuto com colunas selecionadas
-    - empresas_api_raw.jsonl: cada linha é um JSON com o objeto original
+    Gera empresas_api_clean.csv (CSV enxuto com colunas selecionadas).
+    Com append=True, acrescenta ao arquivo existente (escrita em blocos).
     """
     os.makedirs(output_folder, exist_ok=True)
-    # colunas úteis para CSV enxuto
-    cols = ["query","cnpj","valid_format","error","razao_social","nome_fantasia","municipio","uf","bairro","logradouro","numero","cep","telefone","email","situacao","cnae_fiscal"]
-    cols_existing = [c for c in cols if c in df.columns]
+    cols_existing = [c for c in CLEAN_COLUMNS if c in df.columns]
     clean_path = os.path.join(output_folder, "empresas_api_clean.csv")
-    df[cols_existing].to_csv(clean_path, index=False)
-    print("✔ Salvo CSV enxuto:", clean_path)
-
-    # salvar JSONL com os raw_json (um JSON por linha)
-    jsonl_path = os.path.join(output_folder, "empresas_api_raw.jsonl")
-    with open(jsonl_path, "w", encoding="utf-8") as fout:
-        for raw in df.get("raw_json", pd.Series()).dropna():
-            try:
-                # se raw já é string JSON, parse e re-dump para garantir formatação consistente
-                obj = json.loads(raw)
-                fout.write(json.dumps(obj, ensure_ascii=False))
-                fout.write("\n")
-            except Exception:
-                # se falhar no parse, grava a string bruta para não perder informação
-                fout.write(json.dumps({"raw": raw}, ensure_ascii=False))
-                fout.write("\n")
-    print("✔ Salvo JSONL com brutos:", jsonl_path)
+    df[cols_existing].to_csv(clean_path, index=False, mode="a" if append else "w", header=not append)
+    if not append:
+        print("✔ Salvo CSV enxuto:", clean_path)
+
+# --------------------------
+# Modo streaming (retomável)
+# --------------------------
+def fetch_streaming(queries, output_folder, max_workers, delay, mode, rate, burst, cache, resume, base_url=None):
+    """
+    Busca gravando cada resultado em empresas_api_results.jsonl assim que termina,
+    com checkpoint periódico dos CNPJs concluídos. Com resume=True, pula o que o
+    checkpoint já registra e continua acrescentando ao mesmo JSONL.
+    """
+    results_path = os.path.join(output_folder, "empresas_api_results.jsonl")
+    checkpoint_path = os.path.join(output_folder, "empresas_api_checkpoint.npy")
+
+    checkpoint = FetchCheckpoint(checkpoint_path, resume=resume, results_path=results_path)
+    pending = checkpoint.pending(queries)
+    if resume:
+        print(f"⏩ Retomando: {len(queries) - len(pending)} queries já concluídas, {len(pending)} pendentes")
+
+    with ResultWriter(results_path, checkpoint, append=resume) as writer:
+        if mode == "local":
+            for res in tqdm(iter_fetch_local(pending), total=len(pending)):
+                writer.write(res)
+        elif mode == "async":
+            async def consume():
+                async for res in iter_fetch_async(pending, max_in_flight=max_workers, rate=rate, burst=burst,
+                                                  cache=cache, base_url=base_url):
+                    writer.write(res)
+            asyncio.run(consume())
+        else:
+            for res in tqdm(iter_fetch_batch(pending, max_workers, delay, cache, base_url), total=len(pending)):
+                writer.write(res)
+
+    print(f"✔ {writer.written} resultados gravados em {results_path}")
+    return results_path, checkpoint
+
+def finalize_streaming(results_path, output_folder, checkpoint, chunk_size=50_000):
+    """
+    Converte o JSONL de resultados nos mesmos arquivos do modo em lote
+    (CSV completo, Parquet, CSV enxuto, sócios e JSONL bruto), bloco a bloco.
+    O esquema é fixo (api_projector.MAIN_SCHEMA), igual em todos os blocos.
+    """
+    csv_path = os.path.join(output_folder, "empresas_api.csv")
+    parquet_path = os.path.join(output_folder, "empresas_api.parquet")
+
+    first = True
+    with ApiProjector(output_folder) as projector, pq.ParquetWriter(parquet_path, MAIN_SCHEMA) as writer:
+        for chunk in iter_results(results_path, chunk_size, checkpoint):
+            table = projector.project(chunk)
+            writer.write_table(table)
+            df = table.to_pandas()
+            df.to_csv(csv_path, index=False, mode="w" if first else "a", header=first)
+            save_clean_csv(df, output_folder, append=not first)
+            first = False
+    return csv_path, parquet_path
 
 # --------------------------
 # MAIN
 # --------------------------
-def main(input_path, output_folder, max_workers, delay):
+def main(input_path, output_folder, max_workers, delay, mode="threads", rate=10.0, burst=20,
+         cache_path=None, cache_ttl_days=7.0, cache_max_mb=512, stream=False, resume=False,
+         profile=None, metrics_textfile=None, base_url=None):
     os.makedirs(output_folder, exist_ok=True)
+    metrics.start_run(mode=f"fetch-{mode}", profile=profile, report_dir=os.path.join(output_folder, "run_reports"))
+    if fetch_and_save(input_path, output_folder, max_workers, delay, mode, rate, burst,
+                      cache_path, cache_ttl_days, cache_max_mb, stream, resume, base_url):
+        metrics.finish_run(metrics_textfile)
+
+
+def fetch_and_save(input_path, output_folder, max_workers, delay, mode, rate, burst,
+                   cache_path, cache_ttl_days, cache_max_mb, stream, resume, base_url=None):
+    """Busca + gravação das saídas; etapas medidas em metrics ("fetch", "project"). False se a entrada estiver vazia."""
     print("📥 Lendo arquivo de entrada:", input_path)
     queries = read_input_file(input_path)
     if not queries:
         print("⚠️ Arquivo de entrada vazio.")
-        return
-
-    print(f"🔎 Iniciando buscas para {len(queries)} queries (max_workers={max_workers})")
-    results = fetch_batch(queries, max_workers=max_workers, delay_between_requests=delay)
-
-    print("🧰 Transformando resultados em DataFrame...")
-    df = transform_results_to_df(results)
-
-    # garantir cnpj com 14 dígitos (ou string vazia)
-    if "cnpj" in df.columns:
-        df["cnpj"] = df["cnpj"].fillna("").apply(lambda s: s if s == "" else str(s).zfill(14))
-
-    csv_path = os.path.join(output_folder, "empresas_api.csv")
-    parquet_path = os.path.join(output_folder, "empresas_api.parquet")
-
-    print("💾 Salvando CSV e Parquet (com raw_json)...")
-    df.to_csv(csv_path, index=False)
-    try:
-        df.to_parquet(parquet_path, index=False)
-    except Exception as e:
-        print("⚠️ Erro salvando parquet:", e)
-
-    # salvar CSV enxuto e JSONL com brutos
-    save_clean_and_jsonl(df, output_folder)
+        return False
+
+    cache = None
+    if cache_path and mode != "local":
+        cache = CnpjCache(cache_path, ttl=cache_ttl_days * DAY, max_bytes=int(cache_max_mb * 1024 * 1024))
+        print("🗄️ Cache de respostas:", cache_path)
+
+    print(f"🔎 Iniciando buscas para {len(queries)} queries (modo={mode}, max_workers={max_workers})")
+    if stream or resume:
+        with metrics.stage("fetch") as st:
+            results_path, checkpoint = fetch_streaming(
+                queries, output_folder, max_workers, delay, mode, rate, burst, cache, resume, base_url
+            )
+            st.count(rows_in=len(queries))
+        if cache is not None:
+            print("🗄️ Cache:", cache.stats())
+            cache.close()
+
+        print("💾 Gerando CSV, Parquet e JSONL a partir dos resultados (em blocos)...")
+        with metrics.stage("project"):
+            csv_path, parquet_path = finalize_streaming(results_path, output_folder, checkpoint)
+        print("✅ Pronto.")
+        print("CSV completo:", csv_path)
+        print("PARQUET:", parquet_path)
+        print("JSONL de resultados:", results_path)
+        return True
+
+    with metrics.stage("fetch") as st:
+        if mode == "local":
+            # dump oficial da Receita carregado por receita_bulk.py (sem rede)
+            results = fetch_batch_local(queries)
+        elif mode == "async":
+            # no modo assíncrono, max_workers é a janela de requisições em andamento
+            results = fetch_batch_asyncio(queries, max_in_flight=max_workers, rate=rate, burst=burst, cache=cache,
+                                          base_url=base_url)
+        else:
+            results = fetch_batch(queries, max_workers=max_workers, delay_between_requests=delay, cache=cache,
+                                  base_url=base_url)
+        st.count(len(queries), sum(1 for r in results if r.get("data")))
+
+    if cache is not None:
+        print("🗄️ Cache:", cache.stats())
+        cache.close()
+
+    with metrics.stage("project") as st:
+        print("🧰 Projetando resultados em colunas (JSON bruto e sócios à parte)...")
+        with ApiProjector(output_folder) as projector:
+            table = projector.project(results)
+        df = table.to_pandas()
+
+        csv_path = os.path.join(output_folder, "empresas_api.csv")
+        parquet_path = os.path.join(output_folder, "empresas_api.parquet")
+
+        print("💾 Salvando CSV e Parquet (raw_offset aponta para o JSONL bruto)...")
+        df.to_csv(csv_path, index=False)
+        try:
+            pq.write_table(table, parquet_path)
+        except Exception as e:
+            print("⚠️ Erro salvando parquet:", e)
+
+        # salvar CSV enxuto
+        save_clean_csv(df, output_folder)
+        st.count(results, df)
 
     print("✅ Pronto.")
     print("CSV completo:", csv_path)
     print("PARQUET:", parquet_path)
     print("CSV enxuto:", os.path.join(output_folder, "empresas_api_clean.csv"))
-    print("JSONL bruto:", os.path.join(output_folder, "empresas_api_raw.jsonl"))
+    print("JSONL bruto:", os.path.join(output_folder, RAW_FILE))
+    print("Sócios:", os.path.join(output_folder, SOCIOS_FILE + ".parquet"))
+    return True
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Organizador de Empresas via API - fetch CNPJs")
@@ -182,5 +224,20 @@ if __name__ == "__main__":
     p.add_argument("--output", "-o", default="../data_processed", help="Pasta de saída")
     p.add_argument("--workers", "-w", type=int, default=6, help="Número de threads paralelas")
     p.add_argument("--delay", "-d", type=float, default=0.05, help="Delay entre requisições (s)")
+    p.add_argument("--mode", "-m", choices=["threads", "async", "local"], default="threads", help="Modo de busca: threads (ThreadPool), async (asyncio) ou local (dump da Receita carregado por receita_bulk.py)")
+    p.add_argument("--base-url", default=None, help="Servidor da API (padrão: $CNPJ_API_BASE_URL ou publica.cnpj.ws); ex.: http://127.0.0.1:8000 para o mock local")
+    p.add_argument("--rate", type=float, default=10.0, help="Modo async: requisições por segundo (token bucket)")
+    p.add_argument("--burst", type=int, default=20, help="Modo async: rajada máxima do token bucket")
+    p.add_argument("--cache", default=None, help="Arquivo SQLite do cache de respostas (padrão: <output>/cnpj_cache.sqlite)")
+    p.add_argument("--no-cache", action="store_true", help="Desativa o cache de respostas")
+    p.add_argument("--cache-ttl", type=float, default=7.0, help="Validade das entradas do cache (dias)")
+    p.add_argument("--cache-max-mb", type=float, default=512, help="Tamanho máximo do cache (MB)")
+    p.add_argument("--stream", action="store_true", help="Grava cada resultado em JSONL assim que termina, com checkpoint")
+    p.add_argument("--resume", action="store_true", help="Retoma uma execução --stream interrompida (pula o que já foi concluído)")
+    p.add_argument("--profile", nargs="?", const="cprofile", choices=metrics.PROFILERS, default=None, help="Grava um trace por etapa em <output>/run_reports/<execução>/")
+    p.add_argument("--metrics-textfile", default=None, help="Também grava as métricas das etapas neste arquivo .prom (Prometheus)")
     args = p.parse_args()
-    main(args.input, args.output, args.workers, args.delay)
+    cache_path = None if args.no_cache else (args.cache or os.path.join(args.output, "cnpj_cache.sqlite"))
+    main(args.input, args.output, args.workers, args.delay, args.mode, args.rate, args.burst,
+         cache_path, args.cache_ttl, args.cache_max_mb, args.stream, args.resume,
+         args.profile, args.metrics_textfile, args.base_url)
@@ -0,0 +1,255 @@
+# src/api_projector.py
+"""
+Projeção colunar dos JSONs da API (substitui o safe_get por linha).
+
+- O esquema (coluna → aliases, na ordem de preferência) é fixo; para cada "forma"
+  de payload (chaves da raiz + chaves dos sub-objetos estabelecimento/empresa/...)
+  é compilado uma única vez um plano com os caminhos que existem naquela forma.
+  Payloads da mesma fonte têm a mesma forma, então o plano sai do cache e a
+  extração é só indexação de dict
+- A saída são colunas Arrow (texto), com o esquema fixo em todos os blocos
+- Sócios vão para uma tabela separada (empresas_api_socios), uma linha por sócio
+- O JSON bruto vai para empresas_api_raw.jsonl; a tabela principal guarda só
+  o offset em bytes da linha (raw_offset), lido sob demanda com read_raw
+"""
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from jsonl_io import JsonlWriter, loads
+
+RAW_FILE = "empresas_api_raw.jsonl"
+SOCIOS_FILE = "empresas_api_socios"
+
+# sub-objetos onde os campos também são procurados (mesma ordem do antigo safe_get)
+SUBOBJECTS = ("estabelecimento", "estabelecimentos", "empresa", "data")
+
+# (coluna, aliases, chaves usadas quando o valor é um objeto: ex. cidade → nome)
+FIELDS = [
+    ("razao_social", ("razao_social", "nome", "nome_empresa", "nome_razao"), ()),
+    ("nome_fantasia", ("nome_fantasia", "fantasia"), ()),
+    ("municipio", ("municipio", "cidade"), ("nome",)),
+    ("uf", ("uf", "estado"), ("sigla", "nome")),
+    ("bairro", ("bairro",), ()),
+    ("logradouro", ("logradouro", "rua"), ()),
+    ("numero", ("numero", "nro"), ()),
+    ("cep", ("cep",), ()),
+    ("telefone", ("telefone", "telefone1", "telefone_principal"), ()),
+    ("email", ("email",), ()),
+    ("situacao", ("situacao", "situacao_cadastral", "status"), ()),
+    ("cnae_fiscal", ("cnae_fiscal", "atividade_principal"), ("id", "subclasse", "codigo", "code")),
+    # campos do estabelecimento/empresa que antes só existiam dentro do raw_json
+    ("ddd", ("ddd1", "ddd_telefone_1", "ddd"), ()),
+    ("tipo", ("tipo", "descricao_identificador_matriz_filial"), ()),
+    ("data_inicio_atividade", ("data_inicio_atividade",), ()),
+    ("porte", ("porte", "descricao_porte"), ("descricao",)),
+    ("natureza_juridica", ("natureza_juridica",), ("descricao", "id")),
+    ("capital_social", ("capital_social",), ()),
+]
+
+SOCIO_LISTS = ("socios", "sócios", "qsa")
+SOCIO_FIELDS = [
+    ("nome", ("nome", "nome_socio", "nome_representante", "nome_completo"), ()),
+    ("cpf_cnpj", ("cpf_cnpj_socio", "cnpj_cpf_do_socio", "cpf", "cpf_cnpj"), ()),
+    ("qualificacao", ("qualificacao_socio", "qualificacao"), ("descricao", "id")),
+    ("data_entrada", ("data_entrada", "data_entrada_sociedade"), ()),
+    ("faixa_etaria", ("faixa_etaria",), ("descricao",)),
+]
+
+MAIN_SCHEMA = pa.schema(
+    [pa.field("query", pa.string()), pa.field("cnpj", pa.string()),
+     pa.field("valid_format", pa.bool_()), pa.field("error", pa.string())]
+    + [pa.field(name, pa.string()) for name, _, _ in FIELDS]
+    + [pa.field("raw_offset", pa.int64())]
+)
+SOCIOS_SCHEMA = pa.schema(
+    [pa.field("cnpj", pa.string())] + [pa.field(name, pa.string()) for name, _, _ in SOCIO_FIELDS]
+)
+
+_EMPTY = (None, "")
+
+
+# ===============================
+# Planos de extração
+# ===============================
+
+def shape_of(data: dict):
+    """Chaves da raiz + chaves de cada sub-objeto não vazio: identifica a fonte/formato."""
+    subs = tuple((sub, tuple(data[sub])) for sub in SUBOBJECTS
+                 if isinstance(data.get(sub), dict) and data[sub])
+    return tuple(data), subs
+
+
+def compile_plan(shape, fields):
+    """
+    Para cada coluna, os caminhos (sub-objeto ou None, chave) que existem nesta
+    forma, na ordem de preferência: aliases na raiz, depois nos sub-objetos.
+    """
+    top, subs = shape
+    top = set(top)
+    plan = []
+    for name, aliases, flatten in fields:
+        paths = [(None, k) for k in aliases if k in top]
+        for sub, keys in subs:
+            keys = set(keys)
+            paths.extend((sub, k) for k in aliases if k in keys)
+        plan.append((name, tuple(paths), flatten))
+    return plan
+
+
+def _text(value, flatten):
+    """Valor final da coluna: objetos viram o campo indicado em 'flatten'; vazios viram None."""
+    if isinstance(value, list) and flatten:
+        # ex: atividade_principal como lista de objetos (ReceitaWS): vale o primeiro
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        for k in flatten:
+            if value.get(k):
+                value = value[k]
+                break
+        else:
+            return str(value) if not flatten else None
+    if value in _EMPTY or value != value:  # None, "" ou NaN
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _column(objs, paths, flatten):
+    """
+    Uma coluna inteira para objetos da mesma forma: lista do primeiro caminho,
+    completada pelos caminhos seguintes só onde ficou vazia.
+    """
+    values = None
+    for sub, key in paths:
+        got = [o[key] for o in objs] if sub is None else [o[sub][key] for o in objs]
+        if values is None:
+            values = got
+        else:
+            values = [v if v not in _EMPTY and v == v else g for v, g in zip(values, got)]
+    if values is None:
+        return [None] * len(objs)
+    return [v if type(v) is str and v else _text(v, flatten) for v in values]
+
+
+class ApiProjector:
+    """
+    Converte blocos de resultados de fetch_cnpj em tabelas Arrow. Os planos
+    compilados ficam em cache durante toda a vida do projetor.
+    Com output_folder, grava os JSONs brutos (raw_offset) e a tabela de sócios.
+    """
+
+    def __init__(self, output_folder=None):
+        self.plans = {}
+        self.socio_plans = {}
+        self.output_folder = output_folder
+        self._raw = None
+        self._socios = None
+        if output_folder:
+            os.makedirs(output_folder, exist_ok=True)
+            self._raw = JsonlWriter(os.path.join(output_folder, RAW_FILE))
+            self.socios_path = os.path.join(output_folder, SOCIOS_FILE + ".parquet")
+            self._socios = pq.ParquetWriter(self.socios_path, SOCIOS_SCHEMA)
+
+    def _columns(self, objs, fields, cache):
+        """
+        Colunas (listas, na ordem de 'fields') para uma lista de objetos: agrupa
+        por forma, extrai cada grupo coluna a coluna e devolve na ordem original.
+        """
+        groups = {}
+        for i, obj in enumerate(objs):
+            groups.setdefault(shape_of(obj), []).append(i)
+
+        columns = [[None] * len(objs) for _ in fields]
+        for shape, rows in groups.items():
+            plan = cache.get(shape)
+            if plan is None:
+                plan = cache[shape] = compile_plan(shape, fields)
+            group = objs if len(rows) == len(objs) else [objs[i] for i in rows]
+            for col, (_, paths, flatten) in zip(columns, plan):
+                values = _column(group, paths, flatten)
+                if group is objs:
+                    col[:] = values
+                else:
+                    for i, v in zip(rows, values):
+                        col[i] = v
+        return columns
+
+    def project(self, results) -> pa.Table:
+        results = list(results)
+        datas = [r.get("data") for r in results]
+        found = [i for i, d in enumerate(datas) if isinstance(d, dict) and d]
+
+        cnpjs = [r.get("cnpj") for r in results]
+        cnpjs = [str(c).zfill(14) if c not in _EMPTY else "" for c in cnpjs]
+        columns = [
+            [r.get("query") for r in results],
+            cnpjs,
+            [r.get("valid_format") for r in results],
+            [r.get("error") for r in results],
+        ]
+
+        fields = self._columns([datas[i] for i in found], FIELDS, self.plans)
+        if len(found) == len(results):
+            columns.extend(fields)
+        else:
+            for values in fields:
+                col = [None] * len(results)
+                for i, v in zip(found, values):
+                    col[i] = v
+                columns.append(col)
+
+        offsets = [None] * len(results)
+        if self._raw is not None:
+            for i, d in enumerate(datas):
+                if d:
+                    offsets[i] = self._raw.tell()
+                    self._raw.write(d)
+        columns.append(offsets)
+
+        if self._socios is not None:
+            socio_cnpjs, socios = [], []
+            for i in found:
+                for socio in self._socios_of(datas[i]):
+                    socio_cnpjs.append(cnpjs[i])
+                    socios.append(socio)
+            if socios:
+                socio_columns = [socio_cnpjs] + self._columns(socios, SOCIO_FIELDS, self.socio_plans)
+                self._socios.write_table(pa.table(
+                    [pa.array(c, type=f.type) for c, f in zip(socio_columns, SOCIOS_SCHEMA)], schema=SOCIOS_SCHEMA
+                ))
+        return pa.table([pa.array(c, type=f.type) for c, f in zip(columns, MAIN_SCHEMA)], schema=MAIN_SCHEMA)
+
+    @staticmethod
+    def _socios_of(data):
+        for holder in (data, data.get("estabelecimento")):
+            if isinstance(holder, dict):
+                for key in SOCIO_LISTS:
+                    if isinstance(holder.get(key), list):
+                        return [s for s in holder[key] if isinstance(s, dict)]
+        return []
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.close()
+        if self._socios is not None:
+            self._socios.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_raw(output_folder, offset):
+    """JSON bruto de uma linha da tabela principal (pelo raw_offset)."""
+    with open(os.path.join(output_folder, RAW_FILE), "rb") as f:
+        f.seek(int(offset))
+        return loads(f.readline())
@@ -1,62 +1,69 @@
 import pandas as pd
-import ast
 import re
 
-INPUT = "data_processed/leads_b2b.csv"
-OUTPUT = "data_processed/leads_b2b_clean.csv"
+from src import storage
+from src.dedup import ExternalDeduper, print_report
+from src.dimensions import encode_dimensions, new_dimensions
+from src.utils import map_unique, parse_dict_repr
 
-def clean_final_csv():
-    
-    """
-    Executa a limpeza estrutural inicial dos dados de CNPJ.
-    """
-    print("🧹 Executando limpeza estrutural...")
-    
-    # TODO: lógica atual de limpeza
-    # ===============================
-    # 1. Carregar dados
-    # ===============================
-    df = pd.read_csv(INPUT)
-
-    print(f"Registros iniciais: {len(df)}")
-    print("Colunas:", df.columns.tolist())
+# tabelas lógicas (ver src/storage.py)
+INPUT = "leads_b2b"
+OUTPUT = "leads_b2b_clean"
 
-    # ===============================
-    # 2. Funções auxiliares
-    # ===============================
+CHUNKSIZE = 200_000
 
-    def extract_nome(value):
-        """
-        Extrai o campo 'nome' de strings que representam dicionários.
-        Ex: "{'id': 19, 'nome': 'Rio de Janeiro'}" -> "Rio de Janeiro"
-        """
-        if pd.isna(value):
-            return ""
-        if isinstance(value, str) and value.startswith("{"):
-            try:
-                d = ast.literal_eval(value)
-                return d.get("nome", "")
-            except:
-                return ""
-        return value
-
-
-    def only_digits(value):
-        """Remove tudo que não for número"""
-        if pd.isna(value):
-            return ""
-        return re.sub(r"\D", "", str(value))
+# ===============================
+# Funções auxiliares
+# ===============================
 
+def extract_nome(value):
+    """
+    Extrai o campo 'nome' de strings que representam dicionários.
+    Ex: "{'id': 19, 'nome': 'Rio de Janeiro'}" -> "Rio de Janeiro"
+    """
+    if pd.isna(value):
+        return ""
+    if isinstance(value, str) and value.startswith("{"):
+        d = parse_dict_repr(value)
+        return d.get("nome", "") if d is not None else ""
+    return value
+
+
+def only_digits(value):
+    """Remove tudo que não for número"""
+    if pd.isna(value):
+        return ""
+    return re.sub(r"\D", "", str(value))
+
+
+FINAL_COLUMNS = [
+    "cnpj",
+    "razao_social",
+    "nome_fantasia",
+    "municipio",
+    "uf",
+    "telefone",
+    "email",
+    "cnae_fiscal"
+]
+
+
+def clean_dataframe(df: pd.DataFrame, drop_duplicates=True) -> pd.DataFrame:
+    """
+    Aplica as limpezas por coluna, o filtro de situação, a deduplicação por CNPJ
+    e a seleção final de colunas. Usada tanto no arquivo inteiro quanto em blocos
+    (no modo streaming a deduplicação entre blocos é feita por quem chama).
+    """
 
     # ===============================
-    # 3. Limpezas por coluna
+    # 1. Limpezas por coluna
     # ===============================
 
     if "municipio" in df.columns:
-        df["municipio"] = df["municipio"].apply(extract_nome)
+        df["municipio"] = map_unique(df["municipio"], extract_nome)
 
     if "uf" in df.columns:
-        df["uf"] = df["uf"].apply(extract_nome)
+        df["uf"] = map_unique(df["uf"], extract_nome)
 
     if "telefone" in df.columns:
         df["telefone"] = df["telefone"].apply(only_digits)
@@ -65,43 +72,62 @@ def clean_final_csv():
         df["cnpj"] = df["cnpj"].apply(only_digits)
 
     # ===============================
-    # 4. Regras de negócio
+    # 2. Regras de negócio
     # ===============================
 
     if "situacao" in df.columns:
         df = df[df["situacao"] == "Ativa"]
 
     # ===============================
-    # 5. Remover duplicados
+    # 3. Remover duplicados
     # ===============================
 
-    if "cnpj" in df.columns:
+    if drop_duplicates and "cnpj" in df.columns:
         df = df.drop_duplicates(subset=["cnpj"])
 
-    print(f"Registros finais: {len(df)}")
-
     # ===============================
-    # 6. Seleção final de colunas
+    # 4. Seleção final de colunas (uf/municipio/cnae_fiscal como categorias)
     # ===============================
 
-    final_columns = [
-        "cnpj",
-        "razao_social",
-        "nome_fantasia",
-        "municipio",
-        "uf",
-        "telefone",
-        "email",
-        "cnae_fiscal"
-    ]
-
-    df = df[final_columns]
-
-    # ===============================
-    # 7. Salvar CSV limpo
-    # ===============================
+    # cnae_fiscal fica como veio: a validação estrutural olha o valor bruto e o
+    # código canônico (subclasse) só é gravado na tabela final, por normalize_cnae
+    return encode_dimensions(df[FINAL_COLUMNS].copy(), new_dimensions(raw=("cnae_fiscal",)))
 
 
+def clean_final_csv(dedup_policy="first", chunksize=CHUNKSIZE):
+    
+    """
+    Executa a limpeza estrutural inicial dos dados de CNPJ.
+    A entrada é lida em blocos e a deduplicação por CNPJ é externa (src/dedup.py):
+    a base não precisa caber na memória. dedup_policy: first | recent | complete.
+    Retorna {"rows_in", "rows_out", "dedup"} (linhas lidas, gravadas e relatório da deduplicação).
+    """
+    print("🧹 Executando limpeza estrutural...")
 
-    df.to_csv(OUTPUT, index=False, encoding="utf-8-sig")
-    print(f"CSV FINAL GERADO: {OUTPUT}")
+    rows_in = 0
+    with ExternalDeduper("cnpj", dedup_policy) as dedup, storage.TableWriter(OUTPUT) as out:
+
+        # ===============================
+        # 1. Carregar dados (em blocos) + limpeza, filtros e colunas finais
+        # ===============================
+        for i, chunk in enumerate(storage.iter_table(INPUT, chunksize)):
+            if i == 0:
+                print("Colunas:", chunk.columns.tolist())
+            rows_in += len(chunk)
+            dedup.add(clean_dataframe(chunk, drop_duplicates=False))
+
+        print(f"Registros iniciais: {rows_in}")
+
+        # ===============================
+        # 2. Deduplicação e gravação da tabela limpa
+        # ===============================
+        for df in dedup.results():
+            out.write(df)
+
+    print_report(dedup.report)
+    if not out.rows:
+        storage.write_table(pd.DataFrame({c: pd.Series(dtype="string") for c in FINAL_COLUMNS}), OUTPUT)
+
+    print(f"Registros finais: {out.rows}")
+    print(f"ARQUIVO LIMPO GERADO: {out.path}")
+    return {"rows_in": rows_in, "rows_out": out.rows, "dedup": dedup.report}
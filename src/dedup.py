@@ -0,0 +1,334 @@
+"""
+Deduplicação por CNPJ para bases que não cabem na memória.
+
+- Cada linha recebe um número de sequência (_seq: ordem de chegada)
+- Enquanto o total cabe em memory_rows, tudo fica em memória; acima disso as
+  linhas são particionadas pelo hash do CNPJ (uint64) em arquivos temporários
+  (Arrow IPC), e cada partição é deduplicada separadamente (todas as cópias de
+  um CNPJ caem na mesma partição)
+- As partições deduplicadas são remontadas por _seq (merge k-vias em blocos),
+  então a saída tem a mesma ordem de um drop_duplicates na base inteira
+
+Políticas (qual linha de cada CNPJ fica):
+- first: a primeira encontrada (igual ao drop_duplicates(keep="first"))
+- recent: a mais recente pela recency_column; sem ela, a última encontrada
+  (históricos de fetch são gravados em ordem de consulta)
+- complete: a com mais campos preenchidos; empate fica com a primeira
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+POLICIES = ("first", "recent", "complete")
+SEQ = "_seq"
+
+DEFAULT_PARTITIONS = 64
+MEMORY_ROWS = 1_000_000  # acima disso as linhas vão para disco
+BATCH_ROWS = 100_000
+
+
+# ===============================
+# Chaves e políticas
+# ===============================
+
+def key_uint64(keys: pd.Series) -> np.ndarray:
+    """
+    CNPJ → uint64: só dígitos viram o próprio número (< 2^47); qualquer outro
+    texto (formatado, vazio, nulo) vira um hash com o bit alto ligado.
+    """
+    numeric = pd.to_numeric(keys, errors="coerce")
+    ok = numeric.notna().to_numpy() & keys.astype("string").str.fullmatch(r"\d{1,18}").fillna(False).to_numpy()
+    out = pd.util.hash_pandas_object(keys.astype("string"), index=False).to_numpy(dtype=np.uint64) | np.uint64(1 << 63)
+    out[ok] = numeric[ok].to_numpy(dtype=np.uint64)
+    return out
+
+
+def partition_of(keys: pd.Series, partitions) -> np.ndarray:
+    # mistura os bits antes do módulo (CNPJs sequenciais não concentram numa partição)
+    h = key_uint64(keys) * np.uint64(0x9E3779B97F4A7C15)
+    return ((h >> np.uint64(32)) % np.uint64(partitions)).astype(np.int64)
+
+
+def filled_count(df: pd.DataFrame, exclude=()) -> np.ndarray:
+    """Quantidade de campos preenchidos (não nulos e não vazios) por linha."""
+    cols = [c for c in df.columns if c not in exclude]
+    text = df[cols].astype("string")
+    return (text.notna() & text.ne("")).sum(axis=1).to_numpy()
+
+
+def dedup_part(df: pd.DataFrame, key, policy="first", recency_column=None) -> pd.DataFrame:
+    """
+    Deduplica um DataFrame ordenado por _seq (a base inteira ou uma partição);
+    o resultado continua ordenado por _seq.
+    """
+    if policy == "first":
+        return df.drop_duplicates(subset=[key], keep="first")
+    if policy == "recent":
+        if recency_column is None:
+            return df.drop_duplicates(subset=[key], keep="last")
+        ranked = df.sort_values([recency_column, SEQ], na_position="first", kind="stable")
+        return ranked.drop_duplicates(subset=[key], keep="last").sort_values(SEQ, kind="stable")
+    if policy == "complete":
+        score = filled_count(df, exclude=(key, SEQ))
+        ranked = df.iloc[np.lexsort((df[SEQ].to_numpy(), -score))]
+        return ranked.drop_duplicates(subset=[key], keep="first").sort_values(SEQ, kind="stable")
+    raise ValueError(f"Política de deduplicação desconhecida: {policy} (use {', '.join(POLICIES)})")
+
+
+def _count(report, df, kept, key):
+    """Acumula no relatório as contagens de uma base/partição."""
+    copies = df[key].value_counts(dropna=False)
+    report["rows_in"] += len(df)
+    report["rows_out"] += len(kept)
+    report["duplicated_keys"] += int((copies > 1).sum())
+    report["max_copies"] = max(report["max_copies"], int(copies.max()) if len(copies) else 0)
+
+
+def new_report(policy):
+    return {"policy": policy, "rows_in": 0, "rows_out": 0, "duplicated_keys": 0, "max_copies": 0, "spilled": False}
+
+
+def print_report(report):
+    removed = report["rows_in"] - report["rows_out"]
+    print(f"🧮 Deduplicação ({report['policy']}): {report['rows_in']} → {report['rows_out']} linhas, "
+          f"{removed} duplicata(s) removida(s) em {report['duplicated_keys']} CNPJ(s) repetido(s)"
+          + (f" (até {report['max_copies']} cópias)" if report["max_copies"] > 1 else "")
+          + (" [em disco]" if report["spilled"] else ""))
+
+
+def dedup_frame(df: pd.DataFrame, key="cnpj", policy="first", recency_column=None):
+    """Versão em memória: (DataFrame deduplicado com o índice original, relatório)."""
+    report = new_report(policy)
+    if key not in df.columns:
+        report["rows_in"] = report["rows_out"] = len(df)
+        return df, report
+    work = df.assign(**{SEQ: np.arange(len(df))})
+    kept = dedup_part(work, key, policy, recency_column)
+    _count(report, work, kept, key)
+    return kept.drop(columns=SEQ), report
+
+
+# ===============================
+# Deduplicação externa
+# ===============================
+
+def _spill_schema(table: pa.Table) -> pa.Schema:
+    """Schema fixo dos arquivos temporários (dicionários e large_string viram string)."""
+    fields = []
+    for field in table.schema:
+        t = field.type
+        if pa.types.is_dictionary(t) or pa.types.is_null(t) or pa.types.is_large_string(t):
+            t = pa.string()
+        fields.append(pa.field(field.name, t))
+    return pa.schema(fields)
+
+
+class ExternalDeduper:
+    """
+    Deduplicação por 'key' de uma sequência de blocos (add), com a saída em
+    blocos (results) na ordem original. Os arquivos temporários ficam em
+    tmp_dir (padrão: diretório temporário do sistema) e são apagados no close.
+    """
+
+    def __init__(self, key="cnpj", policy="first", recency_column=None, partitions=DEFAULT_PARTITIONS,
+                 memory_rows=MEMORY_ROWS, tmp_dir=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de deduplicação desconhecida: {policy} (use {', '.join(POLICIES)})")
+        self.key = key
+        self.policy = policy
+        self.recency_column = recency_column
+        self.partitions = partitions
+        self.memory_rows = memory_rows
+        self.tmp_dir = tmp_dir
+        self.report = new_report(policy)
+        self._seq = 0
+        self._buffer = []
+        self._buffered = 0
+        self._dir = None
+        self._schema = None
+        self._writers = {}
+        self._sinks = {}
+        self._dtypes = {}
+
+    def add(self, df: pd.DataFrame):
+        if not len(df):
+            return
+        self._track_dtypes(df)
+        df = df.assign(**{SEQ: np.arange(self._seq, self._seq + len(df), dtype=np.int64)})
+        self._seq += len(df)
+        if self._dir is None:
+            self._buffer.append(df)
+            self._buffered += len(df)
+            if self._buffered > self.memory_rows:
+                self._spill_buffer()
+        else:
+            self._spill(df)
+
+    def _track_dtypes(self, df):
+        """dtypes do primeiro bloco; categorias: união, na ordem em que aparecem."""
+        for col, dtype in df.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                seen = self._dtypes.get(col)
+                if isinstance(seen, pd.CategoricalDtype) and not seen.categories.equals(dtype.categories):
+                    cats = seen.categories.append(dtype.categories[~dtype.categories.isin(seen.categories)])
+                    self._dtypes[col] = pd.CategoricalDtype(cats, ordered=seen.ordered)
+                elif seen is None:
+                    self._dtypes[col] = dtype
+            else:
+                self._dtypes.setdefault(col, dtype)
+
+    def _restore(self, df):
+        """Saída com os dtypes da entrada (os arquivos temporários guardam categorias como texto)."""
+        for col, dtype in self._dtypes.items():
+            if col in df.columns and df[col].dtype != dtype:
+                df[col] = df[col].astype(dtype)
+        return df
+
+    # --- disco ---
+
+    def _spill_buffer(self):
+        self._dir = tempfile.mkdtemp(prefix="dedup_", dir=self.tmp_dir)
+        self.report["spilled"] = True
+        buffer, self._buffer, self._buffered = self._buffer, [], 0
+        for df in buffer:
+            self._spill(df)
+
+    def _part_path(self, p, stage="in"):
+        return os.path.join(self._dir, f"{stage}_{p:04d}.arrow")
+
+    def _to_arrow(self, df):
+        df = df.copy(deep=False)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("string")
+        if self._schema is None:
+            self._schema = _spill_schema(pa.Table.from_pandas(df, preserve_index=False))
+        return pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+
+    def _spill(self, df):
+        parts = partition_of(df[self.key], self.partitions)
+        order = np.argsort(parts, kind="stable")  # dentro da partição, a ordem de _seq se mantém
+        table = self._to_arrow(df).take(pa.array(order))
+        bounds = np.searchsorted(parts[order], np.arange(self.partitions + 1))
+        for p in range(self.partitions):
+            a, b = bounds[p], bounds[p + 1]
+            if b > a:
+                writer = self._writers.get(p)
+                if writer is None:
+                    sink = self._sinks[p] = pa.OSFile(self._part_path(p), "wb")
+                    writer = self._writers[p] = pa.ipc.new_stream(sink, self._schema)
+                writer.write_table(table.slice(a, b - a))
+
+    def _dedup_partitions(self, batch_rows):
+        """Deduplica cada partição e grava o resultado (ordenado por _seq) em blocos."""
+        parts = sorted(self._writers)
+        self._close_writers()
+        done = []
+        for p in parts:
+            with pa.memory_map(self._part_path(p)) as source:
+                df = pa.ipc.open_stream(source).read_all().to_pandas()
+            kept = dedup_part(df, self.key, self.policy, self.recency_column)
+            _count(self.report, df, kept, self.key)
+            os.remove(self._part_path(p))
+            table = self._to_arrow(kept)
+            with pa.OSFile(self._part_path(p, "out"), "wb") as sink, pa.ipc.new_stream(sink, self._schema) as writer:
+                for batch in table.to_batches(max_chunksize=batch_rows):
+                    writer.write_batch(batch)
+            done.append(p)
+        return done
+
+    def _merged(self, parts):
+        """Merge k-vias por _seq: em cada passo saem as linhas até o menor último _seq dos blocos abertos."""
+        sources = {p: pa.memory_map(self._part_path(p, "out")) for p in parts}
+        readers = {p: pa.ipc.open_stream(source) for p, source in sources.items()}
+
+        def next_block(p):
+            try:
+                return readers[p].read_next_batch().to_pandas()
+            except StopIteration:
+                # partição consumida: fecha o arquivo sem esperar o fim do merge
+                sources.pop(p).close()
+                return None
+
+        try:
+            blocks = {}
+            for p in parts:
+                block = next_block(p)
+                if block is not None:
+                    blocks[p] = block
+            while blocks:
+                watermark = min(int(b[SEQ].iloc[-1]) for b in blocks.values())
+                taken = []
+                for p in list(blocks):
+                    block = blocks[p]
+                    n = int(np.searchsorted(block[SEQ].to_numpy(), watermark, side="right"))
+                    taken.append(block.iloc[:n])
+                    if n < len(block):
+                        blocks[p] = block.iloc[n:]
+                    else:
+                        block = next_block(p)
+                        if block is None:
+                            del blocks[p]
+                        else:
+                            blocks[p] = block
+                yield pd.concat(taken, ignore_index=True).sort_values(SEQ, kind="stable")
+        finally:
+            # merge interrompido (ex: consumidor parou de iterar)
+            for source in sources.values():
+                source.close()
+
+    # --- saída ---
+
+    def results(self, batch_rows=BATCH_ROWS):
+        """Blocos deduplicados (sem _seq), na ordem original, com os dtypes da entrada."""
+        if self._dir is None:
+            df = pd.concat(self._buffer, ignore_index=True) if self._buffer else pd.DataFrame()
+            self._buffer, self._buffered = [], 0
+            if not len(df):
+                return
+            if self.key in df.columns:
+                kept = dedup_part(df, self.key, self.policy, self.recency_column)
+                _count(self.report, df, kept, self.key)
+            else:
+                kept = df
+                self.report["rows_in"] = self.report["rows_out"] = len(df)
+            for start in range(0, len(kept), batch_rows):
+                yield self._restore(kept.iloc[start:start + batch_rows].drop(columns=SEQ).reset_index(drop=True))
+            return
+
+        pending, size = [], 0
+        for block in self._merged(self._dedup_partitions(batch_rows)):
+            pending.append(block)
+            size += len(block)
+            if size >= batch_rows:
+                yield self._restore(pd.concat(pending, ignore_index=True).drop(columns=SEQ))
+                pending, size = [], 0
+        if pending:
+            yield self._restore(pd.concat(pending, ignore_index=True).drop(columns=SEQ))
+
+    def _close_writers(self):
+        """Fecha os writers e os arquivos por trás deles (writer.close() não fecha o arquivo)."""
+        for writer in self._writers.values():
+            try:
+                writer.close()
+            except (pa.ArrowInvalid, OSError):
+                pass  # já fechado
+        for sink in self._sinks.values():
+            sink.close()
+        self._writers, self._sinks = {}, {}
+
+    def close(self):
+        self._close_writers()
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
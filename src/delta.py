@@ -0,0 +1,203 @@
+"""
+Processamento incremental (CDC) por hash de conteúdo de cada CNPJ.
+
+- Limpeza e enriquecimento continuam rodando na base inteira (vetorizados)
+- Para cada registro enriquecido é calculado um hash (uint64) do conteúdo
+  normalizado; o estado guarda as chaves (CNPJ uint64, ordenadas) e os hashes
+  da última execução
+- Só CNPJs novos ou com hash diferente passam por validação, score,
+  classificação e regras de negócio; os resultados substituem as linhas
+  correspondentes nas saídas anteriores (CNPJs que saíram da base são removidos)
+- Mudança no código das etapas ou nas faixas (config/scoring_rules.json)
+  invalida o estado: a execução seguinte reprocessa tudo
+"""
+import hashlib
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+from src import storage
+from src import validate_structural as validate_mod
+from src import structural_score as score_mod
+from src import lead_classification as classify_mod
+from src import business_rules as business_mod
+from src import scoring_rules
+from src.clean_final_csv import clean_final_csv, OUTPUT as CLEAN
+from src.enrich_from_receita import enrich_from_receita
+from src.execution import SerialBackend
+from src.normalize_cnae import normalize_cnae
+from src.quality_metrics import generate_quality_metrics
+
+STATE_PATH = "data_processed/.delta_state.npz"
+DELTA_VERSION = 1
+
+CLASSIFIED = "leads_b2b_classified"
+VALIDOS = "leads_b2b_validos"
+INVALIDOS = "leads_b2b_invalidos"
+BUSINESS_VALID = "leads_b2b_business_valid"
+
+
+# ===============================
+# Hashes e estado
+# ===============================
+
+def cnpj_keys(cnpjs: pd.Series) -> np.ndarray:
+    """CNPJ (texto de 14 dígitos) → uint64; vazios/inválidos viram 0."""
+    return pd.to_numeric(cnpjs, errors="coerce").fillna(0).to_numpy(dtype=np.uint64)
+
+
+def record_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash (uint64) de cada linha sobre o texto normalizado das colunas, em ordem
+    alfabética: o mesmo registro tem o mesmo hash lido de Parquet ou de CSV.
+    """
+    cols = sorted(df.columns)
+    text = df[cols].astype("string").fillna("")
+    return pd.util.hash_pandas_object(text, index=False).to_numpy(dtype=np.uint64)
+
+
+def context_fingerprint() -> str:
+    """Código das etapas reprocessadas + regras de faixas: se mudar, tudo é recalculado."""
+    h = hashlib.sha256(f"delta:{DELTA_VERSION}".encode("utf-8"))
+    for mod in (validate_mod, score_mod, classify_mod, business_mod, scoring_rules):
+        h.update(inspect.getsource(mod).encode("utf-8"))
+    with open(scoring_rules.RULES_PATH, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {"keys": data["keys"], "hashes": data["hashes"], "context": str(data["context"])}
+
+
+def save_state(keys, hashes, context, path=STATE_PATH):
+    order = np.argsort(keys, kind="stable")
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, keys=keys[order], hashes=hashes[order], context=np.array(context))
+    os.replace(tmp, path)
+
+
+def changed_mask(keys, hashes, state) -> np.ndarray:
+    """True para CNPJs novos, alterados ou sem chave (sempre reprocessados)."""
+    if state is None or not len(state["keys"]):
+        return np.ones(len(keys), dtype=bool)
+    prev_keys, prev_hashes = state["keys"], state["hashes"]
+    pos = np.minimum(np.searchsorted(prev_keys, keys), len(prev_keys) - 1)
+    same = (prev_keys[pos] == keys) & (prev_hashes[pos] == hashes) & (keys != 0)
+    return ~same
+
+
+# ===============================
+# Merge nas saídas anteriores
+# ===============================
+
+def merge_rows(previous: pd.DataFrame, delta: pd.DataFrame, replaced: np.ndarray, order: pd.Series) -> pd.DataFrame:
+    """
+    Tira de 'previous' as linhas cujos CNPJs estão em 'replaced' (reprocessados ou
+    removidos da base), acrescenta 'delta' e ordena como a base atual ('order':
+    posição de cada CNPJ). CNPJs que não estão mais na base ficam de fora.
+    """
+    keep = ~np.isin(cnpj_keys(previous["cnpj"]), replaced)
+    merged = pd.concat([previous[keep], delta], ignore_index=True)
+    position = merged["cnpj"].astype("string").map(order)
+    merged = merged[position.notna().to_numpy()]
+    position = position[position.notna()].astype("int64")
+    return merged.iloc[np.argsort(position.to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def _previous(name, csv=False):
+    """Saída anterior (None se não existir)."""
+    if csv:
+        file_path = storage.export_path(name)
+        return storage.read_path(file_path) if os.path.exists(file_path) else None
+    return storage.read_table(name) if storage.exists(name) else None
+
+
+# ===============================
+# Execução
+# ===============================
+
+def run_incremental(backend=None, state_path=STATE_PATH):
+    """
+    Limpeza + enriquecimento na base inteira; validação → score → classificação →
+    regras de negócio só para o que mudou, com merge nas saídas anteriores.
+    Retorna {"total", "changed", "removed"}.
+    """
+    backend = backend or SerialBackend()
+
+    with metrics.stage("clean") as st:
+        counts = clean_final_csv()
+        st.count(counts["rows_in"], counts["rows_out"])
+    with metrics.stage("enrich") as st:
+        df = storage.read_table(CLEAN)
+        st.count(rows_in=df)
+        df = enrich_from_receita(df)
+        storage.write_table(df, "leads_b2b_enriched")
+        st.count(rows_out=df)
+
+    with metrics.stage("delta") as st:
+        keys = cnpj_keys(df["cnpj"])
+        hashes = record_hashes(df)
+        context = context_fingerprint()
+
+        state = load_state(state_path)
+        previous_classified = _previous(CLASSIFIED)
+        previous_business = _previous(BUSINESS_VALID, csv=True)
+        if state is not None and state["context"] != context:
+            print("♻️ Código das etapas ou regras de score mudaram: reprocessando tudo")
+            state = None
+        if previous_classified is None or previous_business is None:
+            state = None
+
+        changed = changed_mask(keys, hashes, state)
+        removed = np.setdiff1d(state["keys"], keys) if state is not None else np.empty(0, dtype=np.uint64)
+        delta = df[changed].reset_index(drop=True)
+        st.count(df, delta)
+    print(f"🔁 Incremental: {int(changed.sum())} de {len(df)} CNPJs novos/alterados, {len(removed)} removidos")
+
+    with metrics.stage("validate") as st:
+        delta = validate_mod.validate_structural(delta)
+        st.count(delta, delta)
+    with metrics.stage("score") as st:
+        delta = score_mod.apply_structural_score(delta)
+        st.count(delta, delta)
+    with metrics.stage("classify") as st:
+        delta = classify_mod.classify_leads(delta)
+        classified_delta = delta.copy()
+        st.count(delta, delta)
+    with metrics.stage("business") as st:
+        delta = backend.map(business_mod.apply_business_rules, delta)
+        business_delta = delta[delta["is_valid_business"] == True]
+        st.count(delta, business_delta)
+
+    with metrics.stage("merge") as st:
+        replaced = np.concatenate([keys[changed], removed])
+        order = pd.Series(np.arange(len(df)), index=df["cnpj"].astype("string"))
+        if state is None:
+            classified, business = classified_delta, business_delta
+        else:
+            classified = merge_rows(previous_classified, classified_delta, replaced, order)
+            business = merge_rows(previous_business, business_delta, replaced, order)
+        storage.write_table(classified, CLASSIFIED)
+        business.to_csv(storage.export_path(BUSINESS_VALID), index=False)
+        st.count(rows_out=classified)
+
+    with metrics.stage("split_valid") as st:
+        generate_quality_metrics(classified)
+        valid = classified[classified["is_valid_structural"] == True]
+        valid.to_csv(storage.export_path(VALIDOS), index=False)
+        classified[classified["is_valid_structural"] == False].to_csv(storage.export_path(INVALIDOS), index=False)
+        st.count(classified, valid)
+
+    with metrics.stage("normalize_cnae") as st:
+        st.count(rows_out=normalize_cnae())
+
+    # o estado só é gravado depois que todas as saídas foram atualizadas
+    save_state(keys, hashes, context, state_path)
+    return {"total": len(df), "changed": int(changed.sum()), "removed": int(len(removed))}
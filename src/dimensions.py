@@ -0,0 +1,278 @@
+"""
+Tabelas de dimensão (UF, município, CNAE).
+
+Os mesmos poucos milhares de valores de uf/municipio/cnae_fiscal se repetem em
+milhões de linhas. Cada dimensão guarda os valores distintos uma única vez e
+atribui a cada um um código inteiro estável (na ordem em que aparecem); as colunas
+viram pandas Categorical sobre esses códigos, então filtros, group-bys e joins
+comparam inteiros e a memória por linha cai para 1–2 bytes por coluna.
+
+- As dimensões valem para uma tabela (padrão de encode_dimensions) ou para uma
+  execução (new_dimensions() passado a cada chamada); não há estado global no
+  processo, então serviços de longa duração e workers não acumulam valores
+- UF: começa com as 27 UFs + EX (sigla como valor canônico; nomes também são aceitos)
+- Município e CNAE: aprendidas a partir dos dados (crescem só por append,
+  então os códigos já atribuídos nunca mudam enquanto a dimensão existe)
+- CNAE: valores canônicos são subclasses de 7 dígitos (cnae_subclass); a hierarquia
+  (seção/divisão/grupo/classe) é derivada do código da subclasse. A tabela limpa
+  guarda o valor bruto (new_dimensions(raw=...)), que é o que a validação estrutural
+  avalia; o código canônico vai para a tabela final (normalize_cnae)
+"""
+import os
+import re
+import sys
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from utils import NON_DIGIT, parse_dict_repr
+
+# ===============================
+# UF
+# ===============================
+
+UF_NOMES = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas", "BA": "Bahia",
+    "CE": "Ceará", "DF": "Distrito Federal", "ES": "Espírito Santo", "GO": "Goiás",
+    "MA": "Maranhão", "MT": "Mato Grosso", "MS": "Mato Grosso do Sul", "MG": "Minas Gerais",
+    "PA": "Pará", "PB": "Paraíba", "PR": "Paraná", "PE": "Pernambuco", "PI": "Piauí",
+    "RJ": "Rio de Janeiro", "RN": "Rio Grande do Norte", "RS": "Rio Grande do Sul",
+    "RO": "Rondônia", "RR": "Roraima", "SC": "Santa Catarina", "SP": "São Paulo",
+    "SE": "Sergipe", "TO": "Tocantins",
+    "EX": "Exterior",  # estabelecimentos no exterior (dump da Receita)
+}
+
+# código IBGE de cada UF
+UF_IBGE = {
+    "RO": 11, "AC": 12, "AM": 13, "RR": 14, "PA": 15, "AP": 16, "TO": 17,
+    "MA": 21, "PI": 22, "CE": 23, "RN": 24, "PB": 25, "PE": 26, "AL": 27, "SE": 28, "BA": 29,
+    "MG": 31, "ES": 32, "RJ": 33, "SP": 35, "PR": 41, "SC": 42, "RS": 43,
+    "MS": 50, "MT": 51, "GO": 52, "DF": 53,
+}
+
+
+def fold_text(text: str) -> str:
+    # minúsculas e sem acento, para casar "SAO PAULO" com "São Paulo"
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+_UF_BY_NAME = {fold_text(nome): sigla for sigla, nome in UF_NOMES.items()}
+
+
+def uf_sigla(value):
+    """
+    Sigla da UF a partir da sigla ou do nome (com ou sem acento).
+    Valores não reconhecidos voltam como vieram (sem espaços nas pontas).
+    """
+    text = str(value).strip()
+    if text.upper() in UF_NOMES:
+        return text.upper()
+    return _UF_BY_NAME.get(fold_text(text), text)
+
+
+def uf_matches(values, ufs) -> np.ndarray:
+    """
+    Regra do filtro por UF, a mesma na varredura (filter_leads) e no índice (lead_index):
+    UF reconhecida (sigla ou nome) casa pela sigla; qualquer outro texto casa por
+    substring do valor gravado. Recebe os valores distintos da coluna; devolve a máscara.
+    """
+    queries = [str(u).strip() for u in ufs]
+    siglas = {uf_sigla(u) for u in queries if uf_sigla(u) in UF_NOMES}
+    texts = [u for u in queries if u and uf_sigla(u) not in UF_NOMES]
+    return np.array(
+        [v in siglas or any(t in v for t in texts) for v in map(str, values)], dtype=bool
+    )
+
+
+# ===============================
+# CNAE
+# ===============================
+
+# seção CNAE 2.x de cada divisão (2 primeiros dígitos); "" = divisão inexistente
+SECTION_BY_DIVISION = np.full(100, "", dtype="<U1")
+for _section, _first, _last in (
+    ("A", 1, 3), ("B", 5, 9), ("C", 10, 33), ("D", 35, 35), ("E", 36, 39),
+    ("F", 41, 43), ("G", 45, 47), ("H", 49, 53), ("I", 55, 56), ("J", 58, 63),
+    ("K", 64, 66), ("L", 68, 68), ("M", 69, 75), ("N", 77, 82), ("O", 84, 84),
+    ("P", 85, 85), ("Q", 86, 88), ("R", 90, 93), ("S", 94, 96), ("T", 97, 97),
+    ("U", 99, 99),
+):
+    SECTION_BY_DIVISION[_first:_last + 1] = _section
+
+
+_FLOAT_TEXT = re.compile(r"\d+\.0+")
+
+
+def cnae_subclass(value):
+    """
+    Código CNAE canônico (subclasse, 7 dígitos) a partir das representações
+    que aparecem nos dados: int (6201501 / 111301 sem o zero à esquerda),
+    texto formatado ("6201-5/01", "62.01-5-01"), float lido de CSV ("6201501.0")
+    ou dict da API ({'id': '6201501', ...}, também como texto).
+    Retorna None quando não é um código válido.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        if np.isnan(value):
+            return None
+        value = int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("{"):
+            value = parse_dict_repr(text)
+        elif _FLOAT_TEXT.fullmatch(text):
+            value = text.split(".")[0]
+    if isinstance(value, dict):
+        value = value.get("id") or value.get("subclasse") or value.get("codigo")
+        return cnae_subclass(value) if value is not None else None
+
+    digits = NON_DIGIT.sub("", str(value))
+    if len(digits) == 6:
+        digits = digits.zfill(7)  # int sem o zero da divisão (01–09)
+    if len(digits) != 7 or not SECTION_BY_DIVISION[int(digits[:2])]:
+        return None
+    return digits
+
+
+def cnae_hierarchy(codes) -> pd.DataFrame:
+    """
+    Hierarquia de subclasses CNAE de 7 dígitos (ex: "6201501"):
+    secao (J), divisao (62), grupo (620), classe (62015).
+    Códigos ausentes/malformados geram linhas nulas.
+    """
+    codes = pd.Series(codes, dtype="string").reset_index(drop=True)
+    ok = codes.str.fullmatch(r"\d{7}").fillna(False).to_numpy(dtype=bool)
+    divisao = codes.str[:2].where(ok)
+    section = np.full(len(codes), None, dtype=object)
+    section[ok] = SECTION_BY_DIVISION[divisao[ok].astype(int).to_numpy()]
+    section[section == ""] = None
+    return pd.DataFrame({
+        "secao": section,
+        "divisao": divisao,
+        "grupo": codes.str[:3].where(ok),
+        "classe": codes.str[:5].where(ok),
+    })
+
+
+# ===============================
+# Dimensões
+# ===============================
+
+class Dimension:
+    """
+    Valores distintos de uma coluna com códigos inteiros estáveis (append-only).
+    'normalize' define o valor canônico (ex: nome da UF → sigla).
+    """
+
+    def __init__(self, name, values=(), normalize=None):
+        self.name = name
+        self.normalize = normalize or _default_normalize
+        self.values = []
+        self.index = {}
+        self._lock = threading.Lock()
+        for v in values:
+            self._code(v)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def codes(self, series: pd.Series) -> np.ndarray:
+        """
+        Código de cada linha (int32; -1 = nulo/vazio). A normalização roda uma vez
+        por valor distinto da Series, não por linha.
+        """
+        raw_codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        lookup = np.empty(len(uniques) + 1, dtype=np.int32)
+        lookup[-1] = -1
+        with self._lock:
+            for i, raw in enumerate(uniques):
+                value = self.normalize(raw)
+                lookup[i] = self._code(value) if value not in (None, "") else -1
+        return lookup[raw_codes]
+
+    def encode(self, series: pd.Series) -> pd.Series:
+        """Converte a coluna em Categorical cujas categorias são os valores da dimensão."""
+        codes = self.codes(series)
+        with self._lock:
+            categories = list(self.values)
+        cat = pd.Categorical.from_codes(codes, categories=categories)
+        return pd.Series(cat, index=series.index, name=series.name)
+
+    def code_of(self, value):
+        """Código de um valor (já normalizado), ou None se a dimensão não o conhece."""
+        return self.index.get(self.normalize(value))
+
+
+def _default_normalize(value):
+    return str(value).strip()
+
+
+# coluna → (valores iniciais, normalização do valor canônico)
+DIMENSION_SPECS = {
+    "uf": (tuple(UF_NOMES), uf_sigla),
+    "municipio": ((), _default_normalize),
+    "cnae_fiscal": ((), cnae_subclass),
+}
+NORMALIZERS = {col: normalize for col, (_, normalize) in DIMENSION_SPECS.items()}
+
+
+def new_dimension(column, raw=False) -> Dimension:
+    """
+    Dimensão nova (vazia, ou só com os valores iniciais) para a coluna.
+    raw=True: guarda o valor como veio (só sem espaços), sem canonizar.
+    """
+    values, normalize = DIMENSION_SPECS[column]
+    return Dimension(column, values, normalize=_default_normalize if raw else normalize)
+
+
+def new_dimensions(raw=()) -> dict:
+    """
+    Um conjunto de dimensões (coluna → Dimension) para uma tabela ou execução;
+    as colunas em 'raw' não são canonizadas (ver new_dimension).
+    """
+    return {col: new_dimension(col, raw=col in raw) for col in DIMENSION_SPECS}
+
+
+def encode_dimensions(df: pd.DataFrame, dimensions=None) -> pd.DataFrame:
+    """
+    Codifica as colunas de dimensão presentes no DataFrame como Categorical.
+    Sem 'dimensions', as categorias são só as desta tabela; passe o mesmo
+    new_dimensions() a várias chamadas para códigos comuns entre elas.
+    """
+    dimensions = dimensions or new_dimensions()
+    for col, dim in dimensions.items():
+        if col in df.columns:
+            df[col] = dim.encode(df[col])
+    return df
+
+
+def fill_missing(series: pd.Series, label="N/A") -> pd.Series:
+    """fillna que também funciona em Categorical (adiciona a categoria se faltar)."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and label not in series.cat.categories:
+        series = series.cat.add_categories([label])
+    return series.fillna(label)
+
+
+def top_counts(series: pd.Series, top=10, label="N/A") -> pd.Series:
+    """
+    value_counts com nulos como 'label', sem as categorias que não aparecem
+    (num Categorical, value_counts lista a dimensão inteira, inclusive zeros).
+    """
+    vc = fill_missing(series, label).value_counts()
+    return vc[vc > 0].head(top)
@@ -1,37 +1,59 @@
 import pandas as pd
 
+from src import receita_bulk
+from src.receita_store import open_store
 
-def enrich_from_receita(df: pd.DataFrame) -> pd.DataFrame:
+
+def normalize_cnpj_series(s: pd.Series) -> pd.Series:
+    """Normaliza CNPJ (14 dígitos)."""
+    return (
+        s
+        .astype(str)
+        .str.replace(r"\D", "", regex=True)
+        .str.zfill(14)
+    )
+
+
+def open_reference():
+    """
+    Base de referência do enriquecimento: o dump oficial, se já carregado
+    (src/receita_bulk.py), senão o mock indexado (src/receita_store.py).
+    Os dois têm a mesma interface de consulta (lookup).
+    """
+    if receita_bulk.available():
+        return receita_bulk.ReceitaBulk()
+    return open_store()
+
+
+def enrich_from_receita(df: pd.DataFrame, store=None, verbose=True) -> pd.DataFrame:
     """
     Enriquece dados de CNPJ usando mock da Receita Federal.
+    A consulta usa a base indexada (src/receita_store.py): busca binária nas chaves
+    ordenadas + leitura só das linhas encontradas, com o mesmo resultado de um
+    merge left por CNPJ.
+    'store' permite reaproveitar a base já aberta (ex: processamento em blocos).
     """
 
-    receita_df = pd.read_csv("data_raw/receita_mock.csv")
+    if store is None:
+        store = open_reference()
 
     # Normaliza CNPJ (14 dígitos)
-    df["cnpj"] = (
-        df["cnpj"]
-        .astype(str)
-        .str.replace(r"\D", "", regex=True)
-        .str.zfill(14)
-    )
+    df["cnpj"] = normalize_cnpj_series(df["cnpj"])
 
-    receita_df["cnpj"] = (
-        receita_df["cnpj"]
-        .astype(str)
-        .str.replace(r"\D", "", regex=True)
-        .str.zfill(14)
-    )
+    if verbose:
+        print(f"🔎 Registros antes do merge: {len(df)}")
 
-    print(f"🔎 Registros antes do merge: {len(df)}")
+    keys = pd.to_numeric(df["cnpj"], errors="coerce").fillna(0).to_numpy(dtype="uint64")
+    found = store.lookup(keys)
 
-    df = df.merge(
-        receita_df,
-        on="cnpj",
-        how="left"
-    )
+    # mesmos sufixos do merge quando a coluna já existe nos leads
+    overlap = [c for c in found.columns if c in df.columns]
+    df = df.rename(columns={c: f"{c}_x" for c in overlap}).reset_index(drop=True)
+    found = found.rename(columns={c: f"{c}_y" for c in overlap})
+    df = pd.concat([df, found], axis=1)
 
-    print(f"📊 Registros enriquecidos:")
-    print(df[["cnpj", "situacao", "porte_empresa"]].head())
+    if verbose:
+        print(f"📊 Registros enriquecidos:")
+        print(df[["cnpj", "situacao", "porte_empresa"]].head())
 
     return df
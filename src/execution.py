@@ -0,0 +1,188 @@
+"""
+Backends de execução para etapas linha a linha (df → df).
+
+- SerialBackend: chama a função no próprio processo (padrão, --workers 1)
+- ProcessBackend: divide o DataFrame em faixas de linhas e roda a função num
+  pool de processos. A entrada é serializada uma única vez em Arrow IPC num
+  bloco de memória compartilhada; cada processo abre o bloco sem cópia e lê só
+  a sua faixa. O resultado volta também por memória compartilhada (um bloco por
+  faixa) e é remontado na ordem original. O transporte usa os dtypes do storage,
+  mas a função recebe e o resultado volta com os mesmos dtypes da execução serial.
+
+A função precisa ser importável pelo nome (função de módulo, ex:
+src.business_rules.apply_business_rules) e devolver as mesmas linhas na mesma ordem
+(colunas novas podem ser adicionadas); etapas que filtram linhas também funcionam,
+mas o índice do resultado passa a ser sequencial.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import pandas as pd
+import pyarrow as pa
+
+from src import metrics
+from src import storage
+
+MIN_PARTITION_ROWS = 50_000  # abaixo disso o custo de serializar supera o ganho
+
+
+# ===============================
+# Memória compartilhada (Arrow IPC)
+# ===============================
+
+def _write_ipc(sink, table):
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _to_shared(table: pa.Table):
+    """
+    Grava a tabela em Arrow IPC direto num bloco novo de memória compartilhada
+    (o tamanho é medido antes, sem copiar dados).
+    """
+    mock = pa.MockOutputStream()
+    _write_ipc(mock, table)
+    size = mock.size()
+    shm = SharedMemory(create=True, size=max(size, 1))
+    try:
+        _write_ipc(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm, size
+
+
+def _from_shared(shm, size) -> pa.Table:
+    """Tabela lida sem cópia de dentro do bloco (válida enquanto o bloco estiver aberto)."""
+    return pa.ipc.open_stream(pa.py_buffer(shm.buf)[:size]).read_all()
+
+
+def _arrow(df: pd.DataFrame) -> pa.Table:
+    # dtypes do storage (os mesmos de qualquer intermediário gravado em disco)
+    return storage.to_arrow(storage.apply_schema(df.copy(deep=False)))
+
+
+def _restore_dtypes(df: pd.DataFrame, dtypes) -> pd.DataFrame:
+    """Volta as colunas aos dtypes de antes do transporte (apply_schema → Arrow → pandas)."""
+    for col, dtype in dtypes.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == object:
+            values = df[col].astype(object)
+            df[col] = values.where(values.notna(), None)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _merge_dtypes(parts_dtypes):
+    """dtypes do resultado: os da primeira faixa, com a união das categorias de todas."""
+    dtypes = dict(parts_dtypes[0])
+    for col, dtype in dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = pd.Index([c for d in parts_dtypes for c in d[col].categories]).unique()
+            dtypes[col] = pd.CategoricalDtype(categories, ordered=dtype.ordered)
+    return dtypes
+
+
+def _run_partition(func, name, size, start, length, dtypes):
+    """
+    Executado no processo trabalhador: faixa [start, start+length) → func → bloco novo.
+    Devolve também os dtypes do resultado e o CPU gasto na faixa (somado à etapa
+    pelo processo principal).
+    """
+    # o resource_tracker é o mesmo do processo principal (filhos do pool), que apaga o bloco
+    cpu0 = time.process_time()
+    shm = SharedMemory(name=name)
+    try:
+        part = _restore_dtypes(_from_shared(shm, size).slice(start, length).to_pandas(), dtypes)
+        result = func(part)
+        out_dtypes = result.dtypes.to_dict()
+        out, out_size = _to_shared(_arrow(result))
+        out.close()
+        del part, result
+        return out.name, out_size, out_dtypes, time.process_time() - cpu0
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # ainda há visões do bloco vivas; o mapeamento some com o processo
+
+
+# ===============================
+# Backends
+# ===============================
+
+class SerialBackend:
+    workers = 1
+
+    def map(self, func, df: pd.DataFrame) -> pd.DataFrame:
+        return func(df)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProcessBackend(SerialBackend):
+    """Pool de processos reutilizado por todas as etapas em que é usado."""
+
+    def __init__(self, workers=None, min_rows=MIN_PARTITION_ROWS):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def partitions(self, n_rows):
+        parts = max(1, min(self.workers, n_rows // self.min_rows))
+        bounds = [n_rows * i // parts for i in range(parts + 1)]
+        return [(a, b - a) for a, b in zip(bounds, bounds[1:])]
+
+    def map(self, func, df: pd.DataFrame) -> pd.DataFrame:
+        ranges = self.partitions(len(df))
+        if len(ranges) == 1:
+            return func(df)
+
+        shm, size = _to_shared(_arrow(df))
+        try:
+            dtypes = df.dtypes.to_dict()
+            futures = [self._pool.submit(_run_partition, func, shm.name, size, start, length, dtypes)
+                       for start, length in ranges]
+            parts, parts_dtypes = [], []
+            for fut in futures:  # na ordem das faixas
+                name, out_size, out_dtypes, cpu_s = fut.result()
+                parts_dtypes.append(out_dtypes)
+                metrics.add_worker_cpu(cpu_s)
+                out = SharedMemory(name=name)
+                try:
+                    # cópia para fora do bloco antes de apagá-lo
+                    data = pa.py_buffer(bytes(out.buf[:out_size]))
+                finally:
+                    out.close()
+                    out.unlink()
+                parts.append(pa.ipc.open_stream(data).read_all().to_pandas())
+        finally:
+            shm.close()
+            shm.unlink()
+
+        result = _restore_dtypes(pd.concat(parts, ignore_index=True), _merge_dtypes(parts_dtypes))
+        if len(result) == len(df):
+            result.index = df.index
+        return result
+
+    def close(self):
+        self._pool.shutdown()
+
+
+def get_backend(workers=1):
+    """workers=1: execução no próprio processo; 0 ou None: um processo por núcleo."""
+    if workers == 1:
+        return SerialBackend()
+    return ProcessBackend(workers or None)
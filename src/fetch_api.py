@@ -12,9 +12,23 @@ if ROOT not in sys.path:
     sys.path.append(ROOT)
 
 from utils import normalize_cnpj, validate_cnpj
+from receita_bulk import ReceitaBulk
 
-# Use a URL que você testou (publica.cnpj.ws) — funciona com JSON rico
-BASE_URL = "https://publica.cnpj.ws/cnpj/{}"
+# Use a URL que você testou (publica.cnpj.ws) — funciona com JSON rico.
+# CNPJ_API_BASE_URL aponta a busca para outro servidor (ex.: o mock local, src/mock_cnpj_api.py)
+DEFAULT_BASE_URL = "https://publica.cnpj.ws/cnpj/{}"
+BASE_URL = os.environ.get("CNPJ_API_BASE_URL") or DEFAULT_BASE_URL
+
+def url_template(base_url=None) -> str:
+    """
+    Modelo da URL de consulta ('{}' = CNPJ de 14 dígitos). Aceita o modelo completo
+    ou só a raiz do servidor: http://127.0.0.1:8000 → http://127.0.0.1:8000/cnpj/{}.
+    Sem base_url, usa BASE_URL (CNPJ_API_BASE_URL ou a API pública).
+    """
+    base = base_url or BASE_URL
+    if "{}" in base:
+        return base
+    return base.rstrip("/") + "/cnpj/{}"
 
 def requests_session_with_retries(total_retries=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)):
     """
@@ -32,10 +46,10 @@ def requests_session_with_retries(total_retries=3, backoff_factor=0.5, status_fo
     s.mount("http://", adapter)
     return s
 
-def fetch_cnpj(cnpj: str, session=None, timeout=8):
+def new_result(cnpj: str) -> dict:
     """
-    Busca informações de um CNPJ na API configurada.
-    Retorna dicionário com 'query', 'cnpj', 'valid_format', 'data', 'error'
+    Monta o dicionário de resultado de uma query (formato comum a todos os modos de busca).
+    Já marca 'invalid_format' quando o CNPJ não passa no dígito verificador.
     """
     cnpj_norm = normalize_cnpj(cnpj)
     is_valid_format = validate_cnpj(cnpj_norm)
@@ -50,11 +64,45 @@ def fetch_cnpj(cnpj: str, session=None, timeout=8):
 
     if not is_valid_format:
         result["error"] = "invalid_format"
+    return result
+
+def from_cache(cnpj: str, cache):
+    """
+    Retorna o resultado de fetch_cnpj a partir do cache, ou None se não houver entrada.
+    Queries com formato inválido não consultam o cache (resolvidas localmente).
+    """
+    result = new_result(cnpj)
+    if not result["valid_format"]:
         return result
+    if cache is None:
+        return None
+    cached = cache.get(result["cnpj"])
+    if cached is None:
+        return None
+    result.update(cached)
+    return result
+
+def fetch_cnpj(cnpj: str, session=None, timeout=8, cache=None, base_url=None):
+    """
+    Busca informações de um CNPJ na API configurada (base_url, ver url_template).
+    Retorna dicionário com 'query', 'cnpj', 'valid_format', 'data', 'error'
+    Se 'cache' (fetch_cache.CnpjCache) for informado, consulta-o antes da API
+    e guarda a resposta depois.
+    """
+    result = new_result(cnpj)
+    if not result["valid_format"]:
+        return result
+    cnpj_norm = result["cnpj"]
+
+    if cache is not None:
+        cached = cache.get(cnpj_norm)
+        if cached is not None:
+            result.update(cached)
+            return result
 
     session = session or requests_session_with_retries()
 
-    url = BASE_URL.format(cnpj_norm)
+    url = url_template(base_url).format(cnpj_norm)
     try:
         resp = session.get(url, timeout=timeout)
         if resp.status_code == 200:
@@ -69,22 +117,84 @@ def fetch_cnpj(cnpj: str, session=None, timeout=8):
             result["error"] = f"http_{resp.status_code}"
     except Exception as e:
         result["error"] = str(e)
+    if cache is not None:
+        cache.store_result(result)
     return result
 
-def fetch_batch(cnpjs, max_workers=8, delay_between_requests=0.05):
+def iter_fetch_batch(cnpjs, max_workers=8, delay_between_requests=0.05, cache=None, base_url=None, session=None):
+    """
+    Versão em streaming de fetch_batch: produz cada resultado assim que fica pronto
+    (ordem de conclusão). Mantém no máximo ~4x max_workers buscas submetidas ao pool,
+    então a memória não cresce com o tamanho da lista.
+    'session' substitui a sessão padrão (requests_session_with_retries), ex.: com hooks de medição.
+    """
+    session = session or requests_session_with_retries()
+    window = max(1, max_workers) * 4
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {}
+
+        def drain(block_until):
+            for fut in as_completed(list(futures)):
+                query = futures.pop(fut)
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = {"query": query, "cnpj": None, "valid_format": False, "data": None, "error": str(e)}
+                if cache is not None:
+                    cache.store_result(res)
+                yield res
+                sleep(delay_between_requests)
+                if len(futures) <= block_until:
+                    return
+
+        for c in cnpjs:
+            cached = from_cache(c, cache)
+            if cached is not None:
+                yield cached
+                continue
+            futures[ex.submit(fetch_cnpj, c, session, base_url=base_url)] = c
+            if len(futures) >= window:
+                yield from drain(window // 2)
+        if futures:
+            yield from drain(0)
+
+def fetch_batch(cnpjs, max_workers=8, delay_between_requests=0.05, cache=None, base_url=None, session=None):
     """
     Busca uma lista de CNPJs em paralelo com ThreadPool.
     Retorna lista de resultados (ordem de conclusão, não necessariamente ordem original).
+    Com 'cache', os CNPJs já conhecidos são resolvidos localmente, sem passar pelo pool.
     """
-    session = requests_session_with_retries()
-    results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futures = {ex.submit(fetch_cnpj, c, session): c for c in cnpjs}
-        for fut in as_completed(futures):
-            try:
-                res = fut.result()
-            except Exception as e:
-                res = {"query": futures[fut], "cnpj": None, "valid_format": False, "data": None, "error": str(e)}
-            results.append(res)
-            sleep(delay_between_requests)
-    return results
+    return list(iter_fetch_batch(cnpjs, max_workers, delay_between_requests, cache, base_url, session))
+
+def iter_fetch_local(cnpjs, bulk=None, chunk_size=10_000):
+    """
+    Resolve os CNPJs no dump oficial da Receita carregado localmente
+    (receita_bulk.py), sem acessar a rede. Mesmo formato de resultado de fetch_cnpj;
+    CNPJs ausentes do dump viram 'not_found'. Consulta em blocos de 'chunk_size'.
+    """
+    bulk = bulk or ReceitaBulk()
+    chunk = []
+    for c in cnpjs:
+        chunk.append(new_result(c))
+        if len(chunk) >= chunk_size:
+            yield from _resolve_local(chunk, bulk)
+            chunk = []
+    if chunk:
+        yield from _resolve_local(chunk, bulk)
+
+def _resolve_local(results, bulk):
+    payloads = bulk.payloads([r["cnpj"] for r in results if r["valid_format"]])
+    for result in results:
+        if result["valid_format"]:
+            result["data"] = payloads.get(result["cnpj"])
+            if result["data"] is None:
+                result["error"] = "not_found"
+        yield result
+
+def fetch_batch_local(cnpjs, bulk=None):
+    """
+    Versão local de fetch_batch: consulta o dump oficial em vez da API.
+    Retorna lista de resultados (na ordem de entrada).
+    """
+    return list(iter_fetch_local(cnpjs, bulk))
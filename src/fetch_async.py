@@ -0,0 +1,222 @@
+# src/fetch_async.py
+"""
+Modo de busca assíncrono (asyncio) para a API de CNPJ.
+
+- Um único cliente HTTP/1.1 com pool de conexões keep-alive (aiohttp)
+- Token bucket (requisições/s + burst) controlando o ritmo global
+- Backoff adaptativo: respeita Retry-After em 429 e reduz a taxa até a API aliviar
+- Janela limitada de requisições em andamento (max_in_flight)
+- Leituras e gravações do cache (SQLite) rodam em threads (asyncio.to_thread),
+  fora do event loop
+
+Retorna os mesmos dicionários de fetch_api.fetch_cnpj.
+"""
+import os
+import sys
+import asyncio
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from fetch_api import url_template, new_result, from_cache
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Limitador token bucket: 'rate' tokens por segundo, acumulando até 'burst'.
+
+    penalize() reduz a taxa pela metade (até min_rate) e pause() congela o balde,
+    ambos usados quando a API responde 429. reward() recupera a taxa aos poucos.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.5):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated_at = None
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self.updated_at is None:
+                    self.updated_at = now
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+        # o balde volta a encher só a partir do fim da pausa (senão a espera inteira
+        # viraria tokens e sairia uma rajada logo depois do 429)
+        self.tokens = 0.0
+        self.updated_at = self.paused_until
+
+    def penalize(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        # aumento aditivo: ~10% da taxa configurada por resposta bem-sucedida
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+def parse_retry_after(value, default=None):
+    """
+    Converte o header Retry-After (segundos ou data HTTP) em segundos de espera.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+async def fetch_cnpj_async(cnpj, session, bucket, timeout=8, max_retries=3, backoff_factor=0.5, cache=None,
+                           base_url=None):
+    """
+    Versão assíncrona de fetch_api.fetch_cnpj (mesmo formato de retorno).
+    """
+    result = await _fetch_cnpj_async(cnpj, session, bucket, timeout, max_retries, backoff_factor, base_url)
+    if cache is not None:
+        await asyncio.to_thread(cache.store_result, result)
+    return result
+
+
+async def _fetch_cnpj_async(cnpj, session, bucket, timeout, max_retries, backoff_factor, base_url=None):
+    import aiohttp
+
+    result = new_result(cnpj)
+    if not result["valid_format"]:
+        return result
+
+    url = url_template(base_url).format(result["cnpj"])
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        retry_in = None
+        try:
+            async with session.get(url, timeout=client_timeout) as resp:
+                if resp.status == 200:
+                    bucket.reward()
+                    try:
+                        result["data"] = await resp.json(content_type=None)
+                        result["error"] = None
+                    except Exception as e_json:
+                        result["error"] = f"json_error:{str(e_json)}"
+                    return result
+                if resp.status == 404:
+                    bucket.reward()
+                    result["error"] = "not_found"
+                    return result
+
+                result["error"] = f"http_{resp.status}"
+                if resp.status not in RETRY_STATUS:
+                    return result
+
+                retry_in = backoff_factor * (2 ** attempt)
+                if resp.status == 429:
+                    retry_in = parse_retry_after(resp.headers.get("Retry-After"), retry_in)
+                    bucket.penalize()
+                    bucket.pause(retry_in)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            result["error"] = str(e) or type(e).__name__
+            retry_in = backoff_factor * (2 ** attempt)
+
+        if attempt < max_retries:
+            # jitter evita que todas as tarefas voltem ao mesmo tempo
+            await asyncio.sleep(retry_in * (1 + random.random() * 0.25))
+
+    return result
+
+
+async def iter_fetch_async(cnpjs, max_in_flight=32, rate=10.0, burst=20, timeout=8, max_retries=3, cache=None,
+                           base_url=None):
+    """
+    Gerador assíncrono: busca os CNPJs e produz cada resultado assim que termina
+    (ordem de conclusão). No máximo 'max_in_flight' requisições ficam em andamento.
+    Com 'cache', CNPJs já conhecidos são respondidos localmente sem consumir tokens.
+    """
+    import aiohttp
+
+    bucket = TokenBucket(rate, burst)
+    queries = iter(cnpjs)
+    done = object()
+    out = asyncio.Queue(maxsize=max_in_flight * 2)
+
+    connector = aiohttp.TCPConnector(limit=max_in_flight, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def worker():
+            for c in queries:
+                if cache is None:
+                    res = from_cache(c, None)  # só resolve formato inválido, sem I/O
+                else:
+                    res = await asyncio.to_thread(from_cache, c, cache)
+                if res is not None:
+                    await out.put(res)
+                    continue
+                try:
+                    res = await fetch_cnpj_async(c, session, bucket, timeout, max_retries, cache=cache, base_url=base_url)
+                except Exception as e:
+                    res = {"query": c, "cnpj": None, "valid_format": False, "data": None, "error": str(e)}
+                await out.put(res)
+            await out.put(done)
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, max_in_flight))]
+        try:
+            running = len(workers)
+            while running:
+                res = await out.get()
+                if res is done:
+                    running -= 1
+                    continue
+                yield res
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def fetch_batch_async(cnpjs, max_in_flight=32, rate=10.0, burst=20, timeout=8, max_retries=3, cache=None,
+                            base_url=None):
+    """
+    Busca uma lista de CNPJs de forma assíncrona.
+    Retorna lista de resultados (ordem de conclusão), igual a fetch_api.fetch_batch.
+    """
+    return [
+        res async for res in iter_fetch_async(cnpjs, max_in_flight, rate, burst, timeout, max_retries, cache, base_url)
+    ]
+
+
+def fetch_batch_asyncio(cnpjs, max_in_flight=32, rate=10.0, burst=20, timeout=8, max_retries=3, cache=None,
+                        base_url=None):
+    """
+    Ponto de entrada síncrono do modo assíncrono (executa o event loop).
+    """
+    return asyncio.run(fetch_batch_async(cnpjs, max_in_flight, rate, burst, timeout, max_retries, cache, base_url))
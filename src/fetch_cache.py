@@ -0,0 +1,168 @@
+# src/fetch_cache.py
+"""
+Cache persistente (SQLite, arquivo único) para respostas da API de CNPJ.
+
+- Chave: CNPJ normalizado (14 dígitos)
+- Valor: JSON bruto comprimido (zlib)
+- TTL por entrada; respostas 'not_found' também são guardadas (cache negativo, TTL menor)
+- Limite de tamanho com despejo LRU (menos recentemente acessado sai primeiro)
+- Acessos (last_access) ficam em memória e são gravados em lote: a cada
+  TOUCH_BATCH hits, antes de um despejo e no close(); um hit não escreve no disco
+- Contadores de hit/miss
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+DAY = 24 * 60 * 60
+# custo aproximado de cada linha além do payload (conta também as entradas negativas)
+ROW_OVERHEAD = 64
+TOUCH_BATCH = 1000  # hits acumulados antes de gravar os last_access
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cnpj TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload BLOB,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+"""
+
+
+class CnpjCache:
+    """
+    Cache de respostas por CNPJ. Seguro para uso a partir de várias threads.
+    """
+
+    def __init__(self, path, ttl=7 * DAY, not_found_ttl=1 * DAY, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._touched = {}  # cnpj → último acesso ainda não gravado
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, cnpj: str):
+        """
+        Retorna {'data': ..., 'error': ...} se houver entrada válida, senão None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, payload, size, expires_at FROM entries WHERE cnpj = ?", (cnpj,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            status, payload, size, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM entries WHERE cnpj = ?", (cnpj,))
+                self._conn.commit()
+                self._touched.pop(cnpj, None)
+                self._total_bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._touched[cnpj] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+
+        if status == "not_found":
+            return {"data": None, "error": "not_found"}
+        return {"data": json.loads(zlib.decompress(payload)), "error": None}
+
+    def put(self, cnpj: str, data=None, error=None):
+        """
+        Guarda uma resposta. Só respostas definitivas entram no cache:
+        JSON encontrado ou 'not_found'. Erros transitórios (timeout, http_5xx) são ignorados.
+        """
+        if data is not None and error is None:
+            status, ttl = "ok", self.ttl
+            payload = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        elif error == "not_found":
+            status, ttl = "not_found", self.not_found_ttl
+            payload = None
+        else:
+            return
+
+        now = time.time()
+        size = ROW_OVERHEAD + (len(payload) if payload else 0)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE cnpj = ?", (cnpj,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (cnpj, status, payload, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cnpj, status, payload, size, now + ttl, now),
+            )
+            self._touched.pop(cnpj, None)
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def store_result(self, result: dict):
+        """Guarda um resultado no formato de fetch_api.fetch_cnpj."""
+        if result.get("cnpj") and result.get("valid_format"):
+            self.put(result["cnpj"], result.get("data"), result.get("error"))
+
+    def _flush_touched(self):
+        # grava os last_access pendentes (chamado com o lock; o commit fica com quem chama)
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET last_access = ? WHERE cnpj = ?",
+                [(t, c) for c, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        # despeja os menos recentemente acessados, um a um, só até voltar ao limite
+        self._flush_touched()
+        victims = []
+        for cnpj, size in self._conn.execute("SELECT cnpj, size FROM entries ORDER BY last_access"):
+            if self._total_bytes <= self.max_bytes:
+                break
+            victims.append((cnpj,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE cnpj = ?", victims)
+        self.evicted += len(victims)
+
+    def flush(self):
+        """Grava os acessos pendentes (last_access) no disco."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
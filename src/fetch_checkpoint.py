@@ -0,0 +1,162 @@
+# src/fetch_checkpoint.py
+"""
+Execução retomável da busca de CNPJs.
+
+- Cada resultado é gravado (append) em um JSONL assim que termina
+- Um checkpoint compacto (array ordenado de CNPJs uint64 em .npy) guarda o que já
+  foi concluído e é regravado periodicamente, de forma atômica
+- Na retomada (--resume), os CNPJs do checkpoint são pulados; o checkpoint é
+  completado com os resultados definitivos já gravados no JSONL (os gravados depois
+  do último flush não são buscados de novo nem duplicados)
+"""
+import os
+import sys
+import time
+import numpy as np
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from jsonl_io import JsonlWriter, iter_jsonl
+from utils import validate_cnpj_batch
+
+# erros definitivos: não adianta buscar de novo na retomada
+FINAL_ERRORS = (None, "not_found", "invalid_format")
+
+
+def cnpj_keys(values) -> np.ndarray:
+    """
+    Converte CNPJs (qualquer formato) em chaves uint64; vazios viram 0.
+    """
+    _, normalized = validate_cnpj_batch(values)
+    return np.array([int(c) if c else 0 for c in normalized], dtype=np.uint64)
+
+
+def is_final(result: dict) -> bool:
+    return result.get("error") in FINAL_ERRORS
+
+
+class FetchCheckpoint:
+    """
+    Conjunto ordenado (np.uint64) de CNPJs já concluídos, persistido em .npy.
+    """
+
+    def __init__(self, path, resume=False, results_path=None):
+        self.path = path
+        self.done = np.empty(0, dtype=np.uint64)
+        if resume and os.path.exists(path):
+            self.done = np.load(path)
+        self._new = []
+        if resume and results_path and os.path.exists(results_path):
+            self.recover(results_path)
+
+    def recover(self, results_path, chunk_size=50_000):
+        """
+        Acrescenta ao checkpoint os CNPJs com resultado definitivo no JSONL de resultados.
+        Cobre a janela entre a gravação de um resultado e o flush do checkpoint
+        (uma queda ali não faz a retomada buscar e gravar o CNPJ outra vez).
+        """
+        for chunk in iter_jsonl(results_path, chunk_size, on_error="skip"):
+            self._new.extend(int(r["cnpj"]) for r in chunk if r.get("cnpj") and is_final(r))
+        self.flush()
+
+    def __len__(self):
+        return len(self.done) + len(self._new)
+
+    def pending(self, queries):
+        """Retorna as queries ainda não concluídas (na ordem original)."""
+        if not len(self.done):
+            return list(queries)
+        keys = cnpj_keys(queries)
+        skip = np.isin(keys, self.done) & (keys != 0)
+        return [q for q, s in zip(queries, skip) if not s]
+
+    def mark(self, result: dict):
+        if result.get("cnpj") and is_final(result):
+            self._new.append(int(result["cnpj"]))
+
+    def flush(self):
+        if not self._new:
+            return
+        self.done = np.union1d(self.done, np.array(self._new, dtype=np.uint64))
+        self._new = []
+        tmp = self.path + ".tmp.npy"
+        np.save(tmp, self.done)
+        os.replace(tmp, self.path)
+
+
+class ResultWriter:
+    """
+    Grava resultados de fetch_cnpj em JSONL (um resultado completo por linha)
+    e atualiza o checkpoint a cada 'flush_every' resultados ou 'flush_seconds'.
+    O JSONL é sempre descarregado em disco antes do checkpoint, então o checkpoint
+    nunca aponta para um resultado que não foi gravado.
+    """
+
+    def __init__(self, path, checkpoint: FetchCheckpoint, append=False, flush_every=1000, flush_seconds=30.0):
+        self.path = path
+        self.checkpoint = checkpoint
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self._since_flush = 0
+        self._last_flush = time.monotonic()
+        self._fout = JsonlWriter(path, append=append)
+        if append and self._fout.tell() > 0 and not _ends_with_newline(path):
+            # última linha ficou truncada numa queda: isola o que vier depois
+            self._fout.write_raw("")
+
+    def write(self, result: dict):
+        self._fout.write(result)
+        self.checkpoint.mark(result)
+        self.written += 1
+        self._since_flush += 1
+        if self._since_flush >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self._fout.flush()
+        os.fsync(self._fout.fileno())
+        self.checkpoint.flush()
+        self._since_flush = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._fout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def iter_results(path, chunk_size=50_000, checkpoint: FetchCheckpoint = None):
+    """
+    Lê o JSONL de resultados em blocos (listas de dicts), sem carregar o arquivo inteiro.
+    Com 'checkpoint', descarta tentativas com erro transitório de CNPJs que depois
+    foram concluídos (sobrepostas por uma retomada).
+    """
+    # linhas truncadas por uma queda no meio da escrita são puladas
+    for chunk in iter_jsonl(path, chunk_size, on_error="skip"):
+        yield _drop_superseded(chunk, checkpoint)
+
+
+def _drop_superseded(chunk, checkpoint):
+    if checkpoint is None or not len(checkpoint.done):
+        return chunk
+    transient = [i for i, r in enumerate(chunk) if not is_final(r) and r.get("cnpj")]
+    if not transient:
+        return chunk
+    keys = cnpj_keys([chunk[i]["cnpj"] for i in transient])
+    superseded = {i for i, s in zip(transient, np.isin(keys, checkpoint.done)) if s}
+    return [r for i, r in enumerate(chunk) if i not in superseded]
@@ -1,20 +1,57 @@
 import argparse
-import pandas as pd
+import os
+import sys
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import storage
+from dimensions import encode_dimensions, fold_text, uf_matches
+from lead_index import open_index, take_rows
+from utils import NON_DIGIT
+
 # ---------------------------
 # Funções de filtro
 # ---------------------------
 
+def as_list(values):
+    """Aceita um valor, vários valores separados por vírgula ou uma lista."""
+    if not values:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    return [v.strip() for item in values for v in str(item).split(",") if v.strip()]
+
+
 def filter_by_uf(df, uf):
-    if uf:
-        df = df[df["uf"].str.contains(uf, na=False)]
+    ufs = as_list(uf)
+    if ufs:
+        # regra avaliada uma vez por valor distinto (dimensions.uf_matches, a mesma do índice)
+        codes, values = pd.factorize(df["uf"], use_na_sentinel=True)
+        ok = np.append(uf_matches(values, ufs), False)  # código -1 (nulo) → False
+        df = df[ok[codes]]
     return df
 
 
 def filter_by_cnae(df, cnae):
-    if cnae:
-        df = df[df["cnae_fiscal"].str.contains(cnae, na=False)]
+    prefixes = [NON_DIGIT.sub("", c) for c in as_list(cnae)]
+    prefixes = tuple(p for p in prefixes if p)
+    if prefixes:
+        df = df[df["cnae_fiscal"].astype("string").str.startswith(prefixes).fillna(False)]
+    return df
+
+
+def filter_by_municipio(df, municipio):
+    names = {fold_text(m) for m in as_list(municipio)}
+    if names:
+        folded = df["municipio"].astype("string").fillna("").map(fold_text)
+        df = df[folded.isin(names)]
     return df
 
 
@@ -36,18 +73,26 @@ def main():
 
     parser.add_argument(
         "--input",
-        default="data_processed/leads_b2b_final.csv",
-        help="CSV de entrada"
+        default=storage.path("leads_b2b_final"),
+        help="Arquivo de entrada (Parquet ou CSV)"
     )
 
     parser.add_argument(
         "--uf",
-        help="Filtrar por UF (ex: SC, SP, RJ)"
+        nargs="+",
+        help="Filtrar por UF; aceita vários valores (ex: --uf SC SP ou --uf SC,SP)"
     )
 
     parser.add_argument(
         "--cnae",
-        help="Filtrar por CNAE (ex: 1412)"
+        nargs="+",
+        help="Filtrar por prefixo de CNAE; aceita vários (ex: --cnae 1412 6201)"
+    )
+
+    parser.add_argument(
+        "--municipio",
+        nargs="+",
+        help="Filtrar por município; aceita vários (ex: --municipio Blumenau Joinville)"
     )
 
     parser.add_argument(
@@ -56,6 +101,18 @@ def main():
         help="Apenas empresas com telefone ou email"
     )
 
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Filtra varrendo a tabela em vez de usar o índice persistido"
+    )
+
+    parser.add_argument(
+        "--rebuild-index",
+        action="store_true",
+        help="Reconstrói o índice antes de filtrar"
+    )
+
     parser.add_argument(
         "--output",
         default="data_processed/leads_filtrados.csv",
@@ -64,15 +121,28 @@ def main():
 
     args = parser.parse_args()
 
-    print("🔹 Lendo CSV...")
-    df = pd.read_csv(args.input)
-    print(f"🔹 Registros iniciais: {len(df)}")
-
-    df = filter_by_uf(df, args.uf)
-    df = filter_by_cnae(df, args.cnae)
-
-    if args.only_contact:
-        df = filter_contact(df)
+    if args.no_index:
+        print("🔹 Lendo leads...")
+        df = encode_dimensions(storage.read_path(args.input))
+        print(f"🔹 Registros iniciais: {len(df)}")
+
+        df = filter_by_uf(df, args.uf)
+        df = filter_by_cnae(df, args.cnae)
+        df = filter_by_municipio(df, args.municipio)
+
+        if args.only_contact:
+            df = filter_contact(df)
+    else:
+        index = open_index(args.input, rebuild=args.rebuild_index)
+        print(f"🔹 Registros iniciais: {index.rows}")
+
+        rows = index.query(
+            cnae=as_list(args.cnae),
+            uf=as_list(args.uf),
+            municipio=as_list(args.municipio),
+            only_contact=args.only_contact,
+        )
+        df = take_rows(args.input, rows)
 
     print(f"✅ Registros após filtros: {len(df)}")
 
@@ -0,0 +1,189 @@
+# src/jsonl_io.py
+"""
+Leitura e escrita de JSONL (um JSON por linha) para arquivos grandes.
+
+- Backend rápido quando instalado (orjson); senão, json da biblioteca padrão
+- Leitura paralela (map_shards): o arquivo é dividido em faixas de bytes alinhadas
+  em quebras de linha ("shards") e cada faixa é lida, parseada e reduzida num
+  processo separado. Só compensa quando a redução é pequena (contagens, colunas
+  projetadas): devolver os objetos inteiros custa mais em pickle do que parseá-los,
+  por isso read_jsonl é sequencial
+- Escrita em bytes; textos que já são JSON (ex: raw_json) são gravados como estão,
+  sem o ciclo parse → dump
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # backend opcional
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+MIN_SHARD_BYTES = 8 << 20  # abaixo disso não compensa abrir processos
+READ_BLOCK = 1 << 20
+
+
+# ===============================
+# Backend
+# ===============================
+
+if orjson is not None:
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj) -> bytes:
+        # NaN/Infinity viram null; chaves não-texto são convertidas como no json
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=str)
+
+    DECODE_ERRORS = (orjson.JSONDecodeError,)
+else:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+    DECODE_ERRORS = (ValueError,)
+
+
+def dumps_text(obj) -> str:
+    """dumps como str (ex: coluna raw_json de um DataFrame)."""
+    return dumps(obj).decode("utf-8")
+
+
+# ===============================
+# Leitura
+# ===============================
+
+def shard_ranges(path, shards):
+    """
+    Divide o arquivo em até 'shards' faixas [início, fim) de bytes; cada fronteira
+    é empurrada para logo depois de uma quebra de linha, então nenhuma linha é cortada.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    shards = max(1, min(shards, size // MIN_SHARD_BYTES or 1))
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards, bounds[-1]))
+            f.readline()  # termina a linha em andamento
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def iter_range(path, start=0, end=None, on_error="skip"):
+    """
+    Objetos das linhas que começam dentro de [start, end).
+    Linhas malformadas (ex: truncadas por uma queda): on_error="skip" pula,
+    on_error="raw" devolve {"_raw": linha}.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except DECODE_ERRORS:
+                if on_error == "raw":
+                    yield {"_raw": line.decode("utf-8", errors="replace")}
+
+
+def iter_jsonl(path, chunk_size=50_000, on_error="skip"):
+    """Lê o arquivo sequencialmente em blocos (listas de objetos)."""
+    chunk = []
+    for obj in iter_range(path, on_error=on_error):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_shard(args):
+    path, start, end, on_error, func = args
+    records = list(iter_range(path, start, end, on_error))
+    return func(records) if func is not None else records
+
+
+def map_shards(path, func=None, workers=None, on_error="skip"):
+    """
+    Lê o arquivo em faixas paralelas e aplica 'func' (função de módulo, para poder
+    ir a outro processo) à lista de objetos de cada faixa, no próprio processo
+    trabalhador: só o resultado de 'func' volta ao processo principal.
+    Retorna os resultados na ordem do arquivo.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = shard_ranges(path, workers)
+    tasks = [(path, a, b, on_error, func) for a, b in ranges]
+    if len(tasks) <= 1:
+        return [_read_shard(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as ex:
+        return list(ex.map(_read_shard, tasks))
+
+
+def read_jsonl(path, on_error="skip"):
+    """
+    Todos os objetos do arquivo (na ordem original), parseados sequencialmente:
+    com todos os objetos no processo principal, paralelizar só acrescenta o pickle
+    de volta (para reduções por faixa, use map_shards com 'func').
+    """
+    return list(iter_range(path, on_error=on_error))
+
+
+# ===============================
+# Escrita
+# ===============================
+
+class JsonlWriter:
+    """
+    Grava objetos (write) ou textos que já são JSON (write_raw) um por linha,
+    em modo binário com buffer grande.
+    """
+
+    def __init__(self, path, append=False, buffering=READ_BLOCK):
+        self.path = path
+        self.written = 0
+        self._fout = open(path, "ab" if append else "wb", buffering=buffering)
+
+    def write(self, obj):
+        self._fout.write(dumps(obj) + b"\n")
+        self.written += 1
+
+    def write_raw(self, text):
+        """Grava um JSON já serializado (uma linha, sem quebras) sem re-parsear."""
+        self._fout.write(text.encode("utf-8") + b"\n")
+        self.written += 1
+
+    def flush(self):
+        self._fout.flush()
+
+    def fileno(self):
+        return self._fout.fileno()
+
+    def tell(self):
+        return self._fout.tell()
+
+    def close(self):
+        self._fout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,23 +1,27 @@
+import numpy as np
 import pandas as pd
 
+from src.scoring_rules import apply_rule, get_rule
+
 
 def classify_leads(df: pd.DataFrame) -> pd.DataFrame:
     """
     Classifica leads com base no structural_score.
+    Faixas e rótulos em config/scoring_rules.json ("lead_classification");
+    a saída é categórica, com as categorias na ordem das faixas (rótulo de 'missing'
+    primeiro, a menos que ele seja também o rótulo de uma das faixas).
     """
+    rule = get_rule("lead_classification")
+    codes = apply_rule(df, "lead_classification")
 
-    def classify(score):
-        if score == 100:
-            return "PRIORITÁRIO"
-        elif score == 80:
-            return "BOM"
-        elif score == 60:
-            return "MÉDIO"
-        elif score == 20:
-            return "DESCARTAR"
-        else:
-            return "INDEFINIDO"
-
-    df["lead_classification"] = df["structural_score"].apply(classify)
+    values = list(rule["values"])
+    if rule["missing"] in values:
+        # ex: missing → "DESCARTAR": nulos recebem o código dessa faixa
+        categories = values
+        codes = np.where(codes < 0, values.index(rule["missing"]), codes)
+    else:
+        categories = [rule["missing"]] + values
+        codes = codes + 1
+    df["lead_classification"] = pd.Categorical.from_codes(codes, categories=categories)
 
     return df
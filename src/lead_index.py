@@ -0,0 +1,233 @@
+# src/lead_index.py
+"""
+Índice persistido para filtrar a tabela final de leads sem varrer o arquivo.
+
+Construído uma vez por arquivo final (reconstruído quando o arquivo muda) e
+gravado ao lado dele (leads_b2b_final.index.npz):
+- CNAE: códigos ordenados + permutação das linhas → cada prefixo ("1412", "62")
+  é um intervalo contíguo (searchsorted)
+- UF: um bitmap compactado (np.packbits) por UF
+- Município: listas de linhas por município (CSR: ordem + offsets)
+- Contato: bitmap de linhas com telefone ou e-mail
+- Classificação do lead (quando a tabela tem a coluna): um bitmap por classe
+
+Uma consulta (ex: --cnae 1412 --uf SC --only-contact) vira OR dentro de cada
+filtro e AND entre filtros sobre bitmaps, em milissegundos.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import storage
+from dimensions import fold_text, uf_matches, uf_sigla
+from utils import NON_DIGIT
+
+INDEX_SUFFIX = ".index.npz"
+INDEX_VERSION = 3
+INDEX_COLUMNS = ["cnae_fiscal", "uf", "municipio", "telefone", "email", "lead_classification"]
+
+
+def index_path(table_path):
+    return os.path.splitext(table_path)[0] + INDEX_SUFFIX
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return np.array([INDEX_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _read_columns(table_path):
+    if table_path.endswith(".parquet"):
+        names = pq.read_schema(table_path).names
+        return storage.read_path(table_path, columns=[c for c in INDEX_COLUMNS if c in names])
+    return storage.read_path(table_path)
+
+
+def _factorize(df, column, normalize=None):
+    """
+    Códigos inteiros (-1 = nulo) e valores distintos (texto) de uma coluna.
+    'normalize' (por valor distinto) junta valores equivalentes, ex.: "Santa Catarina" → "SC";
+    valores que normalizam para "" viram nulos.
+    """
+    if column not in df:
+        return np.full(len(df), -1, dtype=np.int64), []
+    codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+    values = [str(u) for u in uniques]
+    if normalize is None:
+        return codes, values
+    normalized = np.array([normalize(v) or None for v in values], dtype=object)
+    merged_codes, merged = pd.factorize(normalized, use_na_sentinel=True)
+    return np.append(merged_codes, -1)[codes], [str(v) for v in merged]
+
+
+# ===============================
+# Construção
+# ===============================
+
+def _bitmaps(df, column, normalize=None):
+    """Um bitmap compactado por valor distinto da coluna."""
+    codes, values = _factorize(df, column, normalize)
+    bitmaps = np.stack(
+        [np.packbits(codes == i) for i in range(len(values))]
+    ) if values else np.empty((0, (len(df) + 7) // 8), dtype=np.uint8)
+    return np.array(values, dtype=str), bitmaps
+
+
+def index_arrays(df: pd.DataFrame) -> dict:
+    """Estruturas do índice para um DataFrame já carregado (colunas ausentes ficam vazias)."""
+    n = len(df)
+    arrays = {"rows": np.array([n], dtype=np.int64)}
+
+    # CNAE: códigos ordenados (só os preenchidos) e as linhas correspondentes;
+    # a ordenação é feita sobre o posto (rank) de cada valor distinto
+    codes, uniques = _factorize(df, "cnae_fiscal")
+    cnae_values = np.array([NON_DIGIT.sub("", u)[:7] for u in uniques], dtype="S7")
+    rank = np.empty(len(cnae_values), dtype=np.int64)
+    rank[np.argsort(cnae_values, kind="stable")] = np.arange(len(cnae_values))
+    filled = np.flatnonzero(np.append(cnae_values != b"", False)[codes])  # código -1 → False
+    order = filled[np.argsort(rank[codes[filled]], kind="stable")]
+    arrays["cnae_sorted"] = cnae_values[codes[order]]
+    arrays["cnae_rows"] = order.astype(np.int64)
+
+    # UF e classificação do lead: um bitmap por valor; UF pelo valor canônico
+    # (sigla), o mesmo que a varredura vê depois de encode_dimensions
+    arrays["uf_values"], arrays["uf_bitmaps"] = _bitmaps(df, "uf", uf_sigla)
+    arrays["class_values"], arrays["class_bitmaps"] = _bitmaps(df, "lead_classification")
+
+    # Município: linhas agrupadas por valor (chave sem acento/caixa; nulos no código -1)
+    raw_codes, raw_values = _factorize(df, "municipio")
+    folded_codes, mun_values = pd.factorize(np.array([fold_text(v) for v in raw_values], dtype=object))
+    mun_codes = np.append(folded_codes, -1)[raw_codes]
+    mun_order = np.argsort(mun_codes, kind="stable")
+    arrays["mun_values"] = np.array(mun_values, dtype=str)
+    arrays["mun_rows"] = mun_order.astype(np.int64)
+    arrays["mun_offsets"] = np.searchsorted(mun_codes[mun_order], np.arange(len(mun_values) + 1))
+
+    # Contato: telefone ou e-mail não vazios
+    has_contact = np.zeros(n, dtype=bool)
+    for col in ("telefone", "email"):
+        if col in df:
+            has_contact |= (df[col].astype("string").str.strip().fillna("") != "").to_numpy(dtype=bool)
+    arrays["contact_bitmap"] = np.packbits(has_contact)
+    return arrays
+
+
+def build_index(table_path):
+    """Lê só as colunas filtráveis da tabela final e grava o índice."""
+    arrays = index_arrays(_read_columns(table_path))
+    arrays["stamp"] = _stamp(table_path)
+
+    path = index_path(table_path)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+# ===============================
+# Consulta
+# ===============================
+
+class LeadIndex:
+    """Índice carregado; 'query' devolve as posições (ordenadas) das linhas que passam."""
+
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        self.rows = int(arrays["rows"][0])
+        self.mun_pos = {v: i for i, v in enumerate(arrays["mun_values"])}
+        self.class_pos = {fold_text(v): i for i, v in enumerate(arrays.get("class_values", []))}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def _from_rows(self, rows) -> np.ndarray:
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+
+    def cnae_bitmap(self, prefixes) -> np.ndarray:
+        """Linhas cujo CNAE (7 dígitos) começa com algum dos prefixos (ex: "1412", "14.12-6")."""
+        sorted_codes = self.arrays["cnae_sorted"]
+        parts = []
+        for prefix in prefixes:
+            p = NON_DIGIT.sub("", str(prefix)).encode()
+            if not p:
+                continue
+            lo = np.searchsorted(sorted_codes, p, side="left")
+            hi = np.searchsorted(sorted_codes, p + b"\xff", side="left")
+            parts.append(self.arrays["cnae_rows"][lo:hi])
+        return self._from_rows(np.concatenate(parts)) if parts else self._empty()
+
+    def uf_bitmap(self, ufs) -> np.ndarray:
+        """Mesma regra da varredura (dimensions.uf_matches), aplicada aos valores do índice."""
+        bitmap = self._empty()
+        for i in np.flatnonzero(uf_matches(self.arrays["uf_values"], ufs)):
+            bitmap |= self.arrays["uf_bitmaps"][i]
+        return bitmap
+
+    def classification_bitmap(self, classes) -> np.ndarray:
+        bitmap = self._empty()
+        for c in classes:
+            i = self.class_pos.get(fold_text(str(c)))
+            if i is not None:
+                bitmap |= self.arrays["class_bitmaps"][i]
+        return bitmap
+
+    def municipio_bitmap(self, municipios) -> np.ndarray:
+        offsets = self.arrays["mun_offsets"]
+        parts = []
+        for m in municipios:
+            i = self.mun_pos.get(fold_text(str(m)))
+            if i is not None:
+                parts.append(self.arrays["mun_rows"][offsets[i]:offsets[i + 1]])
+        return self._from_rows(np.concatenate(parts)) if parts else self._empty()
+
+    def query(self, cnae=None, uf=None, municipio=None, only_contact=False, classification=None) -> np.ndarray:
+        """
+        Filtros com vários valores cada (OR dentro do filtro, AND entre filtros).
+        Filtros vazios/None não restringem.
+        """
+        bitmap = np.full((self.rows + 7) // 8, 0xFF, dtype=np.uint8)
+        if cnae:
+            bitmap &= self.cnae_bitmap(cnae)
+        if uf:
+            bitmap &= self.uf_bitmap(uf)
+        if municipio:
+            bitmap &= self.municipio_bitmap(municipio)
+        if classification:
+            bitmap &= self.classification_bitmap(classification)
+        if only_contact:
+            bitmap &= self.arrays["contact_bitmap"]
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.rows))
+
+
+def open_index(table_path, rebuild=False) -> LeadIndex:
+    """Abre o índice da tabela, (re)construindo-o se não existir ou estiver desatualizado."""
+    path = index_path(table_path)
+    if not rebuild and os.path.exists(path):
+        index = LeadIndex.load(path)
+        if np.array_equal(index.arrays["stamp"], _stamp(table_path)):
+            return index
+    print("🔧 Construindo índice de leads:", path)
+    return LeadIndex.load(build_index(table_path))
+
+
+def take_rows(table_path, rows) -> pd.DataFrame:
+    """Lê só as linhas selecionadas da tabela final."""
+    if table_path.endswith(".parquet"):
+        table = pq.read_table(table_path, memory_map=True)
+        return storage.apply_schema(table.take(rows).to_pandas())
+    return storage.read_path(table_path).iloc[rows].reset_index(drop=True)
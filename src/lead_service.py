@@ -0,0 +1,308 @@
+"""
+Serviço HTTP/JSON de consulta de leads (processo de longa duração).
+
+A tabela final é carregada uma única vez em memória (pyarrow.Table) junto com o
+índice de bitmaps (lead_index); cada consulta é só AND/OR de bitmaps + take.
+Quando o pipeline grava uma nova saída, o snapshot é reconstruído em segundo
+plano e trocado atomicamente (consultas em andamento terminam no antigo).
+
+Endpoints:
+- GET  /health
+- GET  /leads?uf=SC,SP&cnae=62&municipio=&classification=A&only_contact=1&page=1&page_size=100
+- GET  /aggregate?by=uf&...filtros...     contagens por valor dos leads filtrados
+- GET  /export.csv?...filtros...          CSV em streaming (chunked)
+- POST /reload                            força a recarga
+
+Uso:
+    python src/lead_service.py --port 8080
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+import storage
+from lead_index import INDEX_COLUMNS, LeadIndex, index_arrays
+from filter_leads import as_list
+from utils import NON_DIGIT
+
+FINAL_TABLE = "leads_b2b_final"
+CLASSIFIED_TABLE = "leads_b2b_classified"
+
+AGGREGATE_COLUMNS = ["uf", "municipio", "cnae_secao", "cnae_divisao", "lead_classification"]
+MAX_PAGE_SIZE = 1000
+# filtros que aceitam o parâmetro repetido (?uf=SC&uf=SP); nos demais vale o último valor
+MULTI_PARAMS = ("cnae", "uf", "municipio", "classification")
+EXPORT_BATCH = 10_000
+
+
+# ===============================
+# Snapshot em memória
+# ===============================
+
+def _read_arrow(path) -> pa.Table:
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    return pa.Table.from_pandas(storage.read_path(path), preserve_index=False)
+
+
+def _file_stamp(path):
+    if not path or not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _join_classification(table: pa.Table, classified_path) -> pa.Table:
+    """Traz lead_classification da tabela classificada (primeira ocorrência de cada CNPJ)."""
+    if "lead_classification" in table.column_names or not classified_path:
+        return table
+    if not os.path.exists(classified_path):
+        return table
+    cls = storage.read_path(classified_path)
+    if "lead_classification" not in cls:
+        return table
+    keys = cls["cnpj"].astype("string").str.replace(NON_DIGIT, "", regex=True)
+    by_cnpj = pd.Series(cls["lead_classification"].astype("string").to_numpy(), index=keys)
+    by_cnpj = by_cnpj[~by_cnpj.index.duplicated()]
+    final_keys = pd.Series(table.column("cnpj").to_pandas(), dtype="string").str.replace(NON_DIGIT, "", regex=True)
+    values = by_cnpj.reindex(final_keys).to_numpy()
+    return table.append_column("lead_classification", pa.array(values, type=pa.string(), from_pandas=True).dictionary_encode())
+
+
+class LeadSnapshot:
+    """Tabela final + índice + códigos das colunas agregáveis, imutáveis após a carga."""
+
+    def __init__(self, path, classified_path=None):
+        started = time.perf_counter()
+        self.path = path
+        self.classified_path = classified_path
+        self.stamps = (_file_stamp(path), _file_stamp(classified_path))
+
+        table = _join_classification(_read_arrow(path), classified_path)
+        self.table = table
+        df = table.select([c for c in INDEX_COLUMNS if c in table.column_names]).to_pandas()
+        self.index = LeadIndex(index_arrays(df))
+
+        # códigos por coluna agregável: bincount sobre as linhas selecionadas
+        self.codes = {}
+        for col in AGGREGATE_COLUMNS:
+            if col in table.column_names:
+                codes, uniques = pd.factorize(table.column(col).to_pandas(), use_na_sentinel=True)
+                labels = np.array([str(u) for u in uniques] + ["N/A"], dtype=object)
+                self.codes[col] = (np.where(codes < 0, len(uniques), codes), labels)
+
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+
+    def is_stale(self):
+        return self.stamps != (_file_stamp(self.path), _file_stamp(self.classified_path))
+
+    def select(self, params) -> np.ndarray:
+        return self.index.query(
+            cnae=as_list(params.get("cnae")),
+            uf=as_list(params.get("uf")),
+            municipio=as_list(params.get("municipio")),
+            classification=as_list(params.get("classification")),
+            only_contact=_flag(params.get("only_contact")),
+        )
+
+    def page(self, rows, page, page_size):
+        start = (page - 1) * page_size
+        chunk = rows[start:start + page_size]
+        return self.table.take(pa.array(chunk, type=pa.int64())).to_pylist()
+
+    def aggregate(self, rows, by):
+        codes, labels = self.codes[by]
+        counts = np.bincount(codes[rows], minlength=len(labels))
+        order = np.argsort(-counts, kind="stable")
+        return [{"value": labels[i], "count": int(counts[i])} for i in order if counts[i]]
+
+    def export_chunks(self, rows):
+        """CSV em blocos: cabeçalho no primeiro bloco, EXPORT_BATCH linhas por bloco."""
+        for start in range(0, max(len(rows), 1), EXPORT_BATCH):
+            part = self.table.take(pa.array(rows[start:start + EXPORT_BATCH], type=pa.int64()))
+            part = pa.table([
+                pc.cast(c, c.type.value_type) if pa.types.is_dictionary(c.type) else c
+                for c in part.columns
+            ], names=part.column_names)
+            buf = io.BytesIO()
+            pacsv.write_csv(part, buf, pacsv.WriteOptions(include_header=start == 0))
+            yield buf.getvalue()
+
+
+def _flag(value):
+    return str(value).strip().lower() in ("1", "true", "sim", "yes") if value else False
+
+
+class SnapshotHolder:
+    """
+    Guarda o snapshot atual; a troca é uma atribuição de referência, então os
+    handlers nunca veem um snapshot pela metade.
+    """
+
+    def __init__(self, path, classified_path=None):
+        self.path = path
+        self.classified_path = classified_path
+        self.current = LeadSnapshot(path, classified_path)
+        self._lock = threading.Lock()
+
+    def reload(self, force=False):
+        with self._lock:
+            if not force and not self.current.is_stale():
+                return False
+            snapshot = LeadSnapshot(self.path, self.classified_path)
+            self.current = snapshot
+        print(f"🔄 Leads recarregados: {snapshot.index.rows} linhas em {snapshot.load_seconds:.2f}s")
+        return True
+
+    def watch(self, interval, stop: threading.Event):
+        """Verifica periodicamente se o pipeline gravou uma nova saída."""
+        while not stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:  # arquivo pela metade, etc. → tenta no próximo ciclo
+                print(f"⚠️ Falha ao recarregar leads: {e}")
+
+
+# ===============================
+# HTTP
+# ===============================
+
+class LeadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem em writes separados
+    holder: SnapshotHolder = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self):
+        url = urlsplit(self.path)
+        params = {k: v if k in MULTI_PARAMS else v[-1] for k, v in parse_qs(url.query).items()}
+        return url.path, params
+
+    def do_GET(self):
+        route, params = self._params()
+        snapshot = self.holder.current
+        try:
+            if route == "/health":
+                return self._json({
+                    "status": "ok",
+                    "rows": snapshot.index.rows,
+                    "loaded_at": snapshot.loaded_at,
+                    "load_seconds": round(snapshot.load_seconds, 3),
+                })
+            if route == "/leads":
+                page = max(int(params.get("page", 1)), 1)
+                page_size = min(max(int(params.get("page_size", 100)), 1), MAX_PAGE_SIZE)
+                rows = snapshot.select(params)
+                return self._json({
+                    "total": int(len(rows)),
+                    "page": page,
+                    "page_size": page_size,
+                    "items": snapshot.page(rows, page, page_size),
+                })
+            if route == "/aggregate":
+                by = params.get("by", "uf")
+                if by not in snapshot.codes:
+                    return self._json({"error": f"agregação indisponível: {by}",
+                                       "available": list(snapshot.codes)}, status=400)
+                rows = snapshot.select(params)
+                return self._json({"by": by, "total": int(len(rows)), "groups": snapshot.aggregate(rows, by)})
+            if route == "/export.csv":
+                return self._export(snapshot, snapshot.select(params))
+        except (ValueError, TypeError) as e:
+            return self._json({"error": str(e)}, status=400)
+        return self._json({"error": "rota não encontrada"}, status=404)
+
+    def do_POST(self):
+        route, _ = self._params()
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if route == "/reload":
+            self.holder.reload(force=True)
+            return self._json({"status": "reloaded", "rows": self.holder.current.index.rows})
+        return self._json({"error": "rota não encontrada"}, status=404)
+
+    def _export(self, snapshot, rows):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Disposition", 'attachment; filename="leads.csv"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in snapshot.export_chunks(rows):
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_server(path, host="127.0.0.1", port=8080, classified_path=None):
+    """Cria o servidor (sem iniciá-lo); port=0 escolhe uma porta livre."""
+    holder = SnapshotHolder(path, classified_path)
+    handler = type("BoundLeadHandler", (LeadHandler,), {"holder": holder})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.holder = holder
+    return server
+
+
+def serve(path, host="127.0.0.1", port=8080, classified_path=None, reload_interval=5.0):
+    server = make_server(path, host, port, classified_path)
+    stop = threading.Event()
+    if reload_interval > 0:
+        threading.Thread(target=server.holder.watch, args=(reload_interval, stop), daemon=True).start()
+
+    snapshot = server.holder.current
+    print(f"🚀 Serviço de leads em http://{host}:{server.server_address[1]} "
+          f"({snapshot.index.rows} linhas, carga em {snapshot.load_seconds:.2f}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP de consulta de leads B2B")
+    parser.add_argument("--input", default=storage.path(FINAL_TABLE), help="Tabela final (Parquet ou CSV)")
+    parser.add_argument("--classified", default=storage.path(CLASSIFIED_TABLE),
+                        help="Tabela classificada (fonte de lead_classification)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="Segundos entre verificações de nova saída do pipeline (0 = desliga)")
+    args = parser.parse_args()
+
+    serve(args.input, args.host, args.port, args.classified, args.reload_interval)
+
+
+if __name__ == "__main__":
+    main()
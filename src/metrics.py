@@ -0,0 +1,358 @@
+"""
+Instrumentação das etapas do pipeline (só biblioteca padrão: pode ser importado
+tanto como src.metrics quanto como metrics pelos módulos de fetch).
+
+Cada etapa roda dentro de metrics.stage("nome") e registra:
+- tempo de relógio e de CPU (deste processo + o informado pelos workers do
+  ProcessBackend via add_worker_cpu; filhos do pool só são colhidos no fim, então
+  RUSAGE_CHILDREN não serviria)
+- linhas de entrada e de saída (informadas pela etapa com st.count(...))
+- pico de memória residente (RSS) durante a etapa, amostrado por uma thread
+- bytes lidos e gravados (/proc/self/io; None fora do Linux)
+
+Etapas com o mesmo nome são somadas (ex: modo --stream, uma entrada por bloco).
+Etapas concorrentes (DAG) se sobrepõem: CPU, memória e bytes são do processo inteiro.
+
+Saídas: relatório JSON da execução (data_processed/run_reports/<run_id>.json),
+arquivo texto no formato Prometheus (coletor textfile do node_exporter) e, com
+profile="cprofile" ou "pyinstrument", um trace por etapa em <report_dir>/<run_id>/.
+"""
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+REPORT_DIR = os.path.join("data_processed", "run_reports")
+PROFILERS = ("cprofile", "pyinstrument")
+SAMPLE_INTERVAL = 0.02  # s, amostragem de RSS
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# ===============================
+# Leituras do processo
+# ===============================
+
+def current_rss():
+    """RSS atual em bytes (/proc/self/statm); fora do Linux, o pico do processo."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return max_rss()
+
+
+def max_rss():
+    """Pico de RSS do processo inteiro (ru_maxrss: KB no Linux, bytes no macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def io_counters():
+    """(bytes lidos, bytes gravados) pelo processo, inclusive de cache de disco; None se indisponível."""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            fields = dict(line.split(b":") for line in f.read().splitlines() if b":" in line)
+        return int(fields[b"rchar"]), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def cpu_time():
+    """CPU (usuário + sistema) do próprio processo (workers: ver add_worker_cpu)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    return own.ru_utime + own.ru_stime
+
+
+# ===============================
+# Métricas por etapa
+# ===============================
+
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.rows_in = None
+        self.rows_out = None
+        self.peak_rss_bytes = 0
+        self.read_bytes = None
+        self.written_bytes = None
+
+    def count(self, rows_in=None, rows_out=None):
+        """Soma linhas de entrada/saída (chamado pela etapa; aceita int ou DataFrame)."""
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + (rows_in if isinstance(rows_in, int) else len(rows_in))
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + (rows_out if isinstance(rows_out, int) else len(rows_out))
+
+    def observe_rss(self, rss):
+        if rss > self.peak_rss_bytes:
+            self.peak_rss_bytes = rss
+
+    def to_dict(self):
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_dropped": self.rows_in - self.rows_out if self.rows_in is not None and self.rows_out is not None else None,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "read_bytes": self.read_bytes,
+            "written_bytes": self.written_bytes,
+        }
+
+
+class _RssSampler(threading.Thread):
+    """Atualiza o pico de RSS de todas as etapas em andamento."""
+
+    def __init__(self, run):
+        super().__init__(name="metrics-rss", daemon=True)
+        self.run_metrics = run
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            rss = current_rss()
+            with self.run_metrics._lock:
+                for st in self.run_metrics._active:
+                    st.observe_rss(rss)
+
+
+class RunMetrics:
+    """
+    Métricas de uma execução. profile: None, "cprofile" ou "pyinstrument"
+    (um trace por etapa, somado entre chamadas da mesma etapa).
+    """
+
+    def __init__(self, run_id=None, mode=None, profile=None, report_dir=REPORT_DIR):
+        if profile not in (None,) + PROFILERS:
+            raise ValueError(f"Profiler desconhecido: {profile} (use {', '.join(PROFILERS)})")
+        if profile == "pyinstrument":
+            import pyinstrument  # noqa: F401  (falha já no início se não estiver instalado)
+        self.started_at = datetime.now(timezone.utc)
+        self.run_id = run_id or self.started_at.strftime("%Y%m%dT%H%M%S") + f"_{os.getpid()}"
+        self.mode = mode
+        self.profile = profile
+        self.report_dir = report_dir
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._active = []
+        self._sampler = None
+        self._profilers = {}
+        self._profiling = threading.local()
+        self._running = threading.local()  # pilha de etapas abertas por thread
+        self._worker_cpu = 0.0
+        self._t0 = time.perf_counter()
+        self._cpu0 = cpu_time()
+
+    @contextmanager
+    def stage(self, name):
+        """Mede o bloco como etapa 'name'; o objeto devolvido recebe as contagens de linhas."""
+        with self._lock:
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = StageMetrics(name)
+            st.calls += 1
+            self._active.append(st)
+            if self._sampler is None:
+                self._sampler = _RssSampler(self)
+                self._sampler.start()
+        st.observe_rss(current_rss())
+        running = self._running.__dict__.setdefault("stages", [])
+        running.append(st)
+        io0 = io_counters()
+        cpu0 = cpu_time()
+        t0 = time.perf_counter()
+        profiler = self._start_profiler(name)
+        try:
+            yield st
+        finally:
+            if profiler is not None:
+                self._stop_profiler(profiler)
+            running.remove(st)
+            st.wall_s += time.perf_counter() - t0
+            st.cpu_s += cpu_time() - cpu0
+            io1 = io_counters()
+            if io0 is not None and io1 is not None:
+                st.read_bytes = (st.read_bytes or 0) + io1[0] - io0[0]
+                st.written_bytes = (st.written_bytes or 0) + io1[1] - io0[1]
+            st.observe_rss(current_rss())
+            with self._lock:
+                self._active.remove(st)
+
+    def add_worker_cpu(self, seconds):
+        """CPU gasto em processos trabalhadores, somado às etapas abertas nesta thread."""
+        with self._lock:
+            self._worker_cpu += seconds
+            for st in getattr(self._running, "stages", ()):
+                st.cpu_s += seconds
+
+    # --- profilers ---
+
+    def _start_profiler(self, name):
+        # um profiler por thread: etapas aninhadas ficam dentro do trace da etapa externa
+        if self.profile is None or getattr(self._profiling, "active", False):
+            return None
+        profiler = self._profilers.get(name)
+        if profiler is None:
+            if self.profile == "cprofile":
+                profiler = cProfile.Profile()
+            else:
+                from pyinstrument import Profiler  # dependência opcional, só com profile="pyinstrument"
+                profiler = Profiler()
+            self._profilers[name] = profiler
+        if isinstance(profiler, cProfile.Profile):
+            profiler.enable()
+        else:
+            profiler.start()
+        self._profiling.active = True
+        return profiler
+
+    def _stop_profiler(self, profiler):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+        self._profiling.active = False
+
+    def write_profiles(self):
+        """Grava um trace por etapa (.prof para cProfile/snakeviz, .html para pyinstrument)."""
+        if not self._profilers:
+            return []
+        folder = os.path.join(self.report_dir, self.run_id)
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        for name, profiler in self._profilers.items():
+            if isinstance(profiler, cProfile.Profile):
+                path = os.path.join(folder, f"{name}.prof")
+                profiler.dump_stats(path)
+            else:
+                path = os.path.join(folder, f"{name}.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            paths.append(path)
+        return paths
+
+    # --- relatórios ---
+
+    def report(self) -> dict:
+        with self._lock:
+            stages = [st.to_dict() for st in self.stages.values()]
+        return {
+            "run_id": self.run_id,
+            "mode": self.mode,
+            "started_at": self.started_at.isoformat(),
+            "argv": sys.argv,
+            "wall_s": round(time.perf_counter() - self._t0, 6),
+            "cpu_s": round(cpu_time() - self._cpu0 + self._worker_cpu, 6),
+            "max_rss_bytes": max_rss(),
+            "stages": stages,
+        }
+
+    def write_json(self, path=None):
+        path = path or os.path.join(self.report_dir, f"{self.run_id}.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+    def write_prometheus(self, path, prefix="cnpj_pipeline"):
+        """
+        Formato texto do Prometheus, gravado de forma atômica (o coletor textfile
+        nunca lê um arquivo pela metade).
+        """
+        report = self.report()
+        series = [
+            ("stage_wall_seconds", "gauge", "Tempo de relógio da etapa", "wall_s"),
+            ("stage_cpu_seconds", "gauge", "Tempo de CPU da etapa (processo + workers)", "cpu_s"),
+            ("stage_rows_in", "gauge", "Linhas de entrada da etapa", "rows_in"),
+            ("stage_rows_out", "gauge", "Linhas de saída da etapa", "rows_out"),
+            ("stage_peak_rss_bytes", "gauge", "Pico de RSS durante a etapa", "peak_rss_bytes"),
+            ("stage_read_bytes", "gauge", "Bytes lidos durante a etapa", "read_bytes"),
+            ("stage_written_bytes", "gauge", "Bytes gravados durante a etapa", "written_bytes"),
+        ]
+        lines = []
+        for metric, kind, help_text, key in series:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for st in report["stages"]:
+                if st[key] is not None:
+                    lines.append(f'{prefix}_{metric}{{stage="{st["stage"]}"}} {st[key]}')
+        for metric, value in (("run_wall_seconds", report["wall_s"]), ("run_cpu_seconds", report["cpu_s"]),
+                              ("run_max_rss_bytes", report["max_rss_bytes"]),
+                              ("last_run_timestamp_seconds", round(time.time(), 3))):
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            lines.append(f"{prefix}_{metric} {value}")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+        return path
+
+    def print_summary(self):
+        print("⏱️ Etapas (relógio | CPU | linhas entrada → saída | pico RSS | lido/gravado):")
+        for st in self.report()["stages"]:
+            rows = f"{st['rows_in'] if st['rows_in'] is not None else '-'} → {st['rows_out'] if st['rows_out'] is not None else '-'}"
+            io = (f"{_mb(st['read_bytes'])}/{_mb(st['written_bytes'])} MB"
+                  if st["read_bytes"] is not None else "-")
+            print(f"   {st['stage']:<16} {st['wall_s']:8.2f}s {st['cpu_s']:8.2f}s  {rows:<20} "
+                  f"{_mb(st['peak_rss_bytes']):>8} MB  {io}")
+
+    def close(self):
+        if self._sampler is not None:
+            self._sampler.stopped.set()
+            self._sampler.join()
+            self._sampler = None
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.1f}"
+
+
+# ===============================
+# Execução corrente
+# ===============================
+
+RUN = RunMetrics()
+
+
+def start_run(mode=None, profile=None, report_dir=REPORT_DIR) -> RunMetrics:
+    """Inicia uma nova execução (as etapas registradas via stage() vão para ela)."""
+    global RUN
+    RUN.close()
+    RUN = RunMetrics(mode=mode, profile=profile, report_dir=report_dir)
+    return RUN
+
+
+def stage(name):
+    """Etapa na execução corrente: with metrics.stage("clean") as st: ..."""
+    return RUN.stage(name)
+
+
+def add_worker_cpu(seconds):
+    """CPU de um processo trabalhador, atribuído às etapas abertas na thread que o chamou."""
+    RUN.add_worker_cpu(seconds)
+
+
+def finish_run(textfile=None):
+    """Encerra a execução corrente: resumo, relatório JSON, Prometheus e traces. Retorna o caminho do JSON."""
+    RUN.close()
+    RUN.print_summary()
+    path = RUN.write_json()
+    print(f"📊 Relatório da execução: {path}")
+    if textfile:
+        print(f"📈 Métricas Prometheus: {RUN.write_prometheus(textfile)}")
+    for trace in RUN.write_profiles():
+        print(f"🔬 Profile: {trace}")
+    return path
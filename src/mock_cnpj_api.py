@@ -0,0 +1,331 @@
+"""
+Servidor local que imita a API pública de CNPJ (publica.cnpj.ws), para medir e
+ajustar a camada de busca (fetch_api / fetch_async) sem rede e sem o limite real.
+
+- GET /cnpj/<14 dígitos> responde JSON no formato do cnpj.ws montado a partir de um
+  arquivo semente (JSONL de payloads da API, ex.: data_processed/empresas_api_raw.jsonl):
+  CNPJs presentes na semente saem como estão; os demais recebem um payload da
+  semente (sempre o mesmo para o mesmo CNPJ) com os campos de identificação trocados
+- Latência sorteada de uma distribuição (fixed, uniform, normal, lognormal, exp)
+- Falhas injetadas: fração de 429 (com Retry-After) e de 5xx (500/502/503/504)
+- Limite de taxa por IP do cliente (token bucket); acima dele, 429 com Retry-After
+- CNPJ com dígito verificador inválido → 400; fração --not-found-rate → 404
+- Keep-alive (HTTP/1.1); GET /__stats devolve as contagens, POST /__reset zera
+
+Uso:
+    python src/mock_cnpj_api.py --port 8000 --latency lognormal:0.08,0.5 --error-rate 0.02 --rate-limit 50
+    python src/_future_module_main.py --base-url http://127.0.0.1:8000 -i ../data_raw/sample_cnpjs.txt
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from utils import only_digits, validate_cnpj
+
+SEED_FILE = "data_processed/empresas_api_raw.jsonl"
+LATENCIES = ("fixed", "uniform", "normal", "lognormal", "exp")
+SERVER_ERRORS = (500, 502, 503, 504)
+
+# corpos de erro no formato do cnpj.ws
+ERRORS = {
+    400: {"status": 400, "titulo": "Requisição inválida", "detalhes": "CNPJ inválido"},
+    404: {"status": 404, "titulo": "Não Encontrado", "detalhes": "CNPJ não encontrado na base"},
+    429: {"status": 429, "titulo": "Muitas requisições", "detalhes": "Excedido o limite de consultas"},
+    500: {"status": 500, "titulo": "Erro interno", "detalhes": "Erro inesperado"},
+    502: {"status": 502, "titulo": "Bad Gateway", "detalhes": "Serviço indisponível"},
+    503: {"status": 503, "titulo": "Serviço indisponível", "detalhes": "Tente novamente"},
+    504: {"status": 504, "titulo": "Gateway Timeout", "detalhes": "Tempo de resposta excedido"},
+}
+
+
+# ===============================
+# Semente e latência
+# ===============================
+
+def load_seed(path) -> list:
+    """
+    Payloads do arquivo semente (um JSON por linha). Aceita o payload puro da API
+    ou o resultado do fetch ({"cnpj": ..., "data": {...}}); linhas sem payload são ignoradas.
+    """
+    payloads = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            if "estabelecimento" not in obj and isinstance(obj.get("data"), dict):
+                obj = obj["data"]
+            if isinstance(obj.get("estabelecimento"), dict):
+                payloads.append(obj)
+    if not payloads:
+        raise ValueError(f"Nenhum payload no formato do cnpj.ws em {path}")
+    return payloads
+
+
+def parse_latency(spec: str):
+    """
+    Converte 'tipo:parâmetros' em uma função rng → segundos:
+    fixed:<s> | uniform:<min>,<max> | normal:<média>,<desvio> | lognormal:<mediana>,<sigma> | exp:<média>
+    """
+    kind, _, params = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+    if kind not in expected or len(values) != expected[kind]:
+        raise ValueError(f"Latência inválida: {spec!r} (use {' | '.join(LATENCIES)}, ex.: lognormal:0.08,0.5)")
+
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # mediana = e^mu; sigma controla a cauda (0.5 → p99 ≈ 3.2x a mediana)
+        mu = math.log(values[0]) if values[0] > 0 else -math.inf
+        return lambda rng: rng.lognormvariate(mu, values[1]) if values[0] > 0 else 0.0
+    return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Token bucket por chave (IP do cliente): 'rate' requisições/s, rajada até 'burst'.
+    acquire() devolve 0 quando a requisição passa, ou os segundos até o próximo token.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+
+# ===============================
+# API simulada
+# ===============================
+
+class MockCnpjApi:
+    """Respostas e contadores do servidor (independente do HTTP)."""
+
+    def __init__(self, payloads, latency="fixed:0", error_rate=0.0, throttle_rate=0.0, not_found_rate=0.0,
+                 rate_limit=0.0, burst=10, retry_after=1, seed=42):
+        self.known = {p["estabelecimento"].get("cnpj"): p for p in payloads}
+        self.templates = [json.dumps(p, ensure_ascii=False) for p in payloads]
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.not_found_rate = not_found_rate
+        self.limiter = RateLimiter(rate_limit, burst) if rate_limit > 0 else None
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statuses = Counter()
+            self.requests = 0
+            self.throttled = 0
+            self.injected = 0
+            self.service_seconds = 0.0
+            self.started_at = time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+                "rate_limited": self.throttled,
+                "injected_failures": self.injected,
+                "mean_service_ms": round(self.service_seconds / self.requests * 1000, 2) if self.requests else None,
+                "since": self.started_at,
+            }
+
+    def payload(self, cnpj: str) -> dict:
+        """Payload do CNPJ: o da semente, ou um modelo da semente com a identificação trocada."""
+        if cnpj in self.known:
+            return self.known[cnpj]
+        data = json.loads(self.templates[zlib.crc32(cnpj.encode()) % len(self.templates)])
+        data["cnpj_raiz"] = cnpj[:8]
+        est = data["estabelecimento"]
+        est.update({
+            "cnpj": cnpj,
+            "cnpj_raiz": cnpj[:8],
+            "cnpj_ordem": cnpj[8:12],
+            "cnpj_digito_verificador": cnpj[12:],
+            "tipo": "Matriz" if cnpj[8:12] == "0001" else "Filial",
+        })
+        return data
+
+    def respond(self, cnpj: str, client="") -> tuple:
+        """(status, corpo, headers extras) de GET /cnpj/<cnpj>; inclui a espera simulada."""
+        started = time.perf_counter()
+        status, body, headers = self._respond(only_digits(cnpj), client)
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] += 1
+            self.service_seconds += time.perf_counter() - started
+        return status, body, headers
+
+    def _respond(self, cnpj, client):
+        if self.limiter is not None:
+            wait = self.limiter.acquire(client)
+            if wait > 0:
+                # recusa imediata, como um gateway de rate limit
+                with self._lock:
+                    self.throttled += 1
+                return 429, ERRORS[429], {"Retry-After": str(max(1, math.ceil(wait)))}
+
+        with self._lock:
+            delay = self.latency(self._rng)
+            roll = self._rng.random()
+            server_error = self._rng.choice(SERVER_ERRORS)
+        if delay > 0:
+            time.sleep(delay)
+
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.injected += 1
+            return 429, ERRORS[429], {"Retry-After": str(int(self.retry_after))}
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.injected += 1
+            return server_error, ERRORS[server_error], {}
+
+        if len(cnpj) != 14 or not validate_cnpj(cnpj):
+            return 400, ERRORS[400], {}
+        # "não encontrado" fixo por CNPJ (repetir a consulta não muda a resposta)
+        if cnpj not in self.known and zlib.crc32(cnpj.encode()[::-1]) % 10_000 < self.not_found_rate * 10_000:
+            return 404, ERRORS[404], {}
+        return 200, self.payload(cnpj), {}
+
+
+# ===============================
+# HTTP
+# ===============================
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    api: MockCnpjApi = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload, status=200, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        route = urlsplit(self.path).path.rstrip("/")
+        if route.startswith("/cnpj/"):
+            status, body, headers = self.api.respond(route[len("/cnpj/"):], self.client_address[0])
+            return self._json(body, status, headers)
+        if route == "/health":
+            return self._json({"status": "ok", "seed_payloads": len(self.api.templates)})
+        if route == "/__stats":
+            return self._json(self.api.stats())
+        return self._json({"error": "rota não encontrada"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if urlsplit(self.path).path.rstrip("/") == "/__reset":
+            self.api.reset()
+            return self._json({"status": "reset"})
+        return self._json({"error": "rota não encontrada"}, status=404)
+
+
+def make_server(seed_path=SEED_FILE, host="127.0.0.1", port=8000, **options):
+    """Cria o servidor (sem iniciá-lo); port=0 escolhe uma porta livre. options → MockCnpjApi."""
+    api = MockCnpjApi(load_seed(seed_path), **options)
+    handler = type("BoundMockHandler", (MockHandler,), {"api": api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.api = api
+    return server
+
+
+def add_server_arguments(parser):
+    """Opções do servidor simulado (reaproveitadas por benchmarks/fetch_bench.py)."""
+    parser.add_argument("--seed-file", default=SEED_FILE, help="JSONL de payloads do cnpj.ws usado como modelo")
+    parser.add_argument("--latency", default="lognormal:0.08,0.5",
+                        help="Distribuição da latência: fixed:<s> | uniform:<min>,<max> | normal:<média>,<desvio> "
+                             "| lognormal:<mediana>,<sigma> | exp:<média>")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 5xx injetadas")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fração de 429 injetados (fora do limite de taxa)")
+    parser.add_argument("--not-found-rate", type=float, default=0.02, help="Fração de CNPJs respondidos com 404")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requisições/s por IP (0 = sem limite)")
+    parser.add_argument("--burst", type=int, default=10, help="Rajada do limite de taxa")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After (s, inteiro como no HTTP) dos 429 injetados")
+    parser.add_argument("--server-seed", type=int, default=42, help="Semente do sorteio de latências e falhas")
+
+
+def server_options(args) -> dict:
+    return {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "not_found_rate": args.not_found_rate,
+        "rate_limit": args.rate_limit,
+        "burst": args.burst,
+        "retry_after": args.retry_after,
+        "seed": args.server_seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API de CNPJ simulada (formato publica.cnpj.ws) para testes de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.seed_file, args.host, args.port, **server_options(args))
+    url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🚀 API simulada em {url}/cnpj/<cnpj> ({len(server.api.templates)} payloads de {args.seed_file})")
+    print(f"   latência={args.latency} 5xx={args.error_rate:g} 429={args.throttle_rate:g} "
+          f"limite={args.rate_limit or '-'} req/s")
+    print(f"   Use: CNPJ_API_BASE_URL={url} ou --base-url {url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
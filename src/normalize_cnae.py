@@ -1,51 +1,94 @@
+import numpy as np
 import pandas as pd
-import ast
-import os
 
-INPUT = "data_processed/leads_b2b_clean.csv"
-OUTPUT = "data_processed/leads_b2b_final.csv"
+from src import storage
+from src.dimensions import cnae_hierarchy, new_dimension
+
+# tabelas lógicas (ver src/storage.py)
+INPUT = "leads_b2b_clean"
+OUTPUT = "leads_b2b_final"
+
+# Colunas desejadas (ideal)
+FINAL_COLUMNS = [
+    "cnpj",
+    "razao_social",
+    "nome_fantasia",
+    "municipio",
+    "uf",
+    "situacao",      # pode não existir
+    "telefone",
+    "email",
+    "cnae_fiscal",
+    "cnae_secao",
+    "cnae_divisao",
+    "cnae_grupo",
+    "cnae_classe",
+]
+
+CNAE_LEVELS = ["secao", "divisao", "grupo", "classe"]
+
+
+def normalize_cnae_column(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Canoniza 'cnae_fiscal' para a subclasse de 7 dígitos (aceita int, texto
+    formatado como "1412-6/01" e dicts da API) e adiciona as colunas
+    cnae_secao/cnae_divisao/cnae_grupo/cnae_classe.
+
+    Vetorizado: o parse roda uma vez por valor distinto (dimensão CNAE) e a
+    hierarquia é calculada só para as categorias e espalhada pelos códigos inteiros.
+    """
+    if "cnae_fiscal" not in df.columns:
+        return df
+
+    col = new_dimension("cnae_fiscal").encode(df["cnae_fiscal"])
+    df["cnae_fiscal"] = col
+
+    codes = col.cat.codes.to_numpy()
+    hierarchy = cnae_hierarchy(col.cat.categories)
+    for level in CNAE_LEVELS:
+        # códigos de cada nível por categoria de subclasse; -1 (nulo) fica no fim
+        level_codes, level_values = pd.factorize(hierarchy[level], use_na_sentinel=True)
+        lookup = np.append(level_codes, -1)
+        df[f"cnae_{level}"] = pd.Categorical.from_codes(lookup[codes], categories=level_values)
+    return df
+
+
+def select_final_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Seleciona as colunas finais (só as que existem no DataFrame).
+    """
+    # 🔑 FILTRO INTELIGENTE (só pega o que existe)
+    cols_existentes = [c for c in FINAL_COLUMNS if c in df.columns]
+    return df[cols_existentes]
+
 
 def normalize_cnae():
     
     """
-    Normaliza e padroniza o campo CNAE.
+    Normaliza e padroniza o campo CNAE (subclasse de 7 dígitos + hierarquia).
     """
     print("Normalizando CNAE...")
-    
-    # TODO: lógica atual de normalização
 
-    print("🔹 Lendo CSV...")
-    df = pd.read_csv(INPUT)
+    print("🔹 Lendo tabela limpa...")
+    df = storage.read_table(INPUT)
 
     print("Colunas encontradas:")
     print(df.columns.tolist())
 
     print(f"🔹 Registros: {len(df)}")
 
-    # Colunas desejadas (ideal)
-    cols = [
-        "cnpj",
-        "razao_social",
-        "nome_fantasia",
-        "municipio",
-        "uf",
-        "situacao",      # pode não existir
-        "telefone",
-        "email",
-        "cnae_fiscal"
-    ]
+    df = normalize_cnae_column(df)
+    df = select_final_columns(df)
 
-    # 🔑 FILTRO INTELIGENTE (só pega o que existe)
-    cols_existentes = [c for c in cols if c in df.columns]
+    if "cnae_fiscal" in df.columns:
+        print(f"🔹 CNAEs válidos: {df['cnae_fiscal'].notna().sum()} de {len(df)}")
 
     print("Colunas usadas no processamento:")
-    print(cols_existentes)
-
-    df = df[cols_existentes]
+    print(df.columns.tolist())
 
 
-    # Salva CSV final
-    os.makedirs("data_processed", exist_ok=True)
-    df.to_csv(OUTPUT, index=False)
+    # Salva tabela final (formato nativo + CSV de exportação)
+    output_path = storage.write_table(df, OUTPUT, export_csv=True)
 
-    print("✅ Arquivo final gerado:", OUTPUT)
+    print("✅ Arquivo final gerado:", output_path)
+    return df
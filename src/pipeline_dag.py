@@ -0,0 +1,250 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from src import clean_final_csv as clean_mod
+from src import dedup as dedup_mod
+from src import enrich_from_receita as enrich_mod
+from src import receita_store as receita_mod
+from src import receita_bulk as bulk_mod
+from src import validate_structural as validate_mod
+from src import structural_score as score_mod
+from src import lead_classification as classify_mod
+from src import business_rules as business_mod
+from src import normalize_cnae as cnae_mod
+from src import quality_metrics as metrics_mod
+from src import metrics
+from src import storage
+from src import dimensions as dimensions_mod
+from src import scoring_rules as rules_mod
+
+STATE_PATH = "data_processed/.pipeline_state.json"
+
+# arquivos físicos (intermediários no formato nativo, exportações em CSV)
+RECEITA = receita_mod.RECEITA_PATH
+RECEITA_BULK = os.path.join(bulk_mod.BULK_DIR, bulk_mod.MANIFEST_FILE)
+CLEAN = storage.path(clean_mod.OUTPUT)
+ENRICHED = storage.path("leads_b2b_enriched")
+VALIDATED = storage.path("leads_b2b_structural_validated")
+SCORED = storage.path("leads_b2b_scored")
+CLASSIFIED = storage.path("leads_b2b_classified")
+VALIDOS = storage.export_path("leads_b2b_validos")
+INVALIDOS = storage.export_path("leads_b2b_invalidos")
+BUSINESS_VALID = storage.export_path("leads_b2b_business_valid")
+FINAL = storage.path(cnae_mod.OUTPUT)
+FINAL_CSV = storage.export_path(cnae_mod.OUTPUT)
+SCORING_RULES = rules_mod.RULES_PATH  # mudar faixas/rótulos reexecuta score e classificação
+
+
+def leads_input():
+    # entrada ainda pode vir em CSV (scripts/mvp_leads.py antigo)
+    native = storage.path(clean_mod.INPUT)
+    return native if os.path.exists(native) else storage.export_path(clean_mod.INPUT)
+
+
+class Stage:
+    """
+    Etapa do pipeline: função sem argumentos que lê 'inputs' e grava 'outputs'.
+    'version' deve ser incrementada quando a lógica mudar de forma que o hash
+    do código não capture (ex: mudança num arquivo de configuração).
+    'code' lista os objetos cujo código-fonte entra na impressão digital.
+    """
+
+    def __init__(self, name, func, inputs, outputs, version=1, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.version = version
+        self.code = list(code) or [func]
+
+    def code_hash(self):
+        h = hashlib.sha256()
+        for obj in self.code:
+            try:
+                h.update(inspect.getsource(obj).encode("utf-8"))
+            except (OSError, TypeError):
+                h.update(repr(obj).encode("utf-8"))
+        return h.hexdigest()
+
+
+# ===============================
+# Etapas (arquivo → arquivo)
+# ===============================
+
+def stage_enrich():
+    df = storage.read_path(CLEAN)
+    df = enrich_mod.enrich_from_receita(df)
+    storage.write_table(df, "leads_b2b_enriched")
+
+
+def stage_validate():
+    df = storage.read_path(ENRICHED)
+    df = validate_mod.validate_structural(df)
+    storage.write_table(df, "leads_b2b_structural_validated")
+
+
+def stage_score():
+    df = storage.read_path(VALIDATED)
+    df = score_mod.apply_structural_score(df)
+    storage.write_table(df, "leads_b2b_scored")
+
+
+def stage_classify():
+    df = storage.read_path(SCORED)
+    df = classify_mod.classify_leads(df)
+    storage.write_table(df, "leads_b2b_classified")
+
+
+def stage_split_valid():
+    df = storage.read_path(CLASSIFIED)
+    metrics_mod.generate_quality_metrics(df)
+    df[df["is_valid_structural"] == True].to_csv(VALIDOS, index=False)
+    df[df["is_valid_structural"] == False].to_csv(INVALIDOS, index=False)
+
+
+def stage_business():
+    df = storage.read_path(CLASSIFIED)
+    df = business_mod.apply_business_rules(df)
+    df[df["is_valid_business"] == True].to_csv(BUSINESS_VALID, index=False)
+
+
+STAGES = [
+    Stage("clean", clean_mod.clean_final_csv, [leads_input()], [CLEAN], code=[clean_mod, dedup_mod, dimensions_mod]),
+    Stage("enrich", stage_enrich, [CLEAN, RECEITA, RECEITA_BULK], [ENRICHED], code=[stage_enrich, enrich_mod, receita_mod, bulk_mod]),
+    Stage("validate", stage_validate, [ENRICHED], [VALIDATED], code=[stage_validate, validate_mod]),
+    Stage("score", stage_score, [VALIDATED, SCORING_RULES], [SCORED], code=[stage_score, score_mod, rules_mod]),
+    Stage("classify", stage_classify, [SCORED, SCORING_RULES], [CLASSIFIED], code=[stage_classify, classify_mod, rules_mod]),
+    Stage("split_valid", stage_split_valid, [CLASSIFIED], [VALIDOS, INVALIDOS], code=[stage_split_valid, metrics_mod]),
+    Stage("business", stage_business, [CLASSIFIED], [BUSINESS_VALID], code=[stage_business, business_mod]),
+    Stage("normalize_cnae", cnae_mod.normalize_cnae, [CLEAN], [FINAL, FINAL_CSV], code=[cnae_mod, dimensions_mod]),
+]
+
+
+# ===============================
+# Impressões digitais
+# ===============================
+
+class FileHasher:
+    """
+    Hash de conteúdo (sha256) dos arquivos, com cache por (tamanho, mtime)
+    para não reler arquivos que não mudaram desde a última execução.
+    """
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+        self._lock = threading.Lock()
+
+    def __call__(self, path):
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            cached = self.known.get(path)
+        if cached and cached["stamp"] == stamp:
+            return cached["sha256"]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.known[path] = {"stamp": stamp, "sha256": digest}
+        return digest
+
+
+def stage_fingerprint(stage: Stage, hasher: FileHasher):
+    h = hashlib.sha256()
+    h.update(f"{stage.name}:{stage.version}:{stage.code_hash()}".encode("utf-8"))
+    for path in stage.inputs:
+        h.update(f"{path}={hasher(path)}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ===============================
+# Execução
+# ===============================
+
+def dependencies(stages):
+    """Mapeia cada etapa às etapas que produzem seus arquivos de entrada."""
+    producer = {out: s.name for s in stages for out in s.outputs}
+    return {s.name: {producer[i] for i in s.inputs if i in producer} for s in stages}
+
+
+def run_dag(stages=None, max_workers=4, force=False, state_path=STATE_PATH):
+    """
+    Executa as etapas respeitando dependências; etapas independentes rodam em paralelo
+    (ex: validos/invalidos, regras de negócio e normalização de CNAE).
+    Uma etapa é pulada quando a impressão digital (hash das entradas + versão + código)
+    é igual à da última execução e suas saídas continuam intactas.
+    Retorna {etapa: "ran" | "skipped"}.
+    """
+    stages = stages or STAGES
+    by_name = {s.name: s for s in stages}
+    deps = dependencies(stages)
+
+    state = load_state(state_path)
+    hasher = FileHasher(state.get("files"))
+    status = {}
+
+    def up_to_date(stage, fingerprint):
+        previous = state["stages"].get(stage.name)
+        if force or not previous or previous["fingerprint"] != fingerprint:
+            return False
+        return all(hasher(out) == previous["outputs"].get(out) for out in stage.outputs)
+
+    def execute(stage):
+        fingerprint = stage_fingerprint(stage, hasher)
+        if up_to_date(stage, fingerprint):
+            print(f"⏭️  {stage.name}: sem mudanças, pulando")
+            return "skipped"
+        print(f"▶️  {stage.name}")
+        with metrics.stage(stage.name):
+            stage.func()
+        state["stages"][stage.name] = {
+            "fingerprint": fingerprint,
+            "outputs": {out: hasher(out) for out in stage.outputs},
+        }
+        print(f"✅ {stage.name} concluída")
+        return "ran"
+
+    pending = set(by_name)
+    running = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            while pending or running:
+                ready = [n for n in pending if deps[n] <= set(status)]
+                for name in sorted(ready):
+                    pending.discard(name)
+                    running[ex.submit(execute, by_name[name])] = name
+                if not running:
+                    raise RuntimeError(f"Dependências não satisfeitas: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    status[name] = fut.result()
+    finally:
+        # mesmo com falha, guarda o estado das etapas que terminaram
+        state["files"] = hasher.known
+        save_state(state, state_path)
+    return status
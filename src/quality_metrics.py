@@ -1,9 +1,7 @@
 import pandas as pd
 
 
-def generate_quality_metrics(df: pd.DataFrame):
-    total = len(df)
-    valid = df["is_valid_structural"].sum()
+def print_quality_metrics(total, valid, top_missing):
     invalid = total - valid
 
     print(f"📊 Total registros: {total}")
@@ -11,7 +9,42 @@ def generate_quality_metrics(df: pd.DataFrame):
     print(f"❌ Inválidos: {invalid} ({round(invalid / total * 100, 2)}%)\n")
 
     print("🔎 Top campos mais ausentes:")
+    print(top_missing)
+
+
+def generate_quality_metrics(df: pd.DataFrame):
+    total = len(df)
+    valid = df["is_valid_structural"].sum()
+
     errors = df["validation_errors"].str.split(", ").explode()
     top_missing = errors.value_counts().head(5)
 
-    print(top_missing)
+    print_quality_metrics(total, valid, top_missing)
+
+
+class QualityMetricsAccumulator:
+    """
+    Acumula as mesmas métricas de generate_quality_metrics bloco a bloco
+    (processamento em streaming), sem manter os dados em memória.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.valid = 0
+        self.error_counts = None
+
+    def update(self, df: pd.DataFrame):
+        self.total += len(df)
+        self.valid += int(df["is_valid_structural"].sum())
+        counts = df["validation_errors"].str.split(", ").explode().value_counts()
+        if self.error_counts is None:
+            self.error_counts = counts
+        else:
+            self.error_counts = self.error_counts.add(counts, fill_value=0).astype("int64")
+
+    def report(self):
+        counts = self.error_counts if self.error_counts is not None else pd.Series(dtype="int64")
+        top_missing = counts.sort_values(ascending=False, kind="stable").head(5)
+        top_missing.index.name = "validation_errors"
+        top_missing.name = "count"
+        print_quality_metrics(self.total, self.valid, top_missing)
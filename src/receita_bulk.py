@@ -0,0 +1,529 @@
+# src/receita_bulk.py
+"""
+Carga dos dados abertos da Receita Federal (dump oficial do CNPJ).
+
+- Lê os .zip oficiais (Empresas, Estabelecimentos, Socios, Simples e tabelas de
+  domínio como Municipios, Cnaes, Naturezas) sem extrair para o disco: cada membro
+  do zip é lido em streaming pelo leitor CSV multithread do Arrow
+  (latin-1, separador ';', sem cabeçalho)
+- Grava Parquet em data_processed/receita_bulk/<tabela>/; Estabelecimentos é
+  particionado por UF (uf=SP/, uf=RJ/, ...)
+- Para as consultas por CNPJ, cada tabela ganha também um índice de busca em
+  data_processed/receita_bulk/_lookup/<tabela>/ (como receita_store): chaves uint64
+  ordenadas + as linhas na mesma ordem em Arrow IPC aberto por memory-map; a
+  consulta é searchsorted + take, sem varrer a tabela
+- ReceitaBulk consulta essa base localmente: enriquecimento (enrich_from_receita)
+  e resultados no formato do fetch_cnpj (fetch_api.fetch_batch_local)
+
+Uso:
+    python src/receita_bulk.py --input /caminho/dos/zips
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+# --- Permite executar scripts diretamente sem erros de import relativo ---
+ROOT = os.path.dirname(os.path.abspath(__file__))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from dimensions import UF_NOMES
+from receita_store import cnpj_key_array
+
+BULK_DIR = "data_processed/receita_bulk"
+MANIFEST_FILE = "manifest.json"
+LOOKUP_DIR = "_lookup"  # prefixo "_": fica fora dos datasets Parquet
+KEYS_FILE = "keys.npy"
+ROWS_FILE = "rows.arrow"
+
+# Layouts oficiais (ordem das colunas nos arquivos, que não têm cabeçalho)
+LAYOUTS = {
+    "empresas": [
+        "cnpj_basico", "razao_social", "natureza_juridica", "qualificacao_responsavel",
+        "capital_social", "porte_empresa", "ente_federativo_responsavel",
+    ],
+    "estabelecimentos": [
+        "cnpj_basico", "cnpj_ordem", "cnpj_dv", "identificador_matriz_filial", "nome_fantasia",
+        "situacao_cadastral", "data_situacao_cadastral", "motivo_situacao_cadastral",
+        "nome_cidade_exterior", "pais", "data_inicio_atividade", "cnae_fiscal_principal",
+        "cnae_fiscal_secundaria", "tipo_logradouro", "logradouro", "numero", "complemento",
+        "bairro", "cep", "uf", "municipio", "ddd_1", "telefone_1", "ddd_2", "telefone_2",
+        "ddd_fax", "fax", "correio_eletronico", "situacao_especial", "data_situacao_especial",
+    ],
+    "socios": [
+        "cnpj_basico", "identificador_socio", "nome_socio", "cnpj_cpf_socio", "qualificacao_socio",
+        "data_entrada_sociedade", "pais", "representante_legal", "nome_representante",
+        "qualificacao_representante", "faixa_etaria",
+    ],
+    "simples": [
+        "cnpj_basico", "opcao_simples", "data_opcao_simples", "data_exclusao_simples",
+        "opcao_mei", "data_opcao_mei", "data_exclusao_mei",
+    ],
+    # tabelas de domínio (código → descrição)
+    "municipios": ["codigo", "descricao"],
+    "cnaes": ["codigo", "descricao"],
+    "naturezas": ["codigo", "descricao"],
+    "qualificacoes": ["codigo", "descricao"],
+    "paises": ["codigo", "descricao"],
+    "motivos": ["codigo", "descricao"],
+}
+
+PARTITIONS = {"estabelecimentos": "uf"}
+
+# coluna de busca de cada tabela com índice (as de domínio são lidas inteiras)
+LOOKUP_KEYS = {"estabelecimentos": "cnpj", "empresas": "cnpj_basico", "simples": "cnpj_basico", "socios": "cnpj_basico"}
+LOOKUP_BLOCK = 1 << 20  # linhas por lote na ordenação/gravação do índice
+
+# Códigos do dump → valores usados no pipeline (mesmo formato do mock)
+SITUACOES = {"01": "NULA", "02": "ATIVA", "03": "SUSPENSA", "04": "INAPTA", "08": "BAIXADA"}
+PORTES = {"00": "NAO INFORMADO", "01": "ME", "03": "EPP", "05": "DEMAIS"}
+PORTES_DESCRICAO = {"00": "Não informado", "01": "Micro Empresa", "03": "Empresa de Pequeno Porte", "05": "Demais"}
+
+# colunas entregues ao enriquecimento (as mesmas do mock da Receita)
+RECEITA_COLUMNS = ["situacao", "porte_empresa", "natureza_juridica", "data_inicio_atividade"]
+
+BLOCK_SIZE = 16 << 20  # bytes por bloco do leitor CSV
+
+
+def table_of(zip_path):
+    """Identifica a tabela pelo nome do zip oficial (ex: Estabelecimentos3.zip)."""
+    name = os.path.basename(zip_path).lower()
+    for table in LAYOUTS:
+        if name.startswith(table):
+            return table
+    return None
+
+
+# ===============================
+# Leitura (zip → lotes Arrow)
+# ===============================
+
+def iter_zip_batches(zip_path, table, block_size=BLOCK_SIZE, skipped=None):
+    """
+    Lê cada membro do zip em streaming (sem extrair) e produz RecordBatches
+    com todas as colunas como texto. Linhas malformadas são puladas e contadas
+    em skipped["rows"].
+    """
+    layout = LAYOUTS[table]
+    skipped = skipped if skipped is not None else {"rows": 0}
+
+    def skip_row(row):
+        skipped["rows"] += 1
+        return "skip"
+
+    read_options = pacsv.ReadOptions(
+        column_names=layout, encoding="latin1", block_size=block_size, use_threads=True
+    )
+    parse_options = pacsv.ParseOptions(delimiter=";", quote_char='"', invalid_row_handler=skip_row)
+    convert_options = pacsv.ConvertOptions(
+        column_types={c: pa.string() for c in layout}, strings_can_be_null=True
+    )
+
+    with zipfile.ZipFile(zip_path) as zf:
+        for member in zf.infolist():
+            if member.is_dir():
+                continue
+            with zf.open(member) as raw:
+                reader = pacsv.open_csv(
+                    raw, read_options=read_options, parse_options=parse_options,
+                    convert_options=convert_options,
+                )
+                for batch in reader:
+                    yield _prepare(batch, table)
+
+
+def _prepare(batch: pa.RecordBatch, table):
+    """Colunas derivadas: Estabelecimentos ganha o CNPJ completo (14 dígitos)."""
+    if table != "estabelecimentos":
+        return batch
+    cnpj = pc.binary_join_element_wise(
+        batch.column("cnpj_basico"), batch.column("cnpj_ordem"), batch.column("cnpj_dv"), ""
+    )
+    return pa.RecordBatch.from_arrays(
+        [cnpj] + batch.columns, names=["cnpj"] + batch.schema.names
+    )
+
+
+def table_schema(table):
+    names = (["cnpj"] if table == "estabelecimentos" else []) + LAYOUTS[table]
+    return pa.schema([pa.field(c, pa.string()) for c in names])
+
+
+# ===============================
+# Carga (lotes → Parquet)
+# ===============================
+
+def load_table(zip_paths, table, bulk_dir=BULK_DIR):
+    """
+    Regrava a tabela a partir dos zips informados (ex: Estabelecimentos0..9.zip).
+    Retorna {"rows": ..., "skipped": ...}.
+    """
+    out_dir = os.path.join(bulk_dir, table)
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+
+    stats = {"rows": 0, "skipped": 0}
+    schema = table_schema(table)
+    partition = PARTITIONS.get(table)
+
+    for zip_path in sorted(zip_paths):
+        skipped = {"rows": 0}
+        counted = _count_rows(iter_zip_batches(zip_path, table, skipped=skipped), stats)
+        stem = os.path.splitext(os.path.basename(zip_path))[0]
+        ds.write_dataset(
+            counted,
+            out_dir,
+            schema=schema,
+            format="parquet",
+            partitioning=[partition] if partition else None,
+            partitioning_flavor="hive" if partition else None,
+            basename_template=f"{stem}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_rows_per_group=1 << 20,
+        )
+        stats["skipped"] += skipped["rows"]
+        print(f"   {os.path.basename(zip_path)} → {table}: {stats['rows']} linhas até agora")
+    if table in LOOKUP_KEYS:
+        build_lookup(table, bulk_dir)
+    return stats
+
+
+def lookup_dir(table, bulk_dir=BULK_DIR):
+    return os.path.join(bulk_dir, LOOKUP_DIR, table)
+
+
+def build_lookup(table, bulk_dir=BULK_DIR):
+    """
+    Índice de busca da tabela: chaves (CNPJ ou CNPJ básico) como uint64 ordenadas
+    e todas as linhas na mesma ordem em Arrow IPC sem compressão (memory-map).
+    Chaves repetidas (ex.: vários sócios por empresa) ficam lado a lado, na ordem da carga.
+    """
+    out_dir = lookup_dir(table, bulk_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    key = LOOKUP_KEYS[table]
+    schema = table_schema(table)
+    dataset = ds.dataset(
+        os.path.join(bulk_dir, table), format="parquet", schema=schema,
+        partitioning="hive" if PARTITIONS.get(table) else None,
+    )
+
+    # 1) linhas na ordem da carga → arquivo temporário + chaves
+    unsorted_path = os.path.join(out_dir, ROWS_FILE + ".unsorted")
+    keys = []
+    with pa.OSFile(unsorted_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in dataset.to_batches(batch_size=LOOKUP_BLOCK):
+            keys.append(cnpj_key_array(batch.column(key)))
+            writer.write_batch(batch)
+    keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+
+    # 2) ordena (estável) pela chave; vazios ficam de fora
+    order = np.argsort(keys, kind="stable")
+    order = order[keys[order] != 0]
+
+    # 3) grava as linhas na ordem das chaves, lote a lote
+    rows_path = os.path.join(out_dir, ROWS_FILE)
+    unsorted = pa.ipc.open_file(pa.memory_map(unsorted_path)).read_all()
+    with pa.OSFile(rows_path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for start in range(0, len(order), LOOKUP_BLOCK):
+            writer.write_table(unsorted.take(order[start:start + LOOKUP_BLOCK]))
+    del unsorted
+    os.replace(rows_path + ".tmp", rows_path)
+    os.remove(unsorted_path)
+
+    keys_path = os.path.join(out_dir, KEYS_FILE)
+    np.save(keys_path + ".tmp.npy", keys[order])
+    os.replace(keys_path + ".tmp.npy", keys_path)
+    print(f"   🗂️ Índice de busca de {table}: {len(order)} linhas")
+
+
+def _count_rows(batches, stats):
+    for batch in batches:
+        stats["rows"] += batch.num_rows
+        yield batch
+
+
+def load_bulk(zip_paths, bulk_dir=BULK_DIR):
+    """
+    Carrega todos os zips oficiais informados, agrupando por tabela,
+    e grava o manifesto (usado também como entrada da etapa de enriquecimento no DAG).
+    """
+    by_table = {}
+    for path in zip_paths:
+        table = table_of(path)
+        if table is None:
+            print(f"⚠️ Ignorando arquivo não reconhecido: {path}")
+            continue
+        by_table.setdefault(table, []).append(path)
+
+    os.makedirs(bulk_dir, exist_ok=True)
+    manifest = read_manifest(bulk_dir)
+    for table, paths in sorted(by_table.items()):
+        print(f"📦 Carregando {table} ({len(paths)} arquivo(s))")
+        stats = load_table(paths, table, bulk_dir)
+        manifest[table] = {
+            "files": [
+                {"name": os.path.basename(p), "size": os.path.getsize(p), "mtime_ns": os.stat(p).st_mtime_ns}
+                for p in sorted(paths)
+            ],
+            **stats,
+        }
+        if stats["skipped"]:
+            print(f"⚠️ {table}: {stats['skipped']} linha(s) malformada(s) ignorada(s)")
+
+    with open(os.path.join(bulk_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(bulk_dir=BULK_DIR):
+    path = os.path.join(bulk_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def available(bulk_dir=BULK_DIR):
+    """True quando o dump oficial (ao menos Estabelecimentos) já foi carregado."""
+    return "estabelecimentos" in read_manifest(bulk_dir)
+
+
+# ===============================
+# Consulta local
+# ===============================
+
+def _date(value):
+    # AAAAMMDD → AAAA-MM-DD ("0"/"00000000" = sem data)
+    if not value or not value.strip("0"):
+        return None
+    return f"{value[:4]}-{value[4:6]}-{value[6:8]}"
+
+
+def _nulls_to_none(df: pd.DataFrame) -> pd.DataFrame:
+    # campos vazios do dump viram None (NaN não é JSON válido e quebra _date/.replace)
+    return df.astype(object).where(df.notna(), None)
+
+
+def _cnpj_strings(keys) -> list:
+    return [f"{int(k):014d}" for k in keys]
+
+
+class KeyLookup:
+    """Índice de busca de uma tabela (build_lookup) aberto por memory-map."""
+
+    def __init__(self, path):
+        self.keys = np.load(os.path.join(path, KEYS_FILE), mmap_mode="r")
+        self.table = pa.ipc.open_file(pa.memory_map(os.path.join(path, ROWS_FILE))).read_all()
+
+    def rows(self, keys: np.ndarray, columns=None) -> pa.Table:
+        """Todas as linhas cujas chaves estão em 'keys' (em ordem de chave)."""
+        keys = np.unique(np.asarray(keys, dtype=np.uint64))
+        start = np.searchsorted(self.keys, keys, side="left")
+        stop = np.searchsorted(self.keys, keys, side="right")
+        counts = stop - start
+        # posições start..stop-1 de cada chave, concatenadas
+        offsets = np.repeat(start - (np.cumsum(counts) - counts), counts)
+        indices = offsets + np.arange(int(counts.sum()))
+        table = self.table.select(columns) if columns else self.table
+        return table.take(pa.array(indices, pa.int64()))
+
+
+class ReceitaBulk:
+    """
+    Consulta local ao dump oficial carregado por load_bulk.
+    As buscas por CNPJ usam o índice de cada tabela (build_lookup): busca binária
+    nas chaves ordenadas + leitura só das linhas encontradas, sem varrer o Parquet.
+    O índice é construído na primeira consulta quando a carga é de uma versão anterior.
+    """
+
+    def __init__(self, bulk_dir=BULK_DIR):
+        self.bulk_dir = bulk_dir
+        self._datasets = {}
+        self._domains = {}
+        self._lookups = {}
+
+    def dataset(self, table):
+        if table not in self._datasets:
+            path = os.path.join(self.bulk_dir, table)
+            if not os.path.exists(path):
+                return None
+            partition = PARTITIONS.get(table)
+            self._datasets[table] = ds.dataset(
+                path, format="parquet", schema=table_schema(table),
+                partitioning="hive" if partition else None,
+            )
+        return self._datasets[table]
+
+    def domain(self, table) -> dict:
+        """Tabela de domínio como dict código → descrição (vazio se não carregada)."""
+        if table not in self._domains:
+            dataset = self.dataset(table)
+            df = dataset.to_table().to_pandas() if dataset is not None else pd.DataFrame(columns=["codigo", "descricao"])
+            self._domains[table] = dict(zip(df["codigo"], df["descricao"]))
+        return self._domains[table]
+
+    def _lookup(self, table):
+        if table not in self._lookups:
+            path = lookup_dir(table, self.bulk_dir)
+            if not os.path.exists(os.path.join(path, KEYS_FILE)):
+                build_lookup(table, self.bulk_dir)
+            self._lookups[table] = KeyLookup(path)
+        return self._lookups[table]
+
+    def _scan(self, table, values, columns=None) -> pd.DataFrame:
+        """Linhas da tabela cuja chave (LOOKUP_KEYS) está em 'values' (texto)."""
+        if self.dataset(table) is None or not len(values):
+            names = columns or (list(table_schema(table).names) if table in LAYOUTS else [])
+            return pd.DataFrame(columns=names)
+        keys = cnpj_key_array(pa.array(list(values), pa.string()))
+        return self._lookup(table).rows(keys[keys != 0], columns).to_pandas()
+
+    def estabelecimentos(self, cnpjs, columns=None, uf=None) -> pd.DataFrame:
+        ufs = list(uf) if isinstance(uf, (list, tuple, set)) else [uf]
+        read = columns if not uf or columns is None or "uf" in columns else columns + ["uf"]
+        df = self._scan("estabelecimentos", cnpjs, read)
+        if uf:
+            df = df[df["uf"].isin(ufs)].reset_index(drop=True)
+        return df[columns] if columns else df
+
+    def empresas(self, cnpj_basicos, columns=None) -> pd.DataFrame:
+        return self._scan("empresas", cnpj_basicos, columns)
+
+    def lookup(self, keys: np.ndarray, columns=None) -> pd.DataFrame:
+        """
+        Mesma interface de receita_store.ReceitaStore.lookup: uma linha por chave
+        (na ordem das chaves), colunas do mock da Receita; não encontradas ficam nulas.
+        """
+        cnpjs = _cnpj_strings(keys)
+        est = self.estabelecimentos(
+            cnpjs, ["cnpj", "cnpj_basico", "situacao_cadastral", "data_inicio_atividade"]
+        ).drop_duplicates("cnpj")
+        emp = self.empresas(
+            est["cnpj_basico"].unique(), ["cnpj_basico", "porte_empresa", "natureza_juridica"]
+        ).drop_duplicates("cnpj_basico")
+
+        df = est.merge(emp, on="cnpj_basico", how="left")
+        df["situacao"] = df["situacao_cadastral"].map(SITUACOES)
+        df["porte_empresa"] = df["porte_empresa"].map(PORTES)
+        df["data_inicio_atividade"] = df["data_inicio_atividade"].map(_date)
+
+        out = df.set_index("cnpj")[RECEITA_COLUMNS].reindex(cnpjs).reset_index(drop=True)
+        return out[columns or RECEITA_COLUMNS]
+
+    def payloads(self, cnpjs) -> dict:
+        """
+        Monta, para cada CNPJ encontrado, um JSON no formato da API pública
+        (publica.cnpj.ws), para que o restante do pipeline não perceba a diferença.
+        """
+        est = _nulls_to_none(self.estabelecimentos(cnpjs).drop_duplicates("cnpj"))
+        if est.empty:
+            return {}
+        basicos = est["cnpj_basico"].unique()
+        emp = _nulls_to_none(self.empresas(basicos).drop_duplicates("cnpj_basico")).set_index("cnpj_basico")
+        simples = _nulls_to_none(self._scan("simples", basicos))
+        simples = simples.drop_duplicates("cnpj_basico").set_index("cnpj_basico") if len(simples) else simples
+        socios = _nulls_to_none(self._scan("socios", basicos))
+        socios_by = {b: g for b, g in socios.groupby("cnpj_basico")} if len(socios) else {}
+
+        municipios = self.domain("municipios")
+        cnaes = self.domain("cnaes")
+        naturezas = self.domain("naturezas")
+        qualificacoes = self.domain("qualificacoes")
+
+        out = {}
+        for row in est.to_dict("records"):
+            basico = row["cnpj_basico"]
+            e = emp.loc[basico].to_dict() if basico in emp.index else {}
+            s = simples.loc[basico].to_dict() if len(simples) and basico in simples.index else None
+            cnae = row.get("cnae_fiscal_principal")
+            out[row["cnpj"]] = {
+                "cnpj_raiz": basico,
+                "razao_social": e.get("razao_social"),
+                "capital_social": (e.get("capital_social") or "").replace(",", ".") or None,
+                "porte": {"id": e.get("porte_empresa"), "descricao": PORTES_DESCRICAO.get(e.get("porte_empresa"))} if e else None,
+                "natureza_juridica": {"id": e.get("natureza_juridica"), "descricao": naturezas.get(e.get("natureza_juridica"))} if e else None,
+                "qualificacao_do_responsavel": {"id": e.get("qualificacao_responsavel"), "descricao": qualificacoes.get(e.get("qualificacao_responsavel"))} if e else None,
+                "socios": [
+                    {
+                        "nome": r["nome_socio"],
+                        "cpf_cnpj_socio": r["cnpj_cpf_socio"],
+                        "qualificacao_socio": {"id": r["qualificacao_socio"], "descricao": qualificacoes.get(r["qualificacao_socio"])},
+                        "data_entrada": _date(r["data_entrada_sociedade"]),
+                        "faixa_etaria": r["faixa_etaria"],
+                    }
+                    for r in socios_by.get(basico, pd.DataFrame()).to_dict("records")
+                ],
+                "simples": {
+                    "simples": "Sim" if s.get("opcao_simples") == "S" else "Não",
+                    "data_opcao_simples": _date(s.get("data_opcao_simples")),
+                    "data_exclusao_simples": _date(s.get("data_exclusao_simples")),
+                    "mei": "Sim" if s.get("opcao_mei") == "S" else "Não",
+                    "data_opcao_mei": _date(s.get("data_opcao_mei")),
+                    "data_exclusao_mei": _date(s.get("data_exclusao_mei")),
+                } if s else None,
+                "estabelecimento": {
+                    "cnpj": row["cnpj"],
+                    "cnpj_raiz": basico,
+                    "cnpj_ordem": row["cnpj_ordem"],
+                    "cnpj_digito_verificador": row["cnpj_dv"],
+                    "tipo": "Matriz" if row["identificador_matriz_filial"] == "1" else "Filial",
+                    "nome_fantasia": row["nome_fantasia"],
+                    "situacao_cadastral": (SITUACOES.get(row["situacao_cadastral"]) or "").capitalize() or None,
+                    "data_situacao_cadastral": _date(row["data_situacao_cadastral"]),
+                    "data_inicio_atividade": _date(row["data_inicio_atividade"]),
+                    "tipo_logradouro": row["tipo_logradouro"],
+                    "logradouro": row["logradouro"],
+                    "numero": row["numero"],
+                    "complemento": row["complemento"],
+                    "bairro": row["bairro"],
+                    "cep": row["cep"],
+                    "ddd1": row["ddd_1"],
+                    "telefone1": row["telefone_1"],
+                    "ddd2": row["ddd_2"],
+                    "telefone2": row["telefone_2"],
+                    "email": row["correio_eletronico"],
+                    "atividade_principal": {"id": cnae, "descricao": cnaes.get(cnae)} if cnae else None,
+                    "estado": {"sigla": row["uf"], "nome": UF_NOMES.get(row["uf"])},
+                    "cidade": {"nome": municipios.get(row["municipio"]), "siafi_id": row["municipio"]},
+                },
+                "fonte": "receita_bulk",
+            }
+        return out
+
+
+# ===============================
+# CLI
+# ===============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga do dump oficial de CNPJs da Receita Federal")
+    parser.add_argument("--input", "-i", required=True, help="Pasta com os .zip oficiais (ou um .zip)")
+    parser.add_argument("--output", "-o", default=BULK_DIR, help="Pasta de saída (Parquet)")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input):
+        paths = sorted(glob.glob(os.path.join(args.input, "*.zip")))
+    else:
+        paths = [args.input]
+    if not paths:
+        raise SystemExit(f"Nenhum .zip encontrado em {args.input}")
+
+    manifest = load_bulk(paths, args.output)
+    print("✅ Carga concluída:")
+    for table, info in manifest.items():
+        print(f"   {table}: {info['rows']} linhas")
+
+
+if __name__ == "__main__":
+    main()
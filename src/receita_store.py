@@ -0,0 +1,162 @@
+"""
+Base de referência da Receita indexada para o enriquecimento.
+
+- As chaves (CNPJ normalizado) são calculadas uma única vez e gravadas ordenadas
+  como uint64 (keys.npy)
+- As colunas ficam num arquivo Arrow IPC (columns.arrow) na mesma ordem das chaves,
+  aberto por memory-map: só as páginas das linhas/colunas consultadas são lidas
+- A consulta é um searchsorted + take vetorizado (sem merge do pandas)
+- A base é reconstruída automaticamente quando o CSV de origem muda
+"""
+import csv
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+RECEITA_PATH = "data_raw/receita_mock.csv"
+STORE_DIR = "data_processed/receita_store"
+
+KEYS_FILE = "keys.npy"
+COLUMNS_FILE = "columns.arrow"
+META_FILE = "meta.json"
+
+BUILD_BLOCK = 1 << 20  # linhas por lote na ordenação/gravação
+
+
+def _source_stamp(source):
+    st = os.stat(source)
+    return {"path": os.path.abspath(source), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cnpj_key_array(values: pa.Array) -> np.ndarray:
+    """
+    Converte uma coluna Arrow de CNPJs (texto) em chaves uint64; vazios viram 0.
+    """
+    digits = pc.replace_substring_regex(values.cast(pa.string()), r"\D", "")
+    digits = pc.if_else(pc.equal(digits, ""), None, digits)
+    keys = pc.cast(digits, pa.uint64()).fill_null(0)
+    return keys.to_numpy(zero_copy_only=False)
+
+
+# ===============================
+# Construção
+# ===============================
+
+def build_store(source=RECEITA_PATH, store_dir=STORE_DIR):
+    """
+    Lê o CSV da Receita em blocos, normaliza as chaves uma vez e grava a base
+    ordenada por CNPJ. CNPJs repetidos: fica a primeira ocorrência.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+
+    with open(source, "r", encoding="utf-8", newline="") as f:
+        header = next(csv.reader(f))
+    columns = [c for c in header if c != "cnpj"]
+    convert = pacsv.ConvertOptions(
+        column_types={c: pa.string() for c in header},
+        strings_can_be_null=True,
+    )
+
+    # 1) leitura em blocos → arquivo temporário (ordem original) + chaves
+    unsorted_path = os.path.join(store_dir, COLUMNS_FILE + ".unsorted")
+    keys = []
+    schema = pa.schema([pa.field(c, pa.string()) for c in columns])
+    reader = pacsv.open_csv(source, convert_options=convert)
+    with pa.OSFile(unsorted_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in reader:
+            keys.append(cnpj_key_array(batch.column("cnpj")))
+            writer.write_batch(pa.record_batch([batch.column(c) for c in columns], schema=schema))
+    keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.uint64)
+
+    # 2) ordena (estável) e remove vazios e repetidos
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    keep = sorted_keys != 0
+    keep[1:] &= sorted_keys[1:] != sorted_keys[:-1]
+    order = order[keep]
+    sorted_keys = sorted_keys[keep]
+
+    # 3) grava as colunas na ordem das chaves, lote a lote
+    columns_path = os.path.join(store_dir, COLUMNS_FILE)
+    unsorted = pa.ipc.open_file(pa.memory_map(unsorted_path)).read_all()
+    with pa.OSFile(columns_path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for start in range(0, len(order), BUILD_BLOCK):
+            writer.write_table(unsorted.take(order[start:start + BUILD_BLOCK]))
+    del unsorted
+    os.replace(columns_path + ".tmp", columns_path)
+    os.remove(unsorted_path)
+
+    keys_path = os.path.join(store_dir, KEYS_FILE)
+    np.save(keys_path + ".tmp.npy", sorted_keys)
+    os.replace(keys_path + ".tmp.npy", keys_path)
+
+    meta = {"source": _source_stamp(source), "columns": columns, "rows": int(len(sorted_keys))}
+    with open(os.path.join(store_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"🗄️ Base da Receita indexada: {len(sorted_keys)} CNPJs → {store_dir}")
+    return meta
+
+
+def is_stale(source=RECEITA_PATH, store_dir=STORE_DIR):
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return True
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return meta.get("source") != _source_stamp(source)
+
+
+# ===============================
+# Consulta
+# ===============================
+
+class ReceitaStore:
+    """
+    Base da Receita aberta por memory-map. Abrir é barato: nada é lido até a consulta.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.keys = np.load(os.path.join(store_dir, KEYS_FILE), mmap_mode="r")
+        source = pa.memory_map(os.path.join(store_dir, COLUMNS_FILE))
+        self.table = pa.ipc.open_file(source).read_all()  # zero-copy sobre o mmap
+        self.columns = self.table.column_names
+
+    def __len__(self):
+        return len(self.keys)
+
+    def positions(self, keys: np.ndarray) -> np.ndarray:
+        """Posição de cada chave na base, ou -1 quando não encontrada."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.searchsorted(self.keys, keys)
+        pos = np.minimum(pos, len(self.keys) - 1)
+        found = (self.keys[pos] == keys) & (keys != 0)
+        return np.where(found, pos, -1)
+
+    def lookup(self, keys: np.ndarray, columns=None) -> pd.DataFrame:
+        """
+        Retorna as colunas pedidas para cada chave (na ordem das chaves);
+        chaves não encontradas viram linhas nulas.
+        """
+        pos = self.positions(keys)
+        indices = pa.array(pos, mask=pos < 0)
+        table = self.table.select(columns or self.columns)
+        return table.take(indices).to_pandas()
+
+
+def open_store(source=RECEITA_PATH, store_dir=STORE_DIR, rebuild=False) -> ReceitaStore:
+    """
+    Abre a base indexada, construindo-a antes se não existir ou se o CSV
+    de origem tiver mudado desde a última construção.
+    """
+    if rebuild or is_stale(source, store_dir):
+        build_store(source, store_dir)
+    return ReceitaStore(store_dir)
@@ -0,0 +1,69 @@
+"""
+Tabelas de faixas (score estrutural e classificação do lead) definidas como dados.
+
+config/scoring_rules.json define, para cada etapa:
+- column: coluna de entrada
+- edges: limites crescentes; valor >= edges[i] passa para a faixa i + 1
+- values: resultado de cada faixa (len(edges) + 1 valores, da menor para a maior)
+- missing: resultado para entrada nula (pode repetir um dos values, ex: a faixa mais baixa)
+
+Ex: edges [0.6, 0.75, 0.9] e values [20, 60, 80, 100] → 0.7 cai na faixa 1 (60).
+Novas faixas são só novas entradas em edges/values. O arquivo pode ser trocado
+por CNPJ_SCORING_RULES=<caminho>.
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_PATH = os.environ.get("CNPJ_SCORING_RULES", os.path.join(ROOT_DIR, "config", "scoring_rules.json"))
+
+
+@lru_cache(maxsize=None)
+def _load(path, mtime_ns):
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    for name, rule in rules.items():
+        edges = rule["edges"]
+        if list(edges) != sorted(edges):
+            raise ValueError(f"Regra '{name}': edges devem ser crescentes: {edges}")
+        if len(rule["values"]) != len(edges) + 1:
+            raise ValueError(f"Regra '{name}': são necessários {len(edges) + 1} values para {len(edges)} edges")
+        labels = [v for v in rule["values"] if isinstance(v, str)]
+        if len(set(labels)) != len(labels):
+            # rótulos viram categorias (ex: lead_classification), que precisam ser únicas
+            raise ValueError(f"Regra '{name}': rótulos repetidos em values: {rule['values']}")
+    return rules
+
+
+def load_rules(path=RULES_PATH) -> dict:
+    """Regras do arquivo (recarregadas só quando o arquivo muda)."""
+    return _load(path, os.stat(path).st_mtime_ns)
+
+
+def get_rule(name, path=RULES_PATH) -> dict:
+    return load_rules(path)[name]
+
+
+def tier_codes(values, edges) -> np.ndarray:
+    """Faixa de cada valor (0..len(edges)); nulos ficam com -1."""
+    x = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = np.digitize(x, np.asarray(edges, dtype=np.float64), right=False)
+    codes[np.isnan(x)] = -1
+    return codes
+
+
+def apply_rule(df: pd.DataFrame, name, path=RULES_PATH) -> np.ndarray:
+    """
+    Códigos de faixa da coluna de entrada da regra. Entradas nulas recebem -1
+    e geram um aviso com a quantidade e o valor que vão receber.
+    """
+    rule = get_rule(name, path)
+    codes = tier_codes(df[rule["column"]], rule["edges"])
+    missing = int((codes < 0).sum())
+    if missing:
+        print(f"⚠️ {name}: {missing} linha(s) sem {rule['column']} → {rule['missing']}")
+    return codes
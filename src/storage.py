@@ -0,0 +1,215 @@
+"""
+Camada de armazenamento dos intermediários do pipeline.
+
+- Formato nativo: Parquet com dtypes explícitos (uf/municipio/situacao/cnae_fiscal
+  como dicionário/categoria) e leitura só das colunas pedidas
+- CSV fica como formato de exportação (arquivos entregues para uso comercial)
+- O formato pode ser trocado por CNPJ_STORAGE_FORMAT=csv (ex: depuração)
+
+As tabelas são referenciadas por nome lógico ("leads_b2b_clean"), não por caminho.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DATA_DIR = "data_processed"
+FORMAT = os.environ.get("CNPJ_STORAGE_FORMAT", "parquet")
+
+STRING_COLUMNS = [
+    "query", "cnpj", "error", "razao_social", "nome_fantasia", "bairro", "logradouro",
+    "numero", "cep", "telefone", "email", "porte_empresa", "natureza_juridica",
+    "data_inicio_atividade", "validation_errors",
+]
+CATEGORY_COLUMNS = [
+    "uf", "municipio", "situacao", "cnae_fiscal", "cnae_secao", "cnae_divisao", "cnae_grupo",
+    "cnae_classe", "lead_classification",
+]
+BOOL_COLUMNS = ["valid_format", "is_valid_structural", "is_valid_business"]
+
+SCHEMA = {
+    **{c: "string" for c in STRING_COLUMNS},
+    **{c: "category" for c in CATEGORY_COLUMNS},
+    **{c: "boolean" for c in BOOL_COLUMNS},
+    "completeness_score": "float64",
+    "structural_score": "Int64",
+}
+
+ARROW_TYPES = {
+    "string": pa.string(),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "boolean": pa.bool_(),
+    "float64": pa.float64(),
+    "Int64": pa.int64(),
+}
+
+
+def path(name, fmt=None, data_dir=DATA_DIR):
+    """Caminho físico de uma tabela no formato indicado (padrão: FORMAT)."""
+    return os.path.join(data_dir, f"{name}.{fmt or FORMAT}")
+
+
+def export_path(name, data_dir=DATA_DIR):
+    """Caminho do CSV de exportação de uma tabela."""
+    return path(name, "csv", data_dir)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as colunas conhecidas para os dtypes explícitos do SCHEMA.
+    """
+    for col, dtype in SCHEMA.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("string").astype("category")
+        elif dtype == "boolean":
+            df[col] = df[col].map(_to_bool, na_action="ignore").astype("boolean")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def arrow_schema(df: pd.DataFrame) -> pa.Schema:
+    """
+    Schema Arrow estável para a tabela (mesmo tipo em todos os blocos de uma escrita).
+    """
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in inferred:
+        dtype = SCHEMA.get(field.name)
+        if dtype:
+            fields.append(pa.field(field.name, ARROW_TYPES[dtype]))
+        elif pa.types.is_null(field.type) or pa.types.is_large_string(field.type):
+            fields.append(pa.field(field.name, pa.string()))
+        else:
+            fields.append(field)
+    return pa.schema(fields, metadata=inferred.metadata)
+
+
+def to_arrow(df: pd.DataFrame, schema: pa.Schema = None) -> pa.Table:
+    schema = schema or arrow_schema(df)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _read_csv(file_path, columns=None):
+    header = pd.read_csv(file_path, nrows=0).columns
+    dtype = {c: SCHEMA[c] for c in header if SCHEMA.get(c) in ("string", "category")}
+    return apply_schema(pd.read_csv(file_path, usecols=columns, dtype=dtype))
+
+
+def read_path(file_path, columns=None) -> pd.DataFrame:
+    """Lê um arquivo Parquet ou CSV (pela extensão), com projeção de colunas."""
+    if file_path.endswith(".parquet"):
+        return pd.read_parquet(file_path, columns=columns)
+    return _read_csv(file_path, columns)
+
+
+def exists(name, data_dir=DATA_DIR):
+    return any(os.path.exists(path(name, fmt, data_dir)) for fmt in ("parquet", "csv"))
+
+
+def _find(name, data_dir=DATA_DIR):
+    """Arquivo da tabela no formato configurado ou, se não existir, no outro formato."""
+    for fmt in (FORMAT, "parquet" if FORMAT == "csv" else "csv"):
+        file_path = path(name, fmt, data_dir)
+        if os.path.exists(file_path):
+            return file_path
+    raise FileNotFoundError(path(name, data_dir=data_dir))
+
+
+def read_table(name, columns=None, data_dir=DATA_DIR) -> pd.DataFrame:
+    """
+    Lê uma tabela pelo nome lógico. Usa o formato configurado e, se o arquivo
+    não existir nele, o outro formato (ex: entradas ainda geradas em CSV).
+    """
+    return read_path(_find(name, data_dir), columns)
+
+
+def iter_path(file_path, chunksize=100_000, columns=None):
+    """
+    Lê um arquivo em blocos de até 'chunksize' linhas. No CSV, colunas fora do
+    SCHEMA são lidas como texto: a inferência de tipos não pode variar de um bloco para outro.
+    """
+    if file_path.endswith(".parquet"):
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns):
+            yield apply_schema(batch.to_pandas())
+        return
+    header = pd.read_csv(file_path, nrows=0).columns
+    dtype = {c: SCHEMA[c] if SCHEMA.get(c) in ("string", "category") else "string" for c in header}
+    for chunk in pd.read_csv(file_path, usecols=columns, dtype=dtype, chunksize=chunksize):
+        yield apply_schema(chunk)
+
+
+def iter_table(name, chunksize=100_000, columns=None, data_dir=DATA_DIR):
+    """read_table em blocos (memória limitada ao tamanho do bloco)."""
+    return iter_path(_find(name, data_dir), chunksize, columns)
+
+
+def write_table(df: pd.DataFrame, name, export_csv=False, data_dir=DATA_DIR):
+    """
+    Grava uma tabela no formato nativo. Com export_csv=True também gera o CSV
+    de exportação (quando o formato nativo não é CSV).
+    Retorna o caminho nativo.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    df = apply_schema(df)
+    native = path(name, data_dir=data_dir)
+    if FORMAT == "parquet":
+        pq.write_table(to_arrow(df), native)
+    else:
+        df.to_csv(native, index=False)
+    if export_csv and FORMAT != "csv":
+        df.to_csv(export_path(name, data_dir), index=False)
+    return native
+
+
+class TableWriter:
+    """
+    Escrita incremental (bloco a bloco) de uma tabela: Parquet via ParquetWriter
+    com schema fixado no primeiro bloco, ou CSV em append. fmt="csv" força exportação CSV.
+    """
+
+    def __init__(self, name, fmt=None, export_csv=False, data_dir=DATA_DIR):
+        os.makedirs(data_dir, exist_ok=True)
+        self.fmt = fmt or FORMAT
+        self.path = path(name, self.fmt, data_dir)
+        self.export = TableWriter(name, "csv", data_dir=data_dir) if export_csv and self.fmt != "csv" else None
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        df = apply_schema(df)
+        if self.fmt == "parquet":
+            if self._writer is None:
+                self._schema = arrow_schema(df)
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            self._writer.write_table(to_arrow(df, self._schema))
+        else:
+            df.to_csv(self.path, index=False, mode="a" if self._started else "w", header=not self._started)
+        self._started = True
+        self.rows += len(df)
+        if self.export is not None:
+            self.export.write(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.export is not None:
+            self.export.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,112 @@
+import pandas as pd
+
+from src.clean_final_csv import clean_dataframe
+from src.enrich_from_receita import enrich_from_receita, open_reference
+from src.validate_structural import validate_structural
+from src.structural_score import apply_structural_score
+from src.lead_classification import classify_leads
+from src.business_rules import apply_business_rules
+from src.normalize_cnae import normalize_cnae_column, select_final_columns
+from src.quality_metrics import QualityMetricsAccumulator
+from src import metrics
+from src import storage
+from src.execution import SerialBackend
+from src.dedup import ExternalDeduper, print_report
+
+INPUT = "data_processed/leads_b2b.csv"
+
+# Saídas finais (sinks): nome da tabela → opções do storage.TableWriter.
+# Os intermediários do modo em lote não são gravados.
+SINKS = {
+    "classified": {"name": "leads_b2b_classified"},
+    "validos": {"name": "leads_b2b_validos", "fmt": "csv"},
+    "invalidos": {"name": "leads_b2b_invalidos", "fmt": "csv"},
+    "business_valid": {"name": "leads_b2b_business_valid", "fmt": "csv"},
+    "final": {"name": "leads_b2b_final", "export_csv": True},
+}
+
+
+def run_streaming(input_path=INPUT, chunksize=100_000, sinks=None, backend=None):
+    """
+    Executa limpeza → enriquecimento → validação → score → classificação → regras
+    de negócio em blocos de 'chunksize' linhas, gravando só as saídas finais.
+    A deduplicação por CNPJ entre blocos (mantendo o primeiro) é externa
+    (src/dedup.py): os blocos limpos passam pelo ExternalDeduper, que vai para disco
+    acima de 'chunksize' linhas, e as etapas seguintes consomem a saída dele em
+    blocos, na ordem original. A memória fica limitada ao tamanho do bloco, sem
+    conjunto de CNPJs já vistos. 'backend' (src.execution) distribui as regras
+    de negócio (df.apply linha a linha) de cada bloco entre processos.
+    """
+    sinks = sinks or SINKS
+    backend = backend or SerialBackend()
+    out = {name: storage.TableWriter(**opts) for name, opts in sinks.items()}
+
+    store = open_reference()
+    quality = QualityMetricsAccumulator()
+    rows_in = rows_unique = 0
+
+    with ExternalDeduper("cnpj", memory_rows=chunksize) as dedup:
+        # Limpeza; dtype=str: a inferência de tipos não pode variar de um bloco para outro
+        for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype=str):
+            rows_in += len(chunk)
+            with metrics.stage("clean") as st:
+                df = clean_dataframe(chunk, drop_duplicates=False)
+                dedup.add(df)
+                st.count(chunk, df)
+
+        for i, df in enumerate(dedup.results(batch_rows=chunksize)):
+            rows_unique += len(df)
+            _process_chunk(df, out, store, quality, backend)
+            print(f"   bloco {i + 1}: {rows_unique} CNPJs únicos de {rows_in} linhas lidas")
+    print_report(dedup.report)
+
+    for sink in out.values():
+        sink.close()
+
+    print()
+    if quality.total:
+        quality.report()
+    print()
+    for name, sink in out.items():
+        print(f"📁 {sink.path}: {sink.rows} registros")
+
+    return {name: sink.rows for name, sink in out.items()}
+
+
+def _process_chunk(df, out, store, quality, backend):
+    """Etapas depois da deduplicação, para um bloco de CNPJs únicos."""
+    with metrics.stage("normalize_cnae") as st:
+        final = select_final_columns(normalize_cnae_column(df.copy()))
+        out["final"].write(final)
+        st.count(df, final)
+
+    # Enriquecimento, validação, score e classificação
+    with metrics.stage("enrich") as st:
+        st.count(rows_in=df)
+        df = enrich_from_receita(df, store, verbose=False)
+        st.count(rows_out=df)
+    with metrics.stage("validate") as st:
+        df = validate_structural(df)
+        st.count(df, df)
+    with metrics.stage("score") as st:
+        df = apply_structural_score(df)
+        st.count(df, df)
+    with metrics.stage("classify") as st:
+        df = classify_leads(df)
+        out["classified"].write(df)
+        st.count(df, df)
+    with metrics.stage("split_valid") as st:
+        quality.update(df)
+        valid = df[df["is_valid_structural"] == True]
+        out["validos"].write(valid)
+        out["invalidos"].write(df[df["is_valid_structural"] == False])
+        st.count(df, valid)
+
+    # Regras de negócio
+    with metrics.stage("business") as st:
+        st.count(rows_in=df)
+        df = backend.map(apply_business_rules, df)
+        business = df[df["is_valid_business"] == True]
+        out["business_valid"].write(business)
+        st.count(rows_out=business)
+
@@ -1,21 +1,19 @@
+import numpy as np
 import pandas as pd
 
+from src.scoring_rules import apply_rule, get_rule
+
 
 def apply_structural_score(df: pd.DataFrame) -> pd.DataFrame:
     """
     Aplica score estrutural baseado no completeness_score.
+    Faixas e pontuações em config/scoring_rules.json ("structural_score").
     """
+    rule = get_rule("structural_score")
+    codes = apply_rule(df, "structural_score")
 
-    def score_rule(completeness):
-        if completeness >= 0.9:
-            return 100
-        elif completeness >= 0.75:
-            return 80
-        elif completeness >= 0.6:
-            return 60
-        else:
-            return 20
-
-    df["structural_score"] = df["completeness_score"].apply(score_rule)
+    # código -1 (entrada nula) pega o último item: o valor de 'missing'
+    scores = np.array(rule["values"] + [rule["missing"]])
+    df["structural_score"] = scores[codes]
 
     return df
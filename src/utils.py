@@ -1,7 +1,15 @@
 # src/utils.py
+import ast
+import json
 import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 CNPJ_PATTERN = re.compile(r'(?<!\d)(\d{14}|\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})(?!\d)')
+NON_DIGIT = re.compile(r'\D')
 
 def only_digits(s: str) -> str:
     """Remove tudo que não é dígito."""
@@ -19,28 +27,156 @@ def normalize_cnpj(cnpj_raw: str) -> str:
         return digits.zfill(14)
     return digits[:14]
 
+# pesos do dígito verificador (13º e 14º dígitos)
+CNPJ_WEIGHTS_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+CNPJ_WEIGHTS_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+
+def cnpj_check_digits(base: np.ndarray) -> np.ndarray:
+    """
+    Calcula os dois dígitos verificadores para uma matriz (n, 12) de dígitos.
+    Retorna matriz (n, 2) com os dígitos esperados.
+    """
+    base = np.asarray(base, dtype=np.int64)
+    r1 = (base @ CNPJ_WEIGHTS_1) % 11
+    d13 = np.where(r1 < 2, 0, 11 - r1)
+    r2 = (base @ CNPJ_WEIGHTS_2[:12] + d13 * CNPJ_WEIGHTS_2[12]) % 11
+    d14 = np.where(r2 < 2, 0, 11 - r2)
+    return np.stack([d13, d14], axis=1)
+
+def validate_cnpj_batch(values):
+    """
+    Valida uma coluna inteira de CNPJs (pandas Series, array NumPy ou lista).
+
+    Os dígitos de cada entrada são decodificados numa matriz uint8 (n, 14) e os
+    dois dígitos verificadores são calculados por produto matricial com os pesos.
+    Retorna (mask, normalized):
+    - mask: array bool, True onde o CNPJ é válido (mesma regra de validate_cnpj)
+    - normalized: array de strings com 14 dígitos (mesma regra de normalize_cnpj)
+    """
+    # extração e padding em Arrow compute; \p{Nd} (e não \D, que no RE2 é só ASCII)
+    # mantém dígitos unicode, como only_digits
+    if not (isinstance(values, pd.Series) and pd.api.types.is_string_dtype(values.dtype)):
+        values = pd.Series(values, dtype=object)
+    arr = pa.array(values.astype("string[pyarrow]"))
+    digits_arr = pc.fill_null(pc.replace_substring_regex(arr, r"[^\p{Nd}]", ""), "")
+    lengths = pc.utf8_length(digits_arr).to_numpy(zero_copy_only=False)
+
+    # normalização: completa com zeros à esquerda ou trunca em 14 dígitos
+    padded = pc.utf8_slice_codeunits(pc.utf8_lpad(digits_arr, 14, "0"), 0, 14)
+    normalized = pc.if_else(pc.greater(lengths, 0), padded, "").to_numpy(zero_copy_only=False)
+
+    mask = np.zeros(len(lengths), dtype=bool)
+    candidates = lengths == 14
+    if not candidates.any():
+        return mask, normalized
+
+    # decodifica todos os candidatos de uma vez: binary(14) guarda os dígitos num buffer contíguo
+    cand = pc.filter(digits_arr, pa.array(candidates))
+    if not pc.all(pc.string_is_ascii(cand)).as_py():
+        # dígitos unicode (raros): converte para ASCII como int() faria
+        cand = pa.array([d if d.isascii() else "".join(str(int(c)) for c in d) for d in cand.to_pylist()])
+    fixed = cand.cast(pa.binary(14))
+    raw = np.frombuffer(fixed.buffers()[1], dtype=np.uint8, count=len(fixed) * 14, offset=fixed.offset * 14)
+    mat = (raw - ord("0")).reshape(-1, 14)
+
+    # rejeita sequências repetidas (ex: 00000000000000)
+    repeated = (mat == mat[:, :1]).all(axis=1)
+    expected = cnpj_check_digits(mat[:, :12])
+    ok = (expected == mat[:, 12:]).all(axis=1) & ~repeated
+
+    mask[candidates] = ok
+    return mask, normalized
+
 def validate_cnpj(cnpj_digits: str) -> bool:
     """
     Valida CNPJ (recebe string com 14 dígitos). Retorna True se válido.
-    Implementação do algoritmo do dígito verificador.
+    Wrapper escalar sobre validate_cnpj_batch.
     """
-    cnpj = only_digits(cnpj_digits)
-    if len(cnpj) != 14:
-        return False
-    # rejeita sequências repetidas (ex: 00000000000000)
-    if cnpj == cnpj[0] * 14:
-        return False
+    mask, _ = validate_cnpj_batch([cnpj_digits])
+    return bool(mask[0])
+
+# ===============================
+# Dicionários em texto (repr Python / JSON)
+# ===============================
 
-    def calc_digit(nums, multipliers):
-        s = sum(int(n) * m for n, m in zip(nums, multipliers))
-        r = s % 11
-        return '0' if r < 2 else str(11 - r)
+# um par chave: valor de um dict plano, ex: 'nome': 'Rio de Janeiro' / "id": 19 / 'x': None
+_DICT_PAIR = re.compile(
+    r"""\s*(?:'([^'\\]*)'|"([^"\\]*)")\s*:\s*"""
+    r"""(?:'([^'\\]*)'|"([^"\\]*)"|(-?\d+(?:\.\d+)?)|(None|null|True|true|False|false))"""
+    r"""\s*([,}])"""
+)
+_LITERALS = {"None": None, "null": None, "True": True, "true": True, "False": False, "false": False}
+
+def _scan_flat_dict(s: str):
+    """
+    Lê um dict plano (sem aninhamento nem escapes) com um único regex compilado.
+    Retorna None quando o texto foge desse formato (quem chama usa o parser completo).
+    """
+    if s == "{}":
+        return {}
+    d = {}
+    pos = 1
+    while True:
+        m = _DICT_PAIR.match(s, pos)
+        if m is None:
+            return None
+        key = m.group(1) if m.group(1) is not None else m.group(2)
+        if m.group(3) is not None:
+            value = m.group(3)
+        elif m.group(4) is not None:
+            value = m.group(4)
+        elif m.group(5) is not None:
+            value = float(m.group(5)) if "." in m.group(5) else int(m.group(5))
+        else:
+            value = _LITERALS[m.group(6)]
+        d[key] = value
+        pos = m.end()
+        if m.group(7) == "}":
+            return d if pos == len(s) else None
 
-    base12 = cnpj[:12]
-    mult1 = [5,4,3,2,9,8,7,6,5,4,3,2]
-    d13 = calc_digit(base12, mult1)
+@lru_cache(maxsize=65536)
+def parse_dict_repr(s: str):
+    """
+    Converte texto como "{'id': 19, 'nome': 'Rio de Janeiro'}" (repr Python) ou
+    JSON em dict. Retorna None se não for um dict.
+    Memoizado por texto: há poucos valores distintos (municípios, UFs).
+    O dict retornado é compartilhado entre chamadas — não altere.
+    """
+    s = s.strip()
+    if not (s.startswith("{") and s.endswith("}")):
+        return None
+    if s.count("{") == 1:
+        d = _scan_flat_dict(s)
+        if d is not None:
+            return d
+    for parse in (ast.literal_eval, json.loads):
+        try:
+            d = parse(s)
+        except Exception:
+            continue
+        return d if isinstance(d, dict) else None
+    return None
 
-    mult2 = [6] + mult1
-    d14 = calc_digit(base12 + d13, mult2)
+def dict_field(value, *keys):
+    """
+    Primeiro valor não vazio entre 'keys' de um dict (ou texto de dict).
+    Retorna None se não houver nenhum.
+    """
+    d = parse_dict_repr(value) if isinstance(value, str) else value
+    if not isinstance(d, dict):
+        return None
+    for k in keys:
+        if d.get(k):
+            return d[k]
+    return None
 
-    return cnpj[-2:] == (d13 + d14)
+def map_unique(series: pd.Series, func) -> pd.Series:
+    """
+    Aplica 'func' uma vez por valor distinto da Series (inclusive nulo)
+    e espalha o resultado para todas as linhas.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    results = [func(u) for u in uniques] + [func(np.nan)]
+    out = np.empty(len(results), dtype=object)
+    out[:] = results
+    return pd.Series(out[codes], index=series.index, name=series.name)
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 REQUIRED_FIELDS = [
@@ -16,35 +17,61 @@ REQUIRED_FIELDS = [
 ]
 
 
-def validate_structural(df: pd.DataFrame) -> pd.DataFrame:
+def _build_mask_tables(fields):
     """
-    Aplica validação estrutural e gera métricas de qualidade.
+    Pré-calcula, para cada uma das 2^N máscaras de campos ausentes,
+    o texto de erro, o completeness_score e o is_valid_structural.
     """
+    total_fields = len(fields)
+    n_masks = 1 << total_fields
+
+    errors = np.empty(n_masks, dtype=object)
+    completeness = np.empty(n_masks, dtype=np.float64)
+
+    for mask in range(n_masks):
+        missing_fields = [f for i, f in enumerate(fields) if mask & (1 << i)]
+        errors[mask] = ", ".join(missing_fields) if missing_fields else "OK"
+        completeness[mask] = round((total_fields - len(missing_fields)) / total_fields, 2)
 
-    validation_errors = []
-    completeness_scores = []
-    is_valid_list = []
+    return errors, completeness, completeness >= 0.7
 
-    total_fields = len(REQUIRED_FIELDS)
 
-    for _, row in df.iterrows():
-        missing_fields = []
+ERROR_TABLE, COMPLETENESS_TABLE, IS_VALID_TABLE = _build_mask_tables(REQUIRED_FIELDS)
 
-        for field in REQUIRED_FIELDS:
-            if field not in df.columns or pd.isna(row.get(field)) or str(row.get(field)).strip() == "":
-                missing_fields.append(field)
 
-        valid_fields = total_fields - len(missing_fields)
-        completeness = round(valid_fields / total_fields, 2)
+def _missing(col: pd.Series) -> np.ndarray:
+    """
+    Campo ausente: nulo ou string vazia após strip (mesma regra do loop por linha).
+    """
+    missing = col.isna().to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+        return missing
+    blank = col.astype(str).str.strip().eq("").to_numpy(dtype=bool, na_value=False)
+    return missing | blank
 
-        error_str = ", ".join(missing_fields) if missing_fields else "OK"
-        validation_errors.append(error_str)
 
-        completeness_scores.append(completeness)
-        is_valid_list.append(completeness >= 0.7)
+def missing_fields_mask(df: pd.DataFrame) -> np.ndarray:
+    """
+    Gera uma máscara de bits por linha: bit i ligado = REQUIRED_FIELDS[i] ausente.
+    """
+    mask = np.zeros(len(df), dtype=np.uint16)
+    for i, field in enumerate(REQUIRED_FIELDS):
+        if field not in df.columns:
+            mask |= np.uint16(1 << i)
+        else:
+            mask |= _missing(df[field]).astype(np.uint16) << np.uint16(i)
+    return mask
+
+
+def validate_structural(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica validação estrutural e gera métricas de qualidade.
+    """
+
+    mask = missing_fields_mask(df)
 
-    df["validation_errors"] = validation_errors
-    df["completeness_score"] = completeness_scores
-    df["is_valid_structural"] = is_valid_list
+    df["validation_errors"] = ERROR_TABLE[mask]
+    df["completeness_score"] = COMPLETENESS_TABLE[mask]
+    df["is_valid_structural"] = IS_VALID_TABLE[mask]
 
     return df
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# os testes importam os módulos como o pipeline: "src.x" (run.py) e "x" (dentro de src/)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
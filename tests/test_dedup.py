@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dedup import ExternalDeduper
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    n = 1000
+    return pd.DataFrame({
+        "cnpj": pd.Series([f"{k:014d}" for k in rng.integers(1, 300, n)], dtype="string"),
+        "uf": pd.Categorical(rng.choice(["SC", "SP", "RJ", None], n)),
+        "razao_social": pd.Series([f"Empresa {i}" for i in range(n)], dtype="string"),
+        "capital": rng.integers(0, 10_000, n),
+    })
+
+
+@pytest.mark.parametrize("memory_rows", [50, 10_000])
+def test_external_dedup_matches_drop_duplicates(frame, tmp_path, memory_rows):
+    with ExternalDeduper("cnpj", memory_rows=memory_rows, partitions=4, tmp_dir=str(tmp_path)) as dedup:
+        for start in range(0, len(frame), 37):
+            dedup.add(frame.iloc[start:start + 37])
+        spilled = dedup._dir is not None
+        result = pd.concat(dedup.results(batch_rows=64), ignore_index=True)
+
+    expected = frame.drop_duplicates("cnpj", keep="first").reset_index(drop=True)
+    assert spilled == (memory_rows < len(frame))
+    pd.testing.assert_frame_equal(result, expected)
+    assert dedup.report["rows_in"] == len(frame)
+    assert dedup.report["rows_out"] == len(expected)
+
+
+def _open_files(directory):
+    """Descritores do processo apontando para arquivos dentro de directory."""
+    names = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(os.path.join("/proc/self/fd", fd))
+        except OSError:
+            continue
+        if target.startswith(str(directory)):
+            names.append(target)
+    return names
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="precisa de /proc")
+def test_external_dedup_releases_spill_files(frame, tmp_path):
+    with ExternalDeduper("cnpj", memory_rows=50, partitions=4, tmp_dir=str(tmp_path)) as dedup:
+        for start in range(0, len(frame), 37):
+            dedup.add(frame.iloc[start:start + 37])
+        blocks = dedup.results(batch_rows=64)
+        first = next(blocks)
+        assert all("out_" in name for name in _open_files(tmp_path))  # só as partições em merge
+        rest = list(blocks)
+        assert _open_files(tmp_path) == []
+
+        assert len(first) + sum(map(len, rest)) == dedup.report["rows_out"]
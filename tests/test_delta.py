@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from src.delta import changed_mask, cnpj_keys, merge_rows, record_hashes
+
+
+def process(df):
+    """Etapa reprocessada: depende só da própria linha."""
+    return df.assign(score=df["razao_social"].str.len())
+
+
+def snapshot(df):
+    keys = cnpj_keys(df["cnpj"])
+    order = np.argsort(keys, kind="stable")
+    return {"keys": keys[order], "hashes": record_hashes(df)[order], "context": ""}
+
+
+def test_merge_rows_matches_full_reprocess():
+    v1 = pd.DataFrame({
+        "cnpj": ["00000000000001", "00000000000002", "00000000000003", "00000000000004"],
+        "razao_social": ["Alfa", "Beta", "Gama", "Delta"],
+    })
+    previous = process(v1)
+    state = snapshot(v1)
+
+    # 2 alterado, 3 removido, 5 novo, ordem diferente
+    v2 = pd.DataFrame({
+        "cnpj": ["00000000000005", "00000000000004", "00000000000002", "00000000000001"],
+        "razao_social": ["Epsilon", "Delta", "Beta Ltda", "Alfa"],
+    })
+    keys = cnpj_keys(v2["cnpj"])
+    changed = changed_mask(keys, record_hashes(v2), state)
+    assert changed.tolist() == [True, False, True, False]
+
+    removed = np.setdiff1d(state["keys"], keys)
+    replaced = np.concatenate([keys[changed], removed])
+    order = pd.Series(np.arange(len(v2)), index=v2["cnpj"].astype("string"))
+    merged = merge_rows(previous, process(v2[changed]), replaced, order)
+
+    pd.testing.assert_frame_equal(merged, process(v2))
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from dimensions import encode_dimensions, new_dimensions
+
+
+def test_encode_dimensions_scoped_to_table():
+    first = encode_dimensions(pd.DataFrame({"municipio": ["Blumenau", "Joinville"], "uf": ["SC", "SC"]}))
+    second = encode_dimensions(pd.DataFrame({"municipio": ["Aracaju"], "uf": ["Sergipe"]}))
+
+    assert list(first["municipio"].cat.categories) == ["Blumenau", "Joinville"]
+    assert list(second["municipio"].cat.categories) == ["Aracaju"]
+    assert second["uf"].tolist() == ["SE"]
+
+
+def test_run_scoped_dimensions_share_codes():
+    dims = new_dimensions()
+    first = encode_dimensions(pd.DataFrame({"cnae_fiscal": ["6201-5/01", "4711302"]}), dims)
+    second = encode_dimensions(pd.DataFrame({"cnae_fiscal": ["4711302"]}), dims)
+
+    assert first["cnae_fiscal"].tolist() == ["6201501", "4711302"]
+    assert second["cnae_fiscal"].cat.codes.tolist() == [first["cnae_fiscal"].cat.codes[1]]
+    assert len(new_dimensions()["cnae_fiscal"]) == 0
@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_block
+from src import metrics
+from src.business_rules import apply_business_rules
+from src.clean_final_csv import clean_dataframe
+from src.execution import ProcessBackend
+from src.lead_classification import classify_leads
+from src.structural_score import apply_structural_score
+from src.validate_structural import validate_structural
+
+
+def busy_rows(df):
+    """Gasta CPU proporcional ao número de linhas (só no processo que a executa)."""
+    end = time.process_time() + len(df) * 0.0002
+    while time.process_time() < end:
+        pass
+    return df.assign(doubled=df["n"] * 2)
+
+
+def test_worker_cpu_counted_in_stage(tmp_path):
+    run = metrics.start_run(report_dir=str(tmp_path))
+    df = pd.DataFrame({"n": range(3000)})
+    with ProcessBackend(3, min_rows=1000) as backend, metrics.stage("busy") as st:
+        result = backend.map(busy_rows, df)
+    run.close()
+
+    assert result["doubled"].tolist() == (df["n"] * 2).tolist()
+    assert st.cpu_s >= 0.5  # 3000 linhas × 0.2 ms, todas gastas nos workers
+
+
+@pytest.fixture(scope="module")
+def validated():
+    raw = generate_block(np.random.default_rng(3), 0, 4000)
+    df = validate_structural(clean_dataframe(raw, drop_duplicates=False))
+    return df.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("func", [apply_structural_score, classify_leads, apply_business_rules])
+def test_process_backend_matches_serial(validated, func):
+    df = validated
+    if func is not apply_structural_score:
+        df = apply_structural_score(df.copy())
+    if func is apply_business_rules:
+        df = classify_leads(df)
+
+    expected = func(df.copy())
+    with ProcessBackend(3, min_rows=1000) as backend:
+        assert len(backend.partitions(len(df))) == 3
+        result = backend.map(func, df.copy())
+
+    pd.testing.assert_series_equal(result.dtypes, expected.dtypes)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,44 @@
+import sqlite3
+
+import fetch_cache
+from fetch_cache import ROW_OVERHEAD, CnpjCache
+
+
+def last_access(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT cnpj, last_access FROM entries"))
+
+
+def test_hits_batch_last_access_until_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_cache, "TOUCH_BATCH", 3)
+    path = str(tmp_path / "cache.sqlite")
+    cache = CnpjCache(path)
+    for c in ("1", "2", "3"):
+        cache.put(c, error="not_found")
+    before = last_access(path)
+
+    assert cache.get("1") == {"data": None, "error": "not_found"}
+    assert cache.get("2") is not None
+    assert last_access(path) == before  # ainda só em memória
+
+    cache.get("3")  # terceiro hit: grava o lote
+    after = last_access(path)
+    assert all(after[c] >= before[c] for c in after) and after != before
+    cache.close()
+
+
+def test_evict_stops_at_limit(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CnpjCache(path, max_bytes=10 * ROW_OVERHEAD)
+    for i in range(10):
+        cache.put(f"{i:014d}", error="not_found")
+    cache.get(f"{0:014d}")  # o mais antigo vira o mais recente
+
+    cache.put(f"{10:014d}", error="not_found")
+
+    stats = cache.stats()
+    assert stats["evicted"] == 1
+    assert stats["entries"] == 10 and stats["bytes"] == 10 * ROW_OVERHEAD
+    assert cache.get(f"{0:014d}") is not None
+    assert cache.get(f"{1:014d}") is None
+    cache.close()
@@ -0,0 +1,37 @@
+from fetch_checkpoint import FetchCheckpoint, ResultWriter, iter_results
+
+
+def result(cnpj, error=None):
+    return {"query": cnpj, "cnpj": cnpj, "valid_format": True,
+            "data": None if error else {"cnpj": cnpj}, "error": error}
+
+
+def fetch(cnpj, attempt):
+    # primeira tentativa de "...02" falha com erro transitório
+    return result(cnpj, "http_503" if cnpj.endswith("02") and attempt == 0 else None)
+
+
+def test_resume_after_crash_before_checkpoint_flush(tmp_path):
+    queries = [f"{i:014d}" for i in range(1, 11)]
+    checkpoint_path = str(tmp_path / "checkpoint.npy")
+    results_path = str(tmp_path / "results.jsonl")
+
+    # 1ª execução: cai depois de gravar 6 resultados, sem nenhum flush do checkpoint
+    checkpoint = FetchCheckpoint(checkpoint_path)
+    writer = ResultWriter(results_path, checkpoint, flush_every=1000, flush_seconds=3600)
+    for q in queries[:6]:
+        writer.write(fetch(q, 0))
+    writer._fout.flush()  # o SO já tinha as linhas; o processo morre aqui
+    writer._fout.write_raw('{"cnpj": "000000000000')  # linha truncada pela queda
+
+    # retomada
+    checkpoint = FetchCheckpoint(checkpoint_path, resume=True, results_path=results_path)
+    pending = checkpoint.pending(queries)
+    assert pending == ["00000000000002"] + queries[6:]
+    with ResultWriter(results_path, checkpoint, append=True) as writer:
+        for q in pending:
+            writer.write(fetch(q, 1))
+
+    final = [r for chunk in iter_results(results_path, checkpoint=checkpoint) for r in chunk]
+    assert sorted(r["cnpj"] for r in final) == queries
+    assert all(r["error"] is None for r in final)
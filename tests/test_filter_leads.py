@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import storage
+from dimensions import encode_dimensions
+from filter_leads import as_list, filter_by_cnae, filter_by_municipio, filter_by_uf, filter_contact
+from lead_index import open_index, take_rows
+
+
+@pytest.fixture
+def final_table(tmp_path):
+    df = pd.DataFrame({
+        "cnpj": [f"{i:014d}" for i in range(1, 9)],
+        "uf": ["SC", "SP", "Santa Catarina", "SE", "XX", None, "sc", "RJ"],
+        "municipio": ["Blumenau", "São Paulo", "Joinville", "Aracaju", "Outro", "Blumenau", "BLUMENAU", "Rio de Janeiro"],
+        "cnae_fiscal": ["6201501", "4711302", "6201501", "1412601", "6204000", "6201501", None, "6202300"],
+        "telefone": ["4733330000", None, "", "7933330000", None, "4733331111", None, "2133330000"],
+        "email": [None, "a@b.com", None, None, "c@d.com", None, None, None],
+    })
+    path = tmp_path / "leads_b2b_final.parquet"
+    df.to_parquet(path, index=False)
+    return str(path)
+
+
+def scan(path, uf=None, cnae=None, municipio=None, only_contact=False):
+    df = encode_dimensions(storage.read_path(path))
+    df = filter_by_uf(df, uf)
+    df = filter_by_cnae(df, cnae)
+    df = filter_by_municipio(df, municipio)
+    if only_contact:
+        df = filter_contact(df)
+    return sorted(df["cnpj"])
+
+
+def indexed(path, uf=None, cnae=None, municipio=None, only_contact=False):
+    rows = open_index(path).query(
+        cnae=as_list(cnae), uf=as_list(uf), municipio=as_list(municipio), only_contact=only_contact
+    )
+    return sorted(take_rows(path, rows)["cnpj"])
+
+
+@pytest.mark.parametrize("query", [
+    {"uf": "SC"},
+    {"uf": "santa catarina"},
+    {"uf": "SC,SP"},
+    {"uf": "S"},            # não é UF: substring do valor gravado
+    {"uf": "XX"},
+    {"uf": "ZZ"},
+    {"cnae": "62"},
+    {"cnae": "62.01-5"},
+    {"municipio": "blumenau"},
+    {"only_contact": True},
+    {"uf": "SC", "cnae": "6201", "only_contact": True},
+])
+def test_index_and_scan_return_the_same_rows(final_table, query):
+    assert indexed(final_table, **query) == scan(final_table, **query)
+
+
+def test_uf_name_and_sigla_are_equivalent(final_table):
+    assert indexed(final_table, uf="Santa Catarina") == indexed(final_table, uf="SC")
+    assert indexed(final_table, uf="SC") == ["00000000000001", "00000000000003", "00000000000007"]
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+import jsonl_io
+from scripts.inspect_data import summarize_jsonl
+
+
+@pytest.fixture
+def jsonl_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_io, "MIN_SHARD_BYTES", 64)  # força várias faixas num arquivo pequeno
+    path = tmp_path / "raw.jsonl"
+    lines = []
+    for i in range(60):
+        obj = {"cnpj": f"{i:014d}", "socios": [{"nome": f"SOCIO {i}", "cpf_cnpj_socio": "***"}] if i % 7 == 0 else []}
+        lines.append(json.dumps(obj, ensure_ascii=False))
+    lines[30] = '{"cnpj": "truncad'
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_shard_ranges_cover_file_on_line_boundaries(jsonl_file):
+    ranges = jsonl_io.shard_ranges(jsonl_file, 4)
+    assert len(ranges) == 4
+    with open(jsonl_file, "rb") as f:
+        data = f.read()
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(data[start - 1:start] == b"\n" for start, _ in ranges[1:])
+
+
+def test_map_shards_reduction_matches_sequential(jsonl_file):
+    sequential = jsonl_io.read_jsonl(jsonl_file, on_error="raw")
+    counts = jsonl_io.map_shards(jsonl_file, len, workers=4, on_error="raw")
+    assert len(counts) == 4 and sum(counts) == len(sequential) == 60
+
+    summary = summarize_jsonl(jsonl_file, workers=4)
+    assert summary["objects"] == 60 and summary["malformed"] == 1
+    assert [s["nome"] for s in summary["socios"]] == [f"SOCIO {i}" for i in range(0, 60, 7)]
@@ -0,0 +1,59 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+
+from lead_service import make_server
+
+
+@pytest.fixture
+def service(tmp_path):
+    df = pd.DataFrame({
+        "cnpj": [f"{i:014d}" for i in range(1, 6)],
+        "uf": ["SC", "SP", "SC", "RJ", "SP"],
+        "municipio": ["Blumenau", "São Paulo", "Joinville", "Rio de Janeiro", "Campinas"],
+        "cnae_fiscal": ["6201501", "4711302", "6201501", "1412601", "6204000"],
+        "telefone": ["4733330000", None, None, "2133330000", None],
+        "email": [None, "a@b.com", None, None, None],
+    })
+    path = tmp_path / "leads_b2b_final.parquet"
+    df.to_parquet(path, index=False)
+    server = make_server(str(path), port=0, classified_path=str(tmp_path / "missing.parquet"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urlopen(url, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_repeated_filter_keys_are_combined(service):
+    status, body = get(service + "/leads?uf=SC&uf=RJ")
+    assert status == 200
+    assert body["total"] == 3
+
+
+def test_repeated_scalar_keys_use_the_last_value(service):
+    status, body = get(service + "/leads?page=1&page=2&page_size=2")
+    assert status == 200
+    assert body["page"] == 2
+    assert [item["cnpj"] for item in body["items"]] == ["00000000000003", "00000000000004"]
+
+    status, body = get(service + "/aggregate?by=municipio&by=uf")
+    assert status == 200
+    assert body["by"] == "uf"
+
+
+def test_invalid_page_is_a_client_error(service):
+    status, body = get(service + "/leads?page=abc")
+    assert status == 400
+    assert "error" in body
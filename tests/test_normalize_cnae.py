@@ -0,0 +1,31 @@
+import pandas as pd
+
+from src.clean_final_csv import clean_dataframe
+from src.normalize_cnae import normalize_cnae_column
+from src.validate_structural import validate_structural
+
+
+def leads():
+    base = {
+        "razao_social": "EMPRESA LTDA", "nome_fantasia": "EMPRESA", "municipio": "Blumenau", "uf": "SC",
+        "telefone": "4733330000", "email": "a@b.com", "situacao": "Ativa",
+    }
+    cnaes = ["6201-5/01", "{'id': '4711302', 'descricao': 'Comércio'}", "não informado", None]
+    return pd.DataFrame([{**base, "cnpj": f"{i:014d}", "cnae_fiscal": c} for i, c in enumerate(cnaes, 1)])
+
+
+def test_validation_sees_raw_cnae():
+    clean = clean_dataframe(leads())
+    assert clean["cnae_fiscal"].astype(object).tolist()[:3] == leads()["cnae_fiscal"].tolist()[:3]
+
+    validated = validate_structural(clean.copy())
+    # valor não reconhecido como CNAE continua preenchido para a validação
+    assert validated["completeness_score"].tolist()[2] == validated["completeness_score"].tolist()[0]
+    assert validated["completeness_score"].tolist()[3] < validated["completeness_score"].tolist()[0]
+
+
+def test_final_table_gets_canonical_cnae():
+    final = normalize_cnae_column(clean_dataframe(leads()))
+    assert final["cnae_fiscal"].astype(object).tolist()[:2] == ["6201501", "4711302"]
+    assert final["cnae_fiscal"].isna().tolist() == [False, False, True, True]
+    assert final["cnae_divisao"].astype(object).tolist()[:2] == ["62", "47"]
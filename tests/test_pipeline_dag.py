@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+
+from benchmarks.synthetic import write_dataset
+from src import pipeline_dag
+
+
+def test_run_dag_runs_then_skips(tmp_path, monkeypatch):
+    write_dataset(str(tmp_path), 500, seed=5)
+    monkeypatch.chdir(tmp_path)
+    state_path = str(tmp_path / "data_processed" / ".pipeline_state.json")
+
+    status = pipeline_dag.run_dag(max_workers=2, state_path=state_path)
+    assert status == {s.name: "ran" for s in pipeline_dag.STAGES}
+    for stage in pipeline_dag.STAGES:
+        assert all(os.path.exists(out) for out in stage.outputs), stage.name
+
+    final = pd.read_parquet(pipeline_dag.FINAL)
+    assert len(final) and final["cnpj"].is_unique
+
+    again = pipeline_dag.run_dag(max_workers=2, state_path=state_path)
+    assert set(again.values()) == {"skipped"}
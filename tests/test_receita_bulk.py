@@ -0,0 +1,68 @@
+import io
+import json
+import zipfile
+
+import numpy as np
+
+from receita_bulk import ReceitaBulk, load_bulk
+
+FILES = {
+    "Estabelecimentos0.zip": [
+        # cnpj_basico;ordem;dv;matriz;fantasia;situacao;data_sit;motivo;cidade_ext;pais;inicio;cnae;cnae_sec;
+        # tipo_logr;logr;numero;complemento;bairro;cep;uf;municipio;ddd1;tel1;ddd2;tel2;ddd_fax;fax;email;sit_esp;data_esp
+        '"12345678";"0001";"95";"1";"LOJA";"02";"20200101";"00";"";"";"20190505";"6201501";"";'
+        '"RUA";"DAS FLORES";"10";"";"CENTRO";"89010000";"SC";"8047";"47";"33330000";"";"";"";"";"";"";""',
+        '"87654321";"0001";"00";"1";"";"08";"20210101";"01";"";"";"20100101";"4711302";"";'
+        '"AV";"BRASIL";"S/N";"SALA 2";"";"01000000";"SP";"7107";"";"";"";"";"";"";"a@b.com";"";""',
+    ],
+    "Empresas0.zip": ['"12345678";"EMPRESA UM LTDA";"2062";"49";"1000,00";"01";""'],
+    "Simples.zip": ['"12345678";"S";"20200101";"00000000";"N";"";""'],
+    "Socios0.zip": ['"12345678";"2";"FULANO";"***123456**";"49";"20190505";"";"";"";"";"4"'],
+    "Municipios.zip": ['"8047";"BLUMENAU"', '"7107";"SAO PAULO"'],
+    "Cnaes.zip": ['"6201501";"Desenvolvimento de programas"'],
+}
+
+
+def write_zips(folder):
+    paths = []
+    for name, lines in FILES.items():
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr(name.replace(".zip", ".CSV"), ("\n".join(lines) + "\n").encode("latin-1"))
+        path = folder / name
+        path.write_bytes(buf.getvalue())
+        paths.append(str(path))
+    return paths
+
+
+def test_load_and_lookup(tmp_path):
+    bulk_dir = str(tmp_path / "bulk")
+    manifest = load_bulk(write_zips(tmp_path), bulk_dir)
+    assert manifest["estabelecimentos"]["rows"] == 2
+
+    bulk = ReceitaBulk(bulk_dir)
+    df = bulk.lookup(np.array([12345678000195, 87654321000100, 11111111000111], dtype=np.uint64))
+    assert df["situacao"].tolist()[:2] == ["ATIVA", "BAIXADA"]
+    assert df["porte_empresa"].tolist()[0] == "ME"
+    assert df["data_inicio_atividade"].tolist()[:2] == ["2019-05-05", "2010-01-01"]
+    assert df.iloc[2].isna().all()
+    assert bulk.estabelecimentos(["12345678000195", "87654321000100"], ["cnpj"], uf="SP")["cnpj"].tolist() == ["87654321000100"]
+
+
+def test_payloads_are_strict_json(tmp_path):
+    bulk_dir = str(tmp_path / "bulk")
+    load_bulk(write_zips(tmp_path), bulk_dir)
+
+    payloads = ReceitaBulk(bulk_dir).payloads(["12345678000195", "87654321000100", "11111111000111"])
+    assert set(payloads) == {"12345678000195", "87654321000100"}
+    json.dumps(payloads, allow_nan=False)  # NaN aqui levantaria ValueError
+
+    um = payloads["12345678000195"]
+    assert um["razao_social"] == "EMPRESA UM LTDA" and um["capital_social"] == "1000.00"
+    assert um["estabelecimento"]["complemento"] is None
+    assert um["estabelecimento"]["cidade"]["nome"] == "BLUMENAU"
+    assert um["simples"]["simples"] == "Sim" and um["socios"][0]["nome"] == "FULANO"
+
+    dois = payloads["87654321000100"]
+    assert dois["razao_social"] is None and dois["simples"] is None and dois["socios"] == []
+    assert dois["estabelecimento"]["email"] == "a@b.com" and dois["estabelecimento"]["ddd1"] is None
@@ -0,0 +1,43 @@
+import functools
+import json
+
+import pandas as pd
+import pytest
+
+from src import lead_classification, scoring_rules
+
+
+def write_rules(tmp_path, missing="INDEFINIDO", values=("DESCARTAR", "MÉDIO", "BOM", "PRIORITÁRIO")):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "lead_classification": {
+            "column": "structural_score", "edges": [60, 80, 100], "values": list(values), "missing": missing,
+        },
+    }), encoding="utf-8")
+    return str(path)
+
+
+def classify(monkeypatch, path, scores):
+    monkeypatch.setattr(lead_classification, "get_rule", functools.partial(scoring_rules.get_rule, path=path))
+    monkeypatch.setattr(lead_classification, "apply_rule", functools.partial(scoring_rules.apply_rule, path=path))
+    df = pd.DataFrame({"structural_score": pd.array(scores, dtype="Int64")})
+    return lead_classification.classify_leads(df)["lead_classification"]
+
+
+def test_missing_label_of_its_own(tmp_path, monkeypatch):
+    out = classify(monkeypatch, write_rules(tmp_path), [20, None, 100])
+    assert out.tolist() == ["DESCARTAR", "INDEFINIDO", "PRIORITÁRIO"]
+    assert list(out.cat.categories) == ["INDEFINIDO", "DESCARTAR", "MÉDIO", "BOM", "PRIORITÁRIO"]
+
+
+def test_missing_label_shared_with_a_tier(tmp_path, monkeypatch):
+    path = write_rules(tmp_path, missing="Frio", values=("Frio", "Morno", "Quente", "Prioritário"))
+    out = classify(monkeypatch, path, [20, None, 80])
+    assert out.tolist() == ["Frio", "Frio", "Quente"]
+    assert list(out.cat.categories) == ["Frio", "Morno", "Quente", "Prioritário"]
+
+
+def test_repeated_labels_rejected(tmp_path):
+    path = write_rules(tmp_path, values=("Frio", "Frio", "Quente", "Prioritário"))
+    with pytest.raises(ValueError, match="repetidos"):
+        scoring_rules.load_rules(path)
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from utils import normalize_cnpj, validate_cnpj_batch
+
+VALUES = ["11.222.333/0001-81", "11222333000182", "123", 11222333000181, "١١٢٢٢٣٣٣٠٠٠١٨١",
+          "00000000000000", "1122233300018199", "abc", "", None, np.nan]
+
+
+def test_validate_cnpj_batch_matches_scalar_rules():
+    mask, normalized = validate_cnpj_batch(pd.Series(VALUES, dtype=object))
+
+    assert mask.tolist() == [True, False, False, True, True, False, False, False, False, False, False]
+    expected = [normalize_cnpj(v) for v in VALUES]
+    assert normalized.tolist() == expected
+    assert normalized[2] == "00000000000123"
+    assert normalized[6] == "11222333000181"
+
+
+def test_validate_cnpj_batch_accepts_lists_and_arrays():
+    mask, normalized = validate_cnpj_batch(VALUES)
+    mask_arr, normalized_arr = validate_cnpj_batch(np.array(VALUES, dtype=object))
+
+    assert mask.tolist() == mask_arr.tolist()
+    assert normalized.tolist() == normalized_arr.tolist()